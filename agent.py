@@ -0,0 +1,59 @@
+"""分布式转换的代理：连接 `cli.py --coordinator` 启动的协调端，在本机转换贴图并传回结果。
+
+示例:
+    python cli.py "D:/Mods" --coordinator 0.0.0.0:8765 --token SECRET --workers 16
+    python agent.py http://192.168.1.10:8765 --token SECRET --workers 8
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from distributed import Agent
+from engine import BACKENDS, create_backend, default_worker_count, find_imagemagick
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Convert textures for a coordinator started with cli.py --coordinator.")
+    parser.add_argument("url", help="coordinator address, e.g. http://192.168.1.10:8765")
+    parser.add_argument("--magick", help="path to the ImageMagick executable "
+                                         "(default: DDSCOMPRESSOR_MAGICK, MAGICK_HOME, registry, PATH)")
+    parser.add_argument("--backend", choices=BACKENDS, default="magick",
+                        help="magick: run the magick executable per file; wand: convert in-process (default: magick)")
+    parser.add_argument("-j", "--workers", type=int, default=default_worker_count(),
+                        help="number of parallel conversions on this machine (default: CPU count)")
+    parser.add_argument("--token", help="shared secret set with --token on the coordinator")
+    parser.add_argument("--once", action="store_true",
+                        help="exit when the coordinator finishes instead of waiting for the next run")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="do not print per-file log lines")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    magick_exec = args.magick or find_imagemagick()
+    if args.backend == "magick" and (not magick_exec or not Path(magick_exec).is_file()):
+        print("ImageMagick not found, use --magick", file=sys.stderr)
+        return 2
+    try:
+        backend = create_backend(args.backend, magick_exec)
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    def on_log(msg):
+        if not args.quiet or msg.startswith(("ERROR:", "TIMEOUT:", "EXCEPTION:")):
+            print(msg, file=sys.stderr)
+
+    agent = Agent(args.url, backend, slots=max(1, args.workers), token=args.token, once=args.once, on_log=on_log)
+    try:
+        agent.run()
+    except KeyboardInterrupt:
+        agent.stop()
+        return 130
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""对比 magick 子进程后端与 Wand 进程内后端的转换吞吐量。
+
+示例:
+    python benchmarks/bench_backends.py "D:/Mods/SomeMod/textures" --resolution 512 --workers 8
+"""
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from engine import (  # noqa: E402
+    BACKENDS, BackendError, create_backend, default_worker_count, find_imagemagick, is_normal_map
+)
+
+
+def bench(backend, files, resolution, workers, to_memory):
+    """用线程池转换全部文件，返回 (耗时, 失败数)"""
+    out_dir = Path(tempfile.mkdtemp(prefix=f"bench_{backend.name}_"))
+
+    def convert(index_src):
+        index, src = index_src
+        dst = None if to_memory else out_dir / f"{index}.dds"
+        try:
+            backend.convert(src, dst, is_normal_map(src), resolution)
+            return True
+        except BackendError:
+            return False
+
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(convert, enumerate(files)))
+        return time.perf_counter() - start, results.count(False)
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare conversion backends on a folder of DDS files.")
+    parser.add_argument("folder", type=Path, help="folder scanned recursively for .dds files")
+    parser.add_argument("--magick", help="path to the ImageMagick executable")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("-r", "--resolution", default="512")
+    parser.add_argument("-j", "--workers", type=int, default=default_worker_count())
+    parser.add_argument("--memory", action="store_true",
+                        help="return DDS bytes instead of writing files (ZIP output path)")
+    args = parser.parse_args(argv)
+
+    files = sorted(args.folder.rglob("*.dds"))
+    if not files:
+        print("No .dds files found", file=sys.stderr)
+        return 2
+    total_mb = sum(f.stat().st_size for f in files) / (1024 * 1024)
+    print(f"{len(files)} files, {total_mb:.1f} MB, {args.workers} threads, resolution {args.resolution}")
+
+    for name in args.backends:
+        try:
+            backend = create_backend(name, args.magick or find_imagemagick())
+        except RuntimeError as e:
+            print(f"{name:>8}: skipped ({e})")
+            continue
+        elapsed, failed = bench(backend, files, args.resolution, args.workers, args.memory)
+        print(f"{name:>8}: {elapsed:8.2f}s  {len(files) / elapsed:8.2f} files/s  "
+              f"{total_mb / elapsed:8.2f} MB/s  failed {failed}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
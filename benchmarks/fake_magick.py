@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""magick 的替身：不做任何图像处理，只按设定耗时后把输入原样写到输出，用于测量流水线本身的开销。
+
+支持单文件调用（输出路径或 dds:-）和批量调用（-write / -print / -delete ... null:）。
+与 magick 相同，最后写 null: 时图像列表为空会报错并返回 1。
+环境变量:
+    FAKE_MAGICK_DELAY          每张贴图的固定耗时（秒，默认 0.05）
+    FAKE_MAGICK_DELAY_PER_MP   每百万像素的额外耗时（秒，默认 0.02，按 DDS 头计算）
+    FAKE_MAGICK_STARTUP        进程启动耗时（秒，默认 0.05）
+"""
+import os
+import struct
+import sys
+import time
+
+DELAY = float(os.environ.get("FAKE_MAGICK_DELAY", "0.05"))
+DELAY_PER_MP = float(os.environ.get("FAKE_MAGICK_DELAY_PER_MP", "0.02"))
+STARTUP = float(os.environ.get("FAKE_MAGICK_STARTUP", "0.05"))
+
+
+def convert(src):
+    with open(src, "rb") as f:
+        data = f.read()
+    height, width = struct.unpack_from("<2I", data, 12) if len(data) >= 20 else (0, 0)
+    time.sleep(DELAY + DELAY_PER_MP * width * height / 1e6)
+    return data
+
+
+def main(args):
+    time.sleep(STARTUP)
+    if args and args[-1] == "null:":
+        src = None
+        i = 0
+        while i < len(args) - 1:
+            arg = args[i]
+            if src is None:
+                src = arg
+                data = convert(src)
+            elif arg == "-write":
+                with open(args[i + 1], "wb") as f:
+                    f.write(data)
+                i += 1
+            elif arg == "-print":
+                sys.stdout.write(args[i + 1].replace("\\n", "\n"))
+                sys.stdout.flush()
+                i += 1
+            elif arg == "-delete":
+                src = None
+                i += 1
+            i += 1
+        if src is None:
+            sys.stderr.write("magick: no images defined `null:'\n")
+            return 1
+        return 0
+
+    data = convert(args[0])
+    if args[-1] == "dds:-":
+        sys.stdout.buffer.write(data)
+    else:
+        with open(args[-1], "wb") as f:
+            f.write(data)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,120 @@
+"""在一台机器上模拟分布式转换：启动协调端（cli.py --coordinator）和若干代理进程（agent.py），
+可选在运行中途杀掉一个代理，检验重试和失联处理；最后与本机直接转换的结果逐字节比较。
+
+不指定 --magick 时使用 fake_magick.py 替身。
+
+示例:
+    python benchmarks/make_corpus.py bench_corpus --no-archives
+    python benchmarks/local_cluster.py bench_corpus --agents 3 --kill-after 2
+"""
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from run_bench import scenario_inputs, stub_executable  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def convert(inputs, out_dir: Path, extra, env):
+    """运行一次 cli.py，输出为 out_dir 中的 zip；返回 (退出码, 耗时)"""
+    cmd = [sys.executable, str(ROOT / "cli.py"), *map(str, inputs), "-o", "zip", "--output-dir", str(out_dir),
+           "--full", "--no-cache", "-q", *extra]
+    start = time.perf_counter()
+    code = subprocess.run(cmd, env=env).returncode
+    return code, time.perf_counter() - start
+
+
+def differences(expected: Path, actual: Path):
+    """比较两个目录中同名 zip 的成员内容"""
+    diffs = []
+    for ref in sorted(expected.glob("*.zip")):
+        other = actual / ref.name
+        if not other.exists():
+            diffs.append(f"{ref.name}: missing")
+            continue
+        with zipfile.ZipFile(ref) as a, zipfile.ZipFile(other) as b:
+            names = sorted(a.namelist())
+            if names != sorted(b.namelist()):
+                diffs.append(f"{ref.name}: different members")
+            diffs += [f"{ref.name}/{n}: different content" for n in names
+                      if n in b.namelist() and a.read(n) != b.read(n)]
+    return diffs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a coordinator and several local agents on a corpus.")
+    parser.add_argument("corpus", type=Path, help="directory created by make_corpus.py")
+    parser.add_argument("--magick", help="real ImageMagick executable (default: fake_magick.py stub)")
+    parser.add_argument("--agents", type=int, default=3)
+    parser.add_argument("--slots", type=int, default=2, help="conversions per agent (default: 2)")
+    parser.add_argument("--kill-after", type=float, metavar="SECONDS",
+                        help="kill the first agent this long after the start to simulate a lost machine")
+    parser.add_argument("--stub-delay", type=float, help="seconds per texture in the stub (FAKE_MAGICK_DELAY)")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ)
+    if args.stub_delay is not None:
+        env["FAKE_MAGICK_DELAY"] = str(args.stub_delay)
+    tmp = Path(tempfile.mkdtemp(prefix="ddscluster_"))
+    magick = args.magick or stub_executable(tmp)
+    inputs = scenario_inputs(args.corpus, "folder")
+    try:
+        local_dir, remote_dir = tmp / "local", tmp / "remote"
+        local_dir.mkdir()
+        remote_dir.mkdir()
+        code, local_wall = convert(inputs, local_dir, ["--magick", magick, "-j", str(args.slots)], env)
+        print(f"local: exit {code}, {local_wall:.2f}s with {args.slots} worker(s)")
+
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        agent_cmd = [sys.executable, str(ROOT / "agent.py"), url, "--magick", magick, "-j", str(args.slots),
+                     "--once", "-q"]
+        agents = [subprocess.Popen(agent_cmd, env=env) for _ in range(args.agents)]
+        coordinator = subprocess.Popen(
+            [sys.executable, str(ROOT / "cli.py"), *map(str, inputs), "-o", "zip", "--output-dir", str(remote_dir),
+             "--full", "--no-cache", "-q", "--coordinator", f"127.0.0.1:{port}",
+             "-j", str(args.agents * args.slots)], env=env)
+        start = time.perf_counter()
+        try:
+            if args.kill_after is not None:
+                try:
+                    coordinator.wait(args.kill_after)
+                except subprocess.TimeoutExpired:
+                    agents[0].kill()
+                    print(f"killed agent 0 after {args.kill_after:.1f}s")
+            code = coordinator.wait()
+            remote_wall = time.perf_counter() - start
+        finally:
+            for agent in agents:
+                try:
+                    agent.wait(30)
+                except subprocess.TimeoutExpired:
+                    agent.kill()
+        print(f"distributed: exit {code}, {remote_wall:.2f}s with {args.agents} agent(s) x {args.slots} slot(s)")
+
+        diffs = differences(local_dir, remote_dir)
+        for line in diffs[:20]:
+            print(f"  {line}")
+        print("outputs identical" if not diffs else f"{len(diffs)} difference(s)")
+        return 0 if not diffs else 1
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
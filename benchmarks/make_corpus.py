@@ -0,0 +1,131 @@
+"""生成可复现的基准测试语料：若干模组文件夹，以及对应的 .zip / .7z 压缩包。
+
+贴图覆盖 BC1 / BC3 / BC5 / BC7、有无 mip、漫反射与法线（_n）命名，尺寸 256 到 4096。
+同一 --seed 生成的文件逐字节相同。
+
+示例:
+    python benchmarks/make_corpus.py bench_corpus --mods 3 --textures 40
+"""
+import argparse
+import json
+import random
+import shutil
+import struct
+import sys
+import zipfile
+from pathlib import Path
+
+try:
+    import py7zr
+    HAS_7Z = True
+except ImportError:
+    HAS_7Z = False
+
+# 格式名 -> (FourCC, DXGI 格式, 每 4x4 块字节数)；DXGI 格式非 None 时写 DX10 扩展头
+FORMATS = {
+    "BC1": (b"DXT1", None, 8),
+    "BC3": (b"DXT5", None, 16),
+    "BC5": (b"ATI2", None, 16),
+    "BC7": (b"DX10", 98, 16),
+}
+# 尺寸分布：小贴图多、大贴图少，和实际模组大致相当
+SIZES = [(256, 3), (512, 4), (1024, 4), (2048, 2), (4096, 1)]
+CORPUS_INFO = "corpus.json"
+
+
+def level_size(width, height, block_bytes):
+    return max(1, (width + 3) // 4) * max(1, (height + 3) // 4) * block_bytes
+
+
+def dds_bytes(rng, width, height, fmt, mips):
+    """构造一个 DDS 文件；数据为按块重复的随机字节，压缩率介于真实贴图与纯随机之间"""
+    fourcc, dxgi, block_bytes = FORMATS[fmt]
+    levels = [(width, height)]
+    while mips and levels[-1] != (1, 1):
+        w, h = levels[-1]
+        levels.append((max(1, w // 2), max(1, h // 2)))
+
+    header = bytearray(128)
+    header[:4] = b"DDS "
+    flags = 0x1 | 0x2 | 0x4 | 0x1000 | 0x80000 | (0x20000 if mips else 0)
+    struct.pack_into("<7I", header, 4, 124, flags, height, width, level_size(width, height, block_bytes), 0,
+                     len(levels) if mips else 0)
+    struct.pack_into("<2I4s", header, 76, 32, 0x4, fourcc)
+    struct.pack_into("<I", header, 108, 0x1000 | (0x400008 if mips else 0))
+    parts = [bytes(header)]
+    if dxgi is not None:
+        parts.append(struct.pack("<5I", dxgi, 3, 0, 1, 0))
+    for w, h in levels:
+        size = level_size(w, h, block_bytes)
+        chunk = rng.randbytes(min(size, 16384))
+        parts.append((chunk * (size // len(chunk) + 1))[:size])
+    return b"".join(parts)
+
+
+def generate(out_dir: Path, mods=3, textures=40, seed=1234, archives=True):
+    """生成语料并返回描述信息（也写入 corpus.json）"""
+    rng = random.Random(seed)
+    sizes = [s for s, weight in SIZES for _ in range(weight)]
+    mods_dir = out_dir / "mods"
+    info = {"seed": seed, "mods": {}}
+    for m in range(mods):
+        name = f"BenchMod{m:02d}"
+        files = []
+        for t in range(textures):
+            normal = rng.random() < 0.3
+            # 法线贴图通常是 BC5 / BC7，漫反射多为 BC1 / BC3 / BC7
+            fmt = rng.choice(["BC5", "BC7"] if normal else ["BC1", "BC1", "BC3", "BC7"])
+            width = rng.choice(sizes)
+            height = width if rng.random() < 0.8 else width // 2
+            mips = rng.random() < 0.75
+            rel = Path("textures") / name.lower() / f"tex{t:03d}{'_n' if normal else ''}.dds"
+            data = dds_bytes(rng, width, height, fmt, mips)
+            path = mods_dir / name / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(data)
+            files.append({"path": rel.as_posix(), "size": len(data), "width": width, "height": height,
+                          "format": fmt, "mips": mips, "normal": normal})
+        info["mods"][name] = files
+
+        if archives:
+            zip_path = out_dir / "zip" / f"{name}.zip"
+            zip_path.parent.mkdir(parents=True, exist_ok=True)
+            with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+                for f in files:
+                    # 固定时间戳，保证压缩包逐字节可复现
+                    member = zipfile.ZipInfo(f["path"], date_time=(2020, 1, 1, 0, 0, 0))
+                    member.compress_type = zipfile.ZIP_DEFLATED
+                    zf.writestr(member, (mods_dir / name / f["path"]).read_bytes(), compresslevel=1)
+            if HAS_7Z:
+                sz_path = out_dir / "7z" / f"{name}.7z"
+                sz_path.parent.mkdir(parents=True, exist_ok=True)
+                with py7zr.SevenZipFile(sz_path, "w") as archive:
+                    for f in files:
+                        archive.write(mods_dir / name / f["path"], f["path"])
+
+    with open(out_dir / CORPUS_INFO, "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=1)
+    return info
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a reproducible DDS benchmark corpus.")
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--mods", type=int, default=3)
+    parser.add_argument("--textures", type=int, default=40, help="textures per mod")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--no-archives", action="store_true", help="only write the mod folders")
+    args = parser.parse_args(argv)
+
+    if args.out_dir.exists():
+        shutil.rmtree(args.out_dir)
+    info = generate(args.out_dir, args.mods, args.textures, args.seed, not args.no_archives)
+    count = sum(len(files) for files in info["mods"].values())
+    total = sum(f["size"] for files in info["mods"].values() for f in files)
+    print(f"{count} textures, {total / (1024 * 1024):.1f} MB in {args.out_dir}"
+          + ("" if HAS_7Z or args.no_archives else " (py7zr not installed, no .7z written)"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
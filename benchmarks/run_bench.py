@@ -0,0 +1,217 @@
+"""在基准语料上运行完整转换流程（与 GUI 的 Worker 相同的 ConversionEngine），
+报告 files/s、MB/s、各阶段耗时和峰值内存，并可与保存的基线比较。
+
+每个场景在独立子进程中运行，峰值内存互不影响。不指定 --magick 时使用 fake_magick.py 替身。
+
+示例:
+    python benchmarks/make_corpus.py bench_corpus
+    python benchmarks/run_bench.py bench_corpus --save-baseline baseline.json
+    python benchmarks/run_bench.py bench_corpus --baseline baseline.json
+    python benchmarks/run_bench.py bench_corpus --magick "C:/Program Files/ImageMagick/magick.exe"
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from engine import ConversionEngine, default_worker_count, parse_input_lines  # noqa: E402
+
+INPUT_KINDS = ("folder", "zip", "7z")
+OUTPUT_METHODS = ("folder", "zip")
+CORPUS_INFO = "corpus.json"
+
+
+def stub_executable(tmp_dir: Path) -> str:
+    """生成调用 fake_magick.py 的可执行包装（Windows 为 .cmd）"""
+    script = Path(__file__).resolve().parent / "fake_magick.py"
+    if sys.platform == "win32":
+        wrapper = tmp_dir / "magick.cmd"
+        wrapper.write_text(f'@"{sys.executable}" "{script}" %*\r\n', encoding="utf-8")
+    else:
+        wrapper = tmp_dir / "magick"
+        wrapper.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$@"\n', encoding="utf-8")
+        wrapper.chmod(0o755)
+    return str(wrapper)
+
+
+def scenario_inputs(corpus: Path, kind):
+    if kind == "folder":
+        return sorted(p for p in (corpus / "mods").iterdir() if p.is_dir())
+    return sorted((corpus / kind).glob(f"*.{kind}"))
+
+
+def peak_rss():
+    """(本进程, 子进程中最大的) 峰值常驻内存，单位字节；无法获取时为 None"""
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset, None
+        except (ImportError, AttributeError):
+            return None, None
+    scale = 1 if sys.platform == "darwin" else 1024  # Linux 的 ru_maxrss 单位为 KB
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale)
+
+
+def run_scenario(params):
+    """在当前进程中运行一个场景并返回指标"""
+    corpus = Path(params["corpus"])
+    items, _ = parse_input_lines([str(p) for p in scenario_inputs(corpus, params["input"])])
+    out_dir = Path(tempfile.mkdtemp(prefix="ddsbench_"))
+    trace_path = out_dir / "trace.jsonl"
+    engine = ConversionEngine(
+        items, params["magick"], str(params["resolution"]), "all", "en",
+        output_method=params["output"],
+        zip_output_path=out_dir,
+        max_workers=params["workers"],
+        incremental=False,
+        batch_size=params["batch_size"],
+        backend=params["backend"],
+        trace_path=trace_path,
+    )
+    start = time.perf_counter()
+    engine.run()
+    wall = time.perf_counter() - start
+
+    stages = {}
+    busy = {}
+    with open(trace_path, encoding="utf-8") as f:
+        for line in f:
+            span = json.loads(line)
+            if span["cat"] == "stage":
+                stages[span["name"]] = stages.get(span["name"], 0.0) + span["duration"]
+            elif span["cat"] == "file":
+                busy[span["name"]] = busy.get(span["name"], 0.0) + span["duration"]
+
+    # 文件夹输出写在输入旁边，跑完即删除
+    for pattern_dir in (corpus / "mods", corpus / "zip", corpus / "7z"):
+        if pattern_dir.exists():
+            for out in pattern_dir.glob("*_low_res"):
+                shutil.rmtree(out, ignore_errors=True)
+    shutil.rmtree(out_dir, ignore_errors=True)
+
+    rss_self, rss_children = peak_rss()
+    summary = engine.summary
+    return {"status": summary.get("status"), "files": summary.get("total", 0), "failed": summary.get("failed", 0),
+            "wall": wall, "stages": stages, "busy": busy, "peak_rss": rss_self, "peak_rss_children": rss_children}
+
+
+def run_in_child(params, env):
+    result = subprocess.run([sys.executable, __file__, "--child", json.dumps(params)],
+                            capture_output=True, text=True, env=env)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip()[-500:])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def format_mb(value):
+    return f"{value / (1024 * 1024):.0f}" if value else "-"
+
+
+def compare(results, baseline, tolerance):
+    """打印与基线的差异，返回是否有场景的 files/s 下降超过容差"""
+    regressed = False
+    print("\nvs baseline:")
+    for key, metrics in results.items():
+        base = baseline.get(key)
+        if not base or not base.get("files_per_s"):
+            print(f"  {key:<16} (not in baseline)")
+            continue
+        delta = metrics["files_per_s"] / base["files_per_s"] - 1
+        rss = ""
+        if metrics.get("peak_rss") and base.get("peak_rss"):
+            rss = f"  peak RSS {metrics['peak_rss'] / base['peak_rss'] - 1:+.1%}"
+        flag = ""
+        if delta < -tolerance:
+            flag = "  REGRESSION"
+            regressed = True
+        print(f"  {key:<16} files/s {base['files_per_s']:.2f} -> {metrics['files_per_s']:.2f} ({delta:+.1%}){rss}{flag}")
+    return regressed
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--child"]:
+        print(json.dumps(run_scenario(json.loads(argv[1]))))
+        return 0
+
+    parser = argparse.ArgumentParser(description="Benchmark the conversion pipeline on a generated corpus.")
+    parser.add_argument("corpus", type=Path, help="directory created by make_corpus.py")
+    parser.add_argument("--magick", help="real ImageMagick executable (default: fake_magick.py stub)")
+    parser.add_argument("--backend", default="magick", choices=("magick", "wand"))
+    parser.add_argument("--inputs", nargs="+", choices=INPUT_KINDS, default=list(INPUT_KINDS))
+    parser.add_argument("--outputs", nargs="+", choices=OUTPUT_METHODS, default=list(OUTPUT_METHODS))
+    parser.add_argument("-r", "--resolution", type=int, default=512)
+    parser.add_argument("-j", "--workers", type=int, default=default_worker_count())
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--stub-delay", type=float, help="seconds per texture in the stub (FAKE_MAGICK_DELAY)")
+    parser.add_argument("--stub-delay-per-mp", type=float,
+                        help="extra seconds per megapixel in the stub (FAKE_MAGICK_DELAY_PER_MP)")
+    parser.add_argument("--save-baseline", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--baseline", type=Path, help="compare against a file written by --save-baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed files/s drop against the baseline before failing (default: 0.10)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    with open(args.corpus / CORPUS_INFO, encoding="utf-8") as f:
+        corpus_info = json.load(f)
+    corpus_bytes = sum(t["size"] for files in corpus_info["mods"].values() for t in files)
+
+    env = dict(os.environ)
+    if args.stub_delay is not None:
+        env["FAKE_MAGICK_DELAY"] = str(args.stub_delay)
+    if args.stub_delay_per_mp is not None:
+        env["FAKE_MAGICK_DELAY_PER_MP"] = str(args.stub_delay_per_mp)
+
+    stub_dir = Path(tempfile.mkdtemp(prefix="ddsbench_stub_"))
+    magick = args.magick or stub_executable(stub_dir)
+    results = {}
+    try:
+        for kind in args.inputs:
+            if not (args.corpus / ("mods" if kind == "folder" else kind)).exists():
+                print(f"{kind}: no such inputs in corpus, skipped", file=sys.stderr)
+                continue
+            for output in args.outputs:
+                key = f"{kind}->{output}"
+                params = {"corpus": str(args.corpus.resolve()), "input": kind, "output": output, "magick": magick,
+                          "backend": args.backend, "resolution": args.resolution, "workers": args.workers,
+                          "batch_size": args.batch_size}
+                metrics = run_in_child(params, env)
+                metrics["files_per_s"] = metrics["files"] / metrics["wall"] if metrics["wall"] else 0.0
+                metrics["mb_per_s"] = corpus_bytes / (1024 * 1024) / metrics["wall"] if metrics["wall"] else 0.0
+                results[key] = metrics
+                if not args.json:
+                    stages = "  ".join(f"{name} {seconds:.2f}s" for name, seconds in metrics["stages"].items())
+                    print(f"{key:<16} {metrics['files']} files ({metrics['failed']} failed)  {metrics['wall']:.2f}s  "
+                          f"{metrics['files_per_s']:.2f} files/s  {metrics['mb_per_s']:.1f} MB/s  "
+                          f"peak RSS {format_mb(metrics['peak_rss'])} MB (children "
+                          f"{format_mb(metrics['peak_rss_children'])} MB)\n{'':<17}{stages}")
+    finally:
+        shutil.rmtree(stub_dir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({"magick": "stub" if not args.magick else args.magick, "scenarios": results}, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["scenarios"]
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
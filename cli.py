@@ -0,0 +1,257 @@
+"""命令行入口：无需 Qt 即可批量生成低分辨率贴图补丁。
+
+示例:
+    python cli.py "D:/Mods/SomeMod" "D:/Downloads/Other.zip" --resolution 1024 --workers 8 --json
+"""
+import argparse
+import json
+import signal
+import sys
+import threading
+from pathlib import Path
+
+from engine import (
+    ARCHIVE_CODECS, BACKENDS, DEFAULT_CACHE_SIZE, DEFAULT_TIMEOUT_CEILING, DEFAULT_TIMEOUT_FLOOR,
+    DEFAULT_VRAM_RULES, VRAM_MIN_RESOLUTION, ConversionEngine, create_backend, default_cache_dir, default_timing_history, default_worker_count,
+    find_imagemagick, format_duration, parse_input_lines
+)
+from distributed import CoordinatorBackend, parse_address
+from languages import LANGUAGES
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Generate low-res DDS texture patches for Skyrim / Fallout mods.")
+    parser.add_argument("inputs", nargs="+",
+                        help="mod folders, .zip / .7z archives, .bsa files, or the modlist.txt of a Mod Organizer 2 "
+                             "profile (only the texture that wins the load order is converted for each path)")
+    parser.add_argument("--magick", help="path to the ImageMagick executable "
+                                         "(default: DDSCOMPRESSOR_MAGICK, MAGICK_HOME, registry, PATH)")
+    parser.add_argument("--backend", choices=BACKENDS, default="magick",
+                        help="magick: run the magick executable per file; wand: convert in-process "
+                             "through the Wand bindings (default: magick)")
+    parser.add_argument("--coordinator", metavar="[HOST:]PORT",
+                        help="do not convert locally: serve the conversions over HTTP to agents started with "
+                             "'python agent.py http://THIS_HOST:PORT' on other machines; set --workers to at "
+                             "least the total number of agent slots. HOST defaults to 127.0.0.1; any other "
+                             "address (e.g. 0.0.0.0) requires --token")
+    parser.add_argument("--token", help="shared secret that agents must send (with --coordinator)")
+    parser.add_argument("-r", "--resolution", type=int, default=512,
+                        help="target resolution of the longest side (default: 512)")
+    parser.add_argument("--vram-budget", type=int, metavar="MB",
+                        help="instead of one --resolution for everything, read all headers and halve individual "
+                             "textures until their estimated VRAM use fits this budget (--resolution then only "
+                             "applies to textures whose header cannot be read)")
+    parser.add_argument("--vram-rule", action="append", default=[], metavar="PATTERN=WEIGHT",
+                        help="weight for textures whose path matches PATTERN (e.g. 'textures/clutter/*=0.5'); "
+                             "higher weights are downscaled later. Checked before the built-in rules: "
+                             + ", ".join(f"{p}={w:g}" for p, w in DEFAULT_VRAM_RULES))
+    parser.add_argument("--vram-min-resolution", type=int, default=VRAM_MIN_RESOLUTION, metavar="PIXELS",
+                        help="never plan a texture below this size (default: %(default)s)")
+    parser.add_argument("--vram-plan", type=Path, metavar="FILE",
+                        help="write the per-texture plan (current and planned size and VRAM) as JSON")
+    parser.add_argument("-m", "--mode", choices=("all", "skip_normals", "only_normals"), default="all",
+                        help="which textures to process (default: all)")
+    parser.add_argument("-o", "--output", choices=("folder", "zip", "7z"), default="folder",
+                        help="write <mod>_low_res folders next to the inputs, or archives (default: folder)")
+    parser.add_argument("--output-dir", type=Path,
+                        help="directory for zip / 7z output (default: current directory)")
+    parser.add_argument("--codec", choices=ARCHIVE_CODECS,
+                        help="ZIP member codec (default: deflate if --level is set, else stored); "
+                             "lzma2 is only valid with -o 7z, which always uses it")
+    parser.add_argument("--level", type=int, choices=range(0, 10), metavar="0-9",
+                        help="compression level for --codec / 7z output")
+    parser.add_argument("-j", "--workers", type=int, default=default_worker_count(),
+                        help="number of parallel conversions (default: CPU count)")
+    parser.add_argument("--memory-budget", type=int, metavar="MB",
+                        help="limit the estimated peak memory of concurrent conversions "
+                             "(default: 60%% of physical memory)")
+    parser.add_argument("--timeout-floor", type=float, default=DEFAULT_TIMEOUT_FLOOR, metavar="SECONDS",
+                        help="shortest per-file magick timeout (default: %(default)s)")
+    parser.add_argument("--timeout-ceiling", type=float, default=DEFAULT_TIMEOUT_CEILING, metavar="SECONDS",
+                        help="longest per-file magick timeout; between the two, the timeout is "
+                             "a multiple of the expected conversion time (default: %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=8,
+                        help="small textures converted per magick process (1 disables batching, default: 8)")
+    parser.add_argument("--copy-small", action="store_true",
+                        help="copy textures already at or below the target resolution to the output")
+    parser.add_argument("--no-mip-fast-path", action="store_true",
+                        help="always re-encode with magick instead of copying existing mip levels")
+    parser.add_argument("--full", action="store_true",
+                        help="ignore the incremental manifest and reconvert everything")
+    parser.add_argument("--hash", action="store_true",
+                        help="compare source files by content hash instead of size and mtime")
+    parser.add_argument("--cache-dir", type=Path, default=default_cache_dir(),
+                        help="content-addressed cache of converted textures, shared across runs "
+                             "(default: %(default)s)")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024), metavar="MB",
+                        help="evict least recently used cache entries above this size (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="do not read or write the result cache")
+    parser.add_argument("--timing-history", type=Path, default=default_timing_history(),
+                        help="per-format timing statistics used for scheduling and ETA (default: %(default)s)")
+    parser.add_argument("--trace", type=Path, metavar="FILE",
+                        help="write per-stage and per-file timing spans: .jsonl for JSON lines, "
+                             "anything else for Chrome trace-event JSON (chrome://tracing, Perfetto)")
+    parser.add_argument("--lang", choices=sorted(LANGUAGES), default="en",
+                        help="language of log messages (default: en)")
+    parser.add_argument("--json", action="store_true",
+                        help="print a machine-readable summary to stdout")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="do not print per-file log lines")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.codec == "lzma2" and args.output != "7z":
+        parser.error("--codec lzma2 requires -o 7z")
+
+    magick_exec = args.magick or find_imagemagick()
+    if args.coordinator:
+        try:
+            backend = CoordinatorBackend(*parse_address(args.coordinator), token=args.token)
+        except (ValueError, OSError) as e:
+            print(f"Cannot listen on {args.coordinator}: {e}", file=sys.stderr)
+            return 2
+        print(f"Coordinator listening on {backend.address[0]}:{backend.address[1]}", file=sys.stderr)
+    else:
+        if args.backend == "magick" and (not magick_exec or not Path(magick_exec).is_file()):
+            print(LANGUAGES[args.lang]["error_magick"], file=sys.stderr)
+            return 2
+        try:
+            backend = create_backend(args.backend, magick_exec)
+        except RuntimeError as e:
+            print(e, file=sys.stderr)
+            return 2
+    try:
+        return run(args, magick_exec, backend)
+    finally:
+        if args.coordinator:
+            backend.close()
+
+
+def run(args, magick_exec, backend):
+    # 先检查参数再解析输入：解析压缩包输入会创建临时目录
+    try:
+        rules = [(pattern, float(weight)) for pattern, weight in (rule.rsplit("=", 1) for rule in args.vram_rule)]
+    except ValueError:
+        print("--vram-rule must look like PATTERN=WEIGHT", file=sys.stderr)
+        return 2
+    if args.output != "folder" and args.output_dir:
+        try:
+            args.output_dir.mkdir(parents=True, exist_ok=True)
+        except OSError as e:
+            print(f"Cannot create --output-dir {args.output_dir}: {e}", file=sys.stderr)
+            return 2
+
+    try:
+        input_items, _ = parse_input_lines(args.inputs)
+    except Exception as e:
+        print(f"Failed to parse input: {e}", file=sys.stderr)
+        return 2
+    if not input_items:
+        print(LANGUAGES[args.lang]["error_input"], file=sys.stderr)
+        return 2
+
+    def on_log(msg):
+        if not args.quiet:
+            print(msg, file=sys.stderr)
+
+    eta = {}
+
+    def on_eta(seconds):
+        eta["text"] = format_duration(seconds)
+
+    def on_progress(current, total, success):
+        if not args.quiet:
+            suffix = f" ETA {eta['text']}" if "text" in eta else ""
+            print(f"[{current}/{total}]{suffix}", file=sys.stderr)
+
+    def on_error(key):
+        print(LANGUAGES[args.lang].get(key, key), file=sys.stderr)
+
+    engine = ConversionEngine(
+        input_items, magick_exec, str(args.resolution), args.mode, args.lang,
+        output_method=args.output,
+        zip_output_path=args.output_dir or Path.cwd(),
+        max_workers=args.workers,
+        copy_small=args.copy_small,
+        use_mip_fast_path=not args.no_mip_fast_path,
+        incremental=not args.full,
+        hash_sources=args.hash,
+        archive_codec=args.codec or ("deflate" if args.level else "stored"),
+        compression_level=args.level,
+        batch_size=args.batch_size,
+        backend=backend,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        cache_size=args.cache_size * 1024 * 1024,
+        timing_history=args.timing_history,
+        trace_path=args.trace,
+        timeout_floor=args.timeout_floor,
+        timeout_ceiling=args.timeout_ceiling,
+        memory_budget=args.memory_budget * 1024 * 1024 if args.memory_budget else None,
+        on_progress=on_progress,
+        on_log=on_log,
+        on_error=on_error,
+        on_eta=on_eta,
+    )
+
+    try:
+        if args.vram_budget:
+            try:
+                plan_vram(args, engine, rules)
+            except OSError as e:
+                print(f"Cannot write --vram-plan: {e}", file=sys.stderr)
+                return 2
+        run_engine(engine)
+    finally:
+        # run() 结束时已经清理过；提前返回时在这里删除解析输入时创建的临时目录
+        engine.cleanup()
+
+    summary = engine.summary
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    elif summary.get("status") == "success":
+        print(LANGUAGES[args.lang]["success"].format(
+            success=summary["success"], total=summary["total"], output_dir="\n".join(summary["output"])))
+
+    if summary.get("status") != "success":
+        return 2 if summary.get("status") == "error" else 130
+    return 1 if summary.get("failed") else 0
+
+
+def plan_vram(args, engine, rules):
+    plan = engine.plan_vram(args.vram_budget * 1024 * 1024, rules + list(DEFAULT_VRAM_RULES),
+                            args.vram_min_resolution)
+    if args.vram_plan:
+        with open(args.vram_plan, "w", encoding="utf-8") as f:
+            json.dump(plan, f, ensure_ascii=False, indent=1)
+    mb = 1024 * 1024
+    downscaled = sum(1 for t in plan["textures"] if t["after"] < t["before"])
+    print(f"VRAM plan: {plan['before'] / mb:.0f} MB -> {plan['after'] / mb:.0f} MB "
+          f"(budget {args.vram_budget} MB), {downscaled} of {len(plan['textures'])} texture(s) downscaled",
+          file=sys.stderr)
+    if plan["after"] > plan["budget"]:
+        print(f"Budget not reachable without going below {args.vram_min_resolution}px", file=sys.stderr)
+
+
+def run_engine(engine):
+    # 在后台线程运行；Ctrl+C 只请求取消（不抛出 KeyboardInterrupt），等引擎清理完临时数据、收尾输出后再退出
+    thread = threading.Thread(target=engine.run)
+
+    def on_interrupt(signum, frame):
+        engine.cancel()
+
+    previous = signal.signal(signal.SIGINT, on_interrupt)
+    try:
+        thread.start()
+        while thread.is_alive():
+            thread.join(0.2)
+    finally:
+        signal.signal(signal.SIGINT, previous)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
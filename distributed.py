@@ -0,0 +1,420 @@
+"""分布式转换：协调端把待转换的贴图通过 HTTP 分发给其他机器上的代理，代理转换后把结果传回。
+
+协调端本身是一个转换后端（CoordinatorBackend）：ConversionEngine 的扫描、调度、缓存、清单和打包都照常在本机进行，
+只有 magick 转换交给代理，结果按任务写回对应的文件夹或压缩包成员。只依赖标准库。
+
+协议（HTTP/1.1，设置了令牌时每个请求都要带 X-DDSC-Token；监听本机以外的地址时必须设置令牌）：
+    POST /lease                          领取任务，最多等待 LEASE_POLL 秒；204 暂无任务，410 协调端已结束
+    GET  /source/<id>                    源文件内容
+    POST /heartbeat/<id>/<attempt>       下载、转换和上传期间定期续租；410 表示任务已取消或已转给别的代理
+    POST /result/<id>/<attempt>          转换结果（DDS 字节）
+    POST /fail/<id>/<attempt>            转换失败 {"error": ..., "timeout": bool, "retry": bool}
+代理失联（超过 LEASE_TIMEOUT 秒没有心跳）或报告与贴图无关的错误时，任务重新排队，最多尝试 MAX_ATTEMPTS 次；
+magick 报错和超时由贴图本身决定，不再重试。
+"""
+import hmac
+import ipaddress
+import json
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from engine import MAGICK_TIMEOUT, BackendError, Cancelled, ConversionBackend, ProcessGroup
+
+DEFAULT_PORT = 8765
+LEASE_POLL = 10          # 领取任务的长轮询时间（秒）
+LEASE_TIMEOUT = 20       # 超过此时间没有心跳即认为代理失联
+HEARTBEAT_INTERVAL = 5
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 2          # 代理连不上协调端时的重试间隔
+TOKEN_HEADER = "X-DDSC-Token"
+MAX_BODY = 1024 * 1024 * 1024  # 代理上传的请求体上限（字节），足够容纳最大的 DDS 结果
+
+
+def parse_address(text, default_host="127.0.0.1"):
+    """"host:port" 或 "port" -> (host, port)；只给端口时只监听本机"""
+    host, _, port = text.rpartition(":")
+    return host or default_host, int(port)
+
+
+def is_loopback(host):
+    try:
+        return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+    except (OSError, ValueError):
+        return False
+
+
+class RemoteJob:
+    def __init__(self, src: Path, params):
+        self.id = uuid.uuid4().hex
+        self.src = src
+        self.params = params
+        self.attempt = 0
+        self.agent = None
+        self.deadline = None  # 租出后的过期时间；排队中为 None
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.timed_out = False
+
+
+class CoordinatorBackend(ConversionBackend):
+    """在本机监听 HTTP，把每次 convert() 变成一个远程任务并等待代理完成。
+    引擎的 max_workers 即同时在途的任务数，应不小于所有代理的并行数之和"""
+    name = "remote"
+    runs_locally = False
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, token=None):
+        if not token and not is_loopback(host):
+            # 结果会直接写入输出，不允许局域网中任意主机领取任务、上传数据
+            raise ValueError(f"listening on {host} requires a token")
+        self.token = token
+        self._lock = threading.Condition()
+        self._queue = deque()
+        self._jobs = {}  # id -> RemoteJob（排队中或已租出）
+        self._closing = False
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self.address = self._server.server_address
+        self._threads = [threading.Thread(target=self._server.serve_forever, daemon=True),
+                         threading.Thread(target=self._reap, daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def convert(self, src, dst, is_normal, resolution, timeout=MAGICK_TIMEOUT, processes=None,
+                compression="auto"):
+        job = RemoteJob(Path(src), {"name": Path(src).name, "is_normal": is_normal, "resolution": str(resolution),
+                                    "compression": compression, "timeout": timeout})
+        with self._lock:
+            self._jobs[job.id] = job
+            self._queue.append(job)
+            self._lock.notify_all()
+        try:
+            while not job.done.wait(0.1):
+                if processes is not None and processes.cancelled:
+                    raise Cancelled()
+        finally:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+                if job in self._queue:
+                    self._queue.remove(job)
+        if job.timed_out:
+            raise subprocess.TimeoutExpired(job.params["name"], timeout)
+        if job.error is not None:
+            raise BackendError(job.error)
+        if dst is None:
+            return job.result
+        with open(dst, "wb") as f:
+            f.write(job.result)
+        return None
+
+    def close(self):
+        """通知等待中的代理协调端已结束，然后停止监听"""
+        with self._lock:
+            self._closing = True
+            self._lock.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+
+    # 以下由 HTTP 处理线程调用
+    def _lease(self, agent):
+        deadline = time.monotonic() + LEASE_POLL
+        with self._lock:
+            while not self._queue:
+                if self._closing:
+                    return "closed"
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._lock.wait(remaining)
+            job = self._queue.popleft()
+            job.attempt += 1
+            job.agent = agent
+            job.deadline = time.monotonic() + LEASE_TIMEOUT
+            return job
+
+    def _leased(self, job_id, attempt):
+        job = self._jobs.get(job_id)
+        if job is None or job.attempt != attempt or job.deadline is None:
+            return None
+        return job
+
+    def _heartbeat(self, job_id, attempt):
+        with self._lock:
+            job = self._leased(job_id, attempt)
+            if job is not None:
+                job.deadline = time.monotonic() + LEASE_TIMEOUT
+            return job is not None
+
+    def _complete(self, job_id, attempt, data=None, error=None, timed_out=False, retry=False):
+        """记录代理的结果；任务已取消或已转给别的代理时返回 False"""
+        with self._lock:
+            job = self._leased(job_id, attempt)
+            if job is None:
+                return False
+            if retry:
+                self._retry(job, f"{job.agent}: {error}")
+                return True
+            job.deadline = None
+            job.result, job.error, job.timed_out = data, error, timed_out
+            job.done.set()
+            return True
+
+    def _retry(self, job, reason):
+        # 调用方持有锁
+        job.deadline = None
+        if job.attempt >= MAX_ATTEMPTS:
+            job.error = f"{reason} (gave up after {job.attempt} attempts)"
+            job.done.set()
+            return
+        self._queue.appendleft(job)
+        self._lock.notify_all()
+
+    def _reap(self):
+        """租约过期的任务重新排队"""
+        while not self._closing:
+            time.sleep(1)
+            now = time.monotonic()
+            with self._lock:
+                for job in list(self._jobs.values()):
+                    if job.deadline is not None and job.deadline < now:
+                        self._retry(job, f"agent {job.agent} lost")
+
+
+def _make_handler(coordinator):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, code, body=b""):
+            """代理已断开时返回 False"""
+            try:
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+            except ConnectionError:
+                self.close_connection = True
+                return False
+            return True
+
+        def _authorized(self):
+            """未通过认证时回复 403 并断开连接（请求体不再读取）"""
+            if coordinator.token and not hmac.compare_digest(self.headers.get(TOKEN_HEADER, "").encode(),
+                                                             coordinator.token.encode()):
+                self.close_connection = True
+                self._reply(403)
+                return False
+            return True
+
+        def do_GET(self):
+            if not self._authorized():
+                return
+            parts = self.path.strip("/").split("/")
+            job = coordinator._jobs.get(parts[1]) if len(parts) == 2 and parts[0] == "source" else None
+            if job is None:
+                self._reply(404)
+                return
+            try:
+                f = open(job.src, "rb")
+            except OSError:
+                self._reply(410)
+                return
+            with f:
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/octet-stream")
+                    self.send_header("Content-Length", str(os.fstat(f.fileno()).st_size))
+                    self.end_headers()
+                    shutil.copyfileobj(f, self.wfile, 1024 * 1024)
+                except ConnectionError:
+                    self.close_connection = True
+
+        def do_POST(self):
+            if not self._authorized():
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+            except ValueError:
+                length = -1
+            if not 0 <= length <= MAX_BODY:
+                self.close_connection = True
+                self._reply(413)
+                return
+            body = self.rfile.read(length)
+            parts = self.path.strip("/").split("/")
+            try:
+                message = json.loads(body or b"{}") if parts[0] in ("lease", "fail") else {}
+            except ValueError:
+                message = None
+            if not isinstance(message, dict):
+                self._reply(400)
+                return
+            if parts == ["lease"]:
+                job = coordinator._lease(message.get("agent", self.client_address[0]))
+                if job == "closed":
+                    self._reply(410)
+                elif job is None:
+                    self._reply(204)
+                elif not self._reply(200, json.dumps(dict(job.params, id=job.id, attempt=job.attempt)).encode()):
+                    coordinator._complete(job.id, job.attempt, error="connection lost", retry=True)
+                return
+            if len(parts) != 3 or not parts[2].isdigit():
+                self._reply(404)
+                return
+            action, job_id, attempt = parts[0], parts[1], int(parts[2])
+            if action == "heartbeat":
+                ok = coordinator._heartbeat(job_id, attempt)
+            elif action == "result" and not body.startswith(b"DDS "):
+                # 不是 DDS 文件：不写入输出，交给别的代理重做
+                coordinator._complete(job_id, attempt, error="result is not a DDS file", retry=True)
+                self._reply(400)
+                return
+            elif action == "result":
+                ok = coordinator._complete(job_id, attempt, data=body)
+            elif action == "fail":
+                ok = coordinator._complete(job_id, attempt, error=message.get("error") or "Unknown error",
+                                           timed_out=message.get("timeout", False), retry=message.get("retry", False))
+            else:
+                self._reply(404)
+                return
+            self._reply(200 if ok else 410)
+
+    return Handler
+
+
+class Agent:
+    """代理：从协调端领取任务，下载源文件，用本机后端转换后上传结果。slots 为同时处理的任务数"""
+
+    def __init__(self, url, backend, slots=1, token=None, once=False, on_log=None):
+        self.url = url.rstrip("/")
+        self.backend = backend
+        self.slots = slots
+        self.token = token
+        self.once = once  # 协调端结束后退出，而不是等待下一次运行
+        self.on_log = on_log
+        self.name = f"{socket.gethostname()}-{os.getpid()}"
+        self._stop = threading.Event()
+        self._processes = ProcessGroup()
+
+    def _log(self, msg):
+        if self.on_log:
+            self.on_log(msg)
+
+    def _request(self, method, path, body=None, timeout=60):
+        headers = {TOKEN_HEADER: self.token} if self.token else {}
+        request = urllib.request.Request(self.url + path, data=body, method=method, headers=headers)
+        return urllib.request.urlopen(request, timeout=timeout)
+
+    def _post(self, path, body=b""):
+        with self._request("POST", path, body) as response:
+            return response.status
+
+    def run(self):
+        threads = [threading.Thread(target=self._slot, daemon=True) for _ in range(self.slots)]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.2)
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stop.set()
+        self._processes.kill_all()
+
+    def _slot(self):
+        connected = False
+        while not self._stop.is_set():
+            try:
+                with self._request("POST", "/lease", json.dumps({"agent": self.name}).encode(),
+                                   timeout=LEASE_POLL + 30) as response:
+                    lease = json.load(response) if response.status == 200 else None
+                connected = True
+            except urllib.error.HTTPError as e:
+                if e.code == 403:
+                    self._log("ERROR: coordinator rejected the token")
+                    self._stop.set()
+                    return
+                if e.code == 410 and self.once:
+                    self._stop.set()
+                    return
+                self._stop.wait(RETRY_DELAY)
+                continue
+            except (urllib.error.URLError, OSError):
+                if connected and self.once:
+                    self._stop.set()
+                    return
+                self._stop.wait(RETRY_DELAY)
+                continue
+            if lease is not None:
+                self._process(lease)
+
+    def _process(self, lease):
+        suffix = f"/{lease['id']}/{lease['attempt']}"
+        work = Path(tempfile.mkdtemp(prefix="ddsc_agent_"))
+        finished = threading.Event()
+        # 下载、转换、上传期间都发送心跳：大贴图的传输本身就可能超过租约时限
+        heartbeat = threading.Thread(target=self._heartbeat, args=(suffix, finished), daemon=True)
+        heartbeat.start()
+        try:
+            # 文件名来自网络，不能直接拼成路径，本地统一使用固定文件名
+            src = work / "source.dds"
+            with self._request("GET", f"/source/{lease['id']}") as response, open(src, "wb") as f:
+                shutil.copyfileobj(response, f, 1024 * 1024)
+            start = time.monotonic()
+            try:
+                data = self.backend.convert(src, None, lease["is_normal"], lease["resolution"],
+                                            timeout=lease["timeout"], processes=self._processes,
+                                            compression=lease["compression"])
+            except BackendError as e:
+                self._post(f"/fail{suffix}", json.dumps({"error": str(e)}).encode())
+                self._log(f"ERROR: {lease['name']}: {str(e).strip()}")
+                return
+            except subprocess.TimeoutExpired:
+                self._post(f"/fail{suffix}", json.dumps({"timeout": True}).encode())
+                self._log(f"TIMEOUT: {lease['name']}")
+                return
+            self._post(f"/result{suffix}", data)
+            self._log(f"{lease['name']} ({time.monotonic() - start:.2f}s)")
+        except Exception as e:
+            if self._stop.is_set():
+                return
+            if isinstance(e, urllib.error.HTTPError) and e.code in (404, 410):
+                # 任务已在协调端取消，或租约过期后已转给别的代理
+                self._log(f"⏭ {lease['name']}: no longer needed by the coordinator")
+                return
+            # 下载、上传或本机环境的问题，与贴图无关：交还协调端重新分配
+            try:
+                self._post(f"/fail{suffix}", json.dumps({"error": str(e), "retry": True}).encode())
+            except (urllib.error.URLError, OSError):
+                pass
+            self._log(f"EXCEPTION: {lease['name']}: {str(e)}")
+        finally:
+            finished.set()
+            shutil.rmtree(work, ignore_errors=True)
+
+    def _heartbeat(self, suffix, finished):
+        while not finished.wait(HEARTBEAT_INTERVAL):
+            try:
+                self._post(f"/heartbeat{suffix}")
+            except urllib.error.HTTPError:
+                return  # 任务已取消或已转给别的代理
+            except (urllib.error.URLError, OSError):
+                pass
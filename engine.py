@@ -0,0 +1,2444 @@
+"""DDS 压缩引擎：扫描输入、转换贴图、打包输出。不依赖 Qt，可被 GUI 和命令行共用。"""
+import sys
+import os
+import subprocess
+import threading
+from pathlib import Path
+from datetime import datetime
+import urllib.parse
+import tempfile
+import shutil
+import zipfile
+import json
+import locale
+import struct
+import hashlib
+import queue
+import zlib
+import bz2
+import mmap
+import re
+import configparser
+import fnmatch
+import heapq
+import signal
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+
+from languages import LANGUAGES
+
+# 可选：7z 支持
+try:
+    import py7zr
+    HAS_7Z = True
+except ImportError:
+    HAS_7Z = False
+
+# 可选：LZ4 支持（Skyrim SE 压缩 BSA）
+try:
+    import lz4.frame
+    HAS_LZ4 = True
+except ImportError:
+    HAS_LZ4 = False
+
+# 可选：Wand（ImageMagick 的 Python 绑定），用于进程内转换
+try:
+    from wand.image import Image as WandImage
+    HAS_WAND = True
+except ImportError:
+    HAS_WAND = False
+
+# ========== 辅助函数 ==========
+def get_unique_filename(base_name, extension=".zip"):
+    base_path = Path(base_name).with_suffix("")
+    candidate = base_path.with_suffix(extension)
+    counter = 0
+    while candidate.exists():
+        counter += 1
+        candidate = base_path.with_name(f"{base_path.name}_{counter}").with_suffix(extension)
+    return candidate
+
+MAGICK_ENV_VAR = "DDSCOMPRESSOR_MAGICK"
+MAGICK_EXE_NAME = "magick.exe" if sys.platform == "win32" else "magick"
+
+def find_imagemagick_from_registry():
+    if sys.platform != "win32":
+        return None
+    try:
+        import winreg
+        with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\ImageMagick\Current") as key:
+            path, _ = winreg.QueryValueEx(key, "BinPath")
+            magick_path = os.path.join(path, "magick.exe")
+            if os.path.isfile(magick_path):
+                return magick_path
+    except Exception:
+        pass
+    return None
+
+def find_imagemagick():
+    """依次查找：环境变量 DDSCOMPRESSOR_MAGICK / MAGICK_HOME、注册表（仅 Windows）、PATH"""
+    explicit = os.environ.get(MAGICK_ENV_VAR)
+    if explicit and os.path.isfile(explicit):
+        return explicit
+    magick_home = os.environ.get("MAGICK_HOME")
+    if magick_home and os.path.isfile(os.path.join(magick_home, MAGICK_EXE_NAME)):
+        return os.path.join(magick_home, MAGICK_EXE_NAME)
+    return find_imagemagick_from_registry() or shutil.which("magick")
+
+def is_normal_map(filepath: Path) -> bool:
+    stem = filepath.stem.lower()
+    return stem.endswith('_n') or stem.endswith('_msn')
+
+def default_worker_count():
+    """默认并行数：CPU 核心数"""
+    return os.cpu_count() or 1
+
+def total_physical_memory():
+    """物理内存字节数，无法获取时返回 None"""
+    if sys.platform == "win32":
+        import ctypes
+
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                        ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                        ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                        ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                        ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+        status = MEMORYSTATUSEX()
+        status.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return status.ullTotalPhys
+        return None
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def default_memory_budget():
+    """默认内存预算：物理内存的 60%，无法获取时按 8 GiB"""
+    total = total_physical_memory()
+    return int(total * 0.6) if total else 8 * 1024 ** 3
+
+def build_magick_args(is_normal, resolution, compression="auto"):
+    """构造 magick 的转换参数（不含输入输出路径）；compression 为 dds:compression 的取值"""
+    if is_normal:
+        # +filter 显式恢复默认滤镜：批量模式中 -filter 是持续设置，否则会沿用前一张漫反射贴图的 Lanczos
+        return ["-blur", "0x1.0", "+filter", f"{resolution}x{resolution}>", "-define", f"dds:compression={compression}"]
+    return ["-blur", "0x1.0", "-filter", "Lanczos", f"{resolution}x{resolution}>",
+            "-define", f"dds:compression={compression}"]
+
+MAGICK_TIMEOUT = 60  # 未指定时单张贴图的转换超时（秒）
+TICK_INTERVAL = 0.1  # 调度循环无任务完成时也按此间隔调用 on_tick
+# 按任务的预计耗时设定超时：预计耗时的若干倍，并限制在下限与上限之间
+TIMEOUT_FACTOR = 5
+DEFAULT_TIMEOUT_FLOOR = 10
+DEFAULT_TIMEOUT_CEILING = 900
+
+# 批量模式：每张贴图写完后用 -print 输出标记，据此判断逐个文件的完成情况
+BATCH_MARKER = "DDSC_DONE"
+BATCH_MARKER_RE = re.compile(rb"DDSC_DONE (\d+);")
+BATCH_MAX_PIXELS = 2048 * 2048  # 只批量处理小贴图，大贴图本身的耗时远大于进程启动
+
+class Cancelled(Exception):
+    """转换已被取消，不再启动新的子进程"""
+
+def kill_process_tree(proc):
+    """终止子进程及其派生的进程（如 magick 调用的委托程序）"""
+    if proc.poll() is not None:
+        return
+    try:
+        if sys.platform == "win32":
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)], capture_output=True,
+                           creationflags=subprocess.CREATE_NO_WINDOW)
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except (OSError, subprocess.SubprocessError):
+        pass
+    try:
+        proc.kill()
+    except OSError:
+        pass
+
+class ProcessGroup:
+    """登记正在运行的 magick 子进程。每个子进程在独立的进程组中启动，
+    取消时整组终止，正在转换的大贴图不必等到超时"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._procs = set()
+        self.cancelled = False
+
+    def popen(self, cmd, **kwargs):
+        if sys.platform == "win32":
+            kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW | subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs["start_new_session"] = True
+        if self.cancelled:
+            raise Cancelled()
+        proc = subprocess.Popen(cmd, **kwargs)
+        with self._lock:
+            self._procs.add(proc)
+            cancelled = self.cancelled
+        if cancelled:
+            # 启动的同时被取消
+            kill_process_tree(proc)
+        return proc
+
+    def discard(self, proc):
+        with self._lock:
+            self._procs.discard(proc)
+
+    def kill_all(self):
+        with self._lock:
+            self.cancelled = True
+            procs = list(self._procs)
+        for proc in procs:
+            kill_process_tree(proc)
+
+def run_magick_batch(cmd, timeouts, processes=None):
+    """运行批量 magick 命令，每张贴图单独计时：第 i 张超过 timeouts[i] 秒没有完成标记即视为超时。
+    返回 (完成序号 -> 耗时, 是否超时, 返回码, stderr)"""
+    processes = processes or ProcessGroup()
+    proc = processes.popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    markers = queue.Queue()
+    stderr_chunks = []
+
+    def read_stdout():
+        buffer = b""
+        for chunk in iter(lambda: proc.stdout.read1(4096), b""):
+            buffer += chunk
+            end = 0
+            for match in BATCH_MARKER_RE.finditer(buffer):
+                markers.put(int(match.group(1)))
+                end = match.end()
+            buffer = buffer[end:][-64:]
+        markers.put(None)
+
+    readers = [threading.Thread(target=read_stdout, daemon=True),
+               threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)]
+    for reader in readers:
+        reader.start()
+
+    done = {}
+    timed_out = False
+    last = time.monotonic()
+    while True:
+        # 标记按顺序输出，下一张就是已完成序号的下一个
+        timeout = timeouts[min(max(done, default=-1) + 1, len(timeouts) - 1)]
+        try:
+            index = markers.get(timeout=max(0.0, last + timeout - time.monotonic()))
+        except queue.Empty:
+            timed_out = True
+            kill_process_tree(proc)
+            break
+        if index is None:
+            break
+        now = time.monotonic()
+        done.setdefault(index, now - last)
+        last = now
+    proc.wait()
+    processes.discard(proc)
+    for reader in readers:
+        reader.join()
+    return done, timed_out, proc.returncode, b"".join(stderr_chunks)
+
+def decode_stderr(raw):
+    """安全解码 magick 的 stderr 输出"""
+    if not raw:
+        return ""
+    try:
+        # 尝试用UTF-8解码，失败时用系统默认编码
+        return raw.decode('utf-8', errors='replace')
+    except UnicodeDecodeError:
+        try:
+            # 获取系统默认编码
+            default_encoding = locale.getpreferredencoding()
+            return raw.decode(default_encoding, errors='replace')
+        except:
+            return raw.decode('latin1', errors='replace')
+
+# ========== 追踪 ==========
+class Tracer:
+    """记录各阶段和每个文件的耗时区间（含工作线程、文件大小、尺寸、结果），
+    可导出为 Chrome trace-event JSON（chrome://tracing、Perfetto）或 JSONL。未启用时不记录任何内容。"""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._events = []
+        self._threads = {}  # 线程 ident -> (tid, 线程名)
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    @staticmethod
+    def now():
+        return time.perf_counter()
+
+    def add(self, name, cat, start, end, **args):
+        """记录一个已结束的区间，start / end 为 now() 的返回值"""
+        if not self.enabled:
+            return
+        ident = threading.get_ident()
+        with self._lock:
+            if ident not in self._threads:
+                self._threads[ident] = (len(self._threads), threading.current_thread().name)
+            self._events.append({"name": name, "cat": cat, "ph": "X",
+                                 "ts": round((start - self._origin) * 1e6),
+                                 "dur": round(max(0.0, end - start) * 1e6),
+                                 "pid": os.getpid(), "tid": self._threads[ident][0], "args": args})
+
+    @contextmanager
+    def span(self, name, cat="stage", **args):
+        """with 块形式的区间，块内可往返回的 dict 里补充参数"""
+        start = time.perf_counter()
+        try:
+            yield args
+        finally:
+            self.add(name, cat, start, time.perf_counter(), **args)
+
+    def export(self, path: Path):
+        """按扩展名导出：.jsonl 每行一个区间，其他为 Chrome trace-event JSON"""
+        path = Path(path)
+        with self._lock:
+            events = list(self._events)
+            threads = {tid: name for tid, name in self._threads.values()}
+        with open(path, "w", encoding="utf-8") as f:
+            if path.suffix.lower() == ".jsonl":
+                for e in sorted(events, key=lambda e: e["ts"]):
+                    record = {"name": e["name"], "cat": e["cat"], "start": e["ts"] / 1e6,
+                              "duration": e["dur"] / 1e6, "worker": threads[e["tid"]], **e["args"]}
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            else:
+                pid = os.getpid()
+                metadata = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                            for tid, name in threads.items()]
+                json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+
+NULL_TRACER = Tracer(enabled=False)
+
+# ========== 转换后端 ==========
+class BackendError(Exception):
+    """后端转换失败，消息即日志中的错误说明"""
+
+class ConversionBackend:
+    """转换后端接口：模糊 + 缩小到目标分辨率以内，并以指定的 dds:compression 编码"""
+    name = ""
+    in_process = False  # 进程内后端在原生代码中释放 GIL，线程池即可并行
+    supports_batch = False
+    runs_locally = True  # 为 False 时转换在其他机器上执行，本机不按内存估算限流
+
+    def convert(self, src: Path, dst, is_normal, resolution, timeout=MAGICK_TIMEOUT, processes=None,
+                compression="auto"):
+        """dst 为 None 时返回 DDS 字节；compression 为输出编码（dxt1 / dxt5 / none / auto）；失败抛出 BackendError，超时抛出 subprocess.TimeoutExpired。
+        子进程登记在 processes（ProcessGroup）中，取消时由调用方整组终止"""
+        raise NotImplementedError
+
+class MagickCLIBackend(ConversionBackend):
+    """每张贴图启动一次 magick 可执行文件"""
+    name = "magick"
+    supports_batch = True
+
+    def __init__(self, magick_exec):
+        self.magick_exec = magick_exec
+
+    def convert(self, src, dst, is_normal, resolution, timeout=MAGICK_TIMEOUT, processes=None,
+                compression="auto"):
+        cmd = [self.magick_exec, str(src)] + build_magick_args(is_normal, resolution, compression)
+        cmd.append(str(dst) if dst is not None else "dds:-")
+        processes = processes or ProcessGroup()
+        # 不使用text=True，手动处理编码
+        proc = processes.popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            kill_process_tree(proc)
+            proc.communicate()
+            raise
+        finally:
+            processes.discard(proc)
+        if proc.returncode != 0:
+            # 安全截取错误信息，确保不会因NoneType出错
+            stderr_text = decode_stderr(stderr)
+            raise BackendError(stderr_text[:200] if stderr_text else "Unknown error")
+        return stdout if dst is None else None
+
+class WandBackend(ConversionBackend):
+    """通过 Wand 在进程内调用 MagickCore，省去进程创建和 stderr 解码"""
+    name = "wand"
+    in_process = True
+
+    def convert(self, src, dst, is_normal, resolution, timeout=MAGICK_TIMEOUT, processes=None,
+                compression="auto"):
+        # 进程内转换无法中途终止，timeout 和 processes 仅为接口一致而保留
+        res = int(resolution)
+        try:
+            with WandImage(filename=str(src)) as img:
+                img.blur(radius=0, sigma=1.0)
+                # 等价于 "{res}x{res}>"：只缩小、保持宽高比；法线贴图与命令行一样不指定滤镜
+                if img.width > res or img.height > res:
+                    scale = min(res / img.width, res / img.height)
+                    img.resize(max(1, round(img.width * scale)), max(1, round(img.height * scale)),
+                               filter="undefined" if is_normal else "lanczos")
+                img.options["dds:compression"] = compression
+                img.format = "dds"
+                if dst is None:
+                    return img.make_blob()
+                img.save(filename=str(dst))
+        except Exception as e:
+            raise BackendError(str(e)[:200]) from e
+        return None
+
+BACKENDS = ("magick", "wand")
+
+def create_backend(name, magick_exec=None):
+    """按名称创建转换后端；依赖缺失时抛出 RuntimeError"""
+    if name == "wand":
+        if not HAS_WAND:
+            raise RuntimeError("Wand is not installed (pip install Wand)")
+        return WandBackend()
+    if name == "magick":
+        return MagickCLIBackend(magick_exec)
+    raise ValueError(f"Unknown backend: {name}")
+
+def safe_member_path(name: str):
+    """把压缩包成员名规范为 "/" 分隔的相对路径；绝对路径、带盘符或含 ".." 的返回 None，
+    这些成员拼接到临时目录或输出目录后会落到目录之外"""
+    name = name.replace("\\", "/")
+    if name.startswith("/") or re.match(r"[A-Za-z]:", name):
+        return None
+    parts = [part for part in name.split("/") if part not in ("", ".")]
+    if not parts or ".." in parts:
+        return None
+    return "/".join(parts)
+
+def list_archive_members(archive_path: Path):
+    """列出 .zip / .7z 中的 .dds 成员（不解压），返回 {相对路径: (成员名, 指纹)}"""
+    suffix = archive_path.suffix.lower()
+    entries = []
+    try:
+        if suffix == '.zip':
+            with zipfile.ZipFile(archive_path, 'r') as zf:
+                for info in zf.infolist():
+                    if not info.is_dir():
+                        entries.append((info.filename, {"size": info.file_size, "crc": info.CRC}))
+        elif suffix == '.7z':
+            if not HAS_7Z:
+                raise RuntimeError("py7zr not installed. Run: pip install py7zr")
+            with py7zr.SevenZipFile(archive_path, mode='r') as z:
+                for info in z.list():
+                    if not info.is_directory:
+                        entries.append((info.filename, {"size": info.uncompressed, "crc": info.crc32}))
+        else:
+            return {}  # 不支持
+    except Exception as e:
+        raise RuntimeError(f"Failed to read {archive_path}: {e}")
+
+    # 不安全的成员名直接忽略
+    names = [(safe_member_path(original), original, fp) for original, fp in entries]
+    names = [entry for entry in names if entry[0] is not None]
+    # 与解压到文件夹时的规则一致：顶层全是文件夹时，以各顶层文件夹为根；
+    # 顶层有散落文件时，以压缩包根目录为根
+    flat = any("/" not in name for name, _, _ in names)
+    members = {}
+    for name, original, fp in names:
+        if not name.lower().endswith(".dds"):
+            continue
+        rel = name if flat else name.split("/", 1)[1]
+        members[rel] = (original, fp)
+    return members
+
+def extract_7z_members(archive_path: Path, targets, work_dir: Path):
+    """一次性只解压选中的 .7z 成员到各自的目标路径（固实压缩无法高效地逐个随机读取）"""
+    if not targets:
+        return
+    if not HAS_7Z:
+        raise RuntimeError("py7zr not installed. Run: pip install py7zr")
+    staging = Path(tempfile.mkdtemp(dir=work_dir))
+    try:
+        with py7zr.SevenZipFile(archive_path, mode='r') as z:
+            z.extract(path=staging, targets=list(targets))
+        for member, dest in targets.items():
+            extracted = staging / member
+            if extracted.exists():
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(extracted, dest)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+class ZipReader:
+    """按需读取 ZIP 成员；多个转换线程共享同一个 ZipFile"""
+
+    def __init__(self, path: Path):
+        self._zf = zipfile.ZipFile(path, "r")
+        self._lock = threading.Lock()
+
+    def _open(self, member):
+        with self._lock:
+            return self._zf.open(member)
+
+    def read_head(self, member, size):
+        with self._open(member) as f:
+            return f.read(size)
+
+    def extract(self, member, dest: Path):
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        with self._open(member) as fsrc, open(dest, "wb") as fdst:
+            shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+
+    def close(self):
+        self._zf.close()
+
+# ========== Bethesda BSA ==========
+BSA_MAGIC = b"BSA\0"
+BSA_INCLUDE_DIRECTORY_NAMES = 0x1
+BSA_INCLUDE_FILE_NAMES = 0x2
+BSA_COMPRESSED = 0x4
+BSA_EMBED_FILE_NAMES = 0x100
+BSA_SIZE_COMPRESS_TOGGLE = 0x40000000
+BSA_SIZE_MASK = 0x3FFFFFFF
+
+class BSAArchive:
+    """Bethesda BSA（Oblivion 103、Skyrim LE/Fallout 3/NV 104、Skyrim SE 105）的只读访问。
+    通过内存映射读取目录和数据，只在需要时解压单个文件。"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        self.files = {}  # "textures/x/y.dds" -> (offset, size, compressed)
+        try:
+            self._parse()
+        except Exception:
+            self.close()
+            raise
+
+    def _parse(self):
+        mm = self._mm
+        (magic, self.version, folder_offset, self.flags, folder_count, file_count,
+         _, file_names_length, _) = struct.unpack_from("<4s8I", mm, 0)
+        if magic != BSA_MAGIC or self.version not in (103, 104, 105):
+            raise ValueError(f"Unsupported BSA: {self.path.name}")
+        if not self.flags & BSA_INCLUDE_DIRECTORY_NAMES or not self.flags & BSA_INCLUDE_FILE_NAMES:
+            raise ValueError(f"BSA without file names is not supported: {self.path.name}")
+
+        folder_record_size = 24 if self.version == 105 else 16
+        counts = [struct.unpack_from("<I", mm, folder_offset + i * folder_record_size + 8)[0]
+                  for i in range(folder_count)]
+        pos = folder_offset + folder_count * folder_record_size
+        records = []
+        for count in counts:
+            name_length = mm[pos]
+            folder = bytes(mm[pos + 1:pos + name_length]).rstrip(b"\0").decode("cp1252")
+            pos += 1 + name_length
+            for _ in range(count):
+                _, size, offset = struct.unpack_from("<QII", mm, pos)
+                records.append((folder, size, offset))
+                pos += 16
+        names = bytes(mm[pos:pos + file_names_length]).split(b"\0")[:file_count]
+
+        default_compressed = bool(self.flags & BSA_COMPRESSED)
+        for (folder, size, offset), name in zip(records, names):
+            path = f"{folder}\\{name.decode('cp1252')}".replace("\\", "/").strip("/")
+            compressed = default_compressed != bool(size & BSA_SIZE_COMPRESS_TOGGLE)
+            self.files[path] = (offset, size & BSA_SIZE_MASK, compressed)
+
+    def raw(self, name):
+        """返回文件数据区（跳过内嵌文件名）的 memoryview，不复制"""
+        offset, size, compressed = self.files[name]
+        view = memoryview(self._mm)[offset:offset + size]
+        if self.version >= 104 and self.flags & BSA_EMBED_FILE_NAMES:
+            skip = view[0] + 1
+            view = view[skip:]
+        return view, compressed
+
+    def _decompressor(self):
+        if self.version == 105:
+            if not HAS_LZ4:
+                raise RuntimeError("lz4 not installed. Run: pip install lz4")
+            return lz4.frame.LZ4FrameDecompressor()
+        return zlib.decompressobj()
+
+    def read_head(self, name, size):
+        view, compressed = self.raw(name)
+        if not compressed:
+            return bytes(view[:size])
+        # 只解压到所需长度为止
+        return self._decompressor().decompress(view[4:], size)
+
+    def read(self, name):
+        view, compressed = self.raw(name)
+        if not compressed:
+            return bytes(view)
+        return self._decompressor().decompress(view[4:])
+
+    def extract(self, name, dest: Path):
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        view, compressed = self.raw(name)
+        with open(dest, "wb") as f:
+            if compressed:
+                f.write(self._decompressor().decompress(view[4:]))
+            else:
+                f.write(view)
+
+    def digest(self, name):
+        """成员原始数据的 SHA-1（BSA 不记录 CRC）"""
+        view, _ = self.raw(name)
+        return hashlib.sha1(view).hexdigest()
+
+    def close(self):
+        if getattr(self, "_mm", None) is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass  # 仍有 memoryview 未释放，交给垃圾回收
+        self._file.close()
+
+def list_bsa_members(bsa: BSAArchive):
+    """BSA 中的 .dds 文件，路径已是相对于 Data 的完整路径；不安全的路径忽略"""
+    members = {}
+    for name in bsa.files:
+        rel = safe_member_path(name)
+        if rel is not None and rel.lower().endswith(".dds"):
+            members[rel] = (name, None)
+    return members
+
+def safe_archive_name(source_path: Path) -> str:
+    return "".join(c if c.isalnum() or c in "._-" else "_" for c in source_path.stem)
+
+ARCHIVE_CODECS = ("stored", "deflate", "bzip2", "lzma2")
+
+class ArchiveSink:
+    """压缩包输出：转换结果一产生就交给唯一的写入线程，按到达顺序追加到各自的压缩包。
+    成员的压缩（prepare）在各转换线程中并行完成，写入线程只负责追加。"""
+    extension = ".zip"
+    tracer = NULL_TRACER
+
+    def __init__(self, output_dir: Path, level=None):
+        self.output_dir = output_dir
+        self.level = level
+        self.archives = {}  # safe_name -> (archive_path, archive)
+        self._queue = queue.Queue(maxsize=64)
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    def prepare(self, arcname, data):
+        """在调用线程中压缩成员数据，返回交给 put 的负载"""
+        return data
+
+    def put(self, safe_name, arcname, payload) -> Future:
+        """排队写入一个成员，返回的 Future 在写入完成（或失败）时结束"""
+        future = Future()
+        self._queue.put((safe_name, arcname, payload, future))
+        return future
+
+    def _open(self, path: Path):
+        raise NotImplementedError
+
+    def _append(self, archive, arcname, payload):
+        raise NotImplementedError
+
+    def _archive(self, safe_name):
+        if safe_name not in self.archives:
+            path = get_unique_filename(str(self.output_dir / (safe_name + "_low_res")), self.extension)
+            self.archives[safe_name] = (path, self._open(path))
+        return self.archives[safe_name][1]
+
+    def _writer(self):
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                break
+            safe_name, arcname, payload, future = entry
+            start = self.tracer.now()
+            try:
+                self._append(self._archive(safe_name), arcname, payload)
+                future.set_result(None)
+            except Exception as e:
+                future.set_exception(e)
+            self.tracer.add("archive_append", "package", start, self.tracer.now(), member=arcname)
+
+    def close(self):
+        """等待队列写完并关闭所有压缩包，返回已创建的文件路径"""
+        self._queue.put(None)
+        self._thread.join()
+        created = []
+        for path, archive in self.archives.values():
+            archive.close()
+            created.append(path)
+        return created
+
+class ZipSink(ArchiveSink):
+    """ZIP 输出，支持 stored / deflate / bzip2"""
+    COMPRESS_TYPES = {"stored": zipfile.ZIP_STORED, "deflate": zipfile.ZIP_DEFLATED, "bzip2": zipfile.ZIP_BZIP2}
+
+    def __init__(self, output_dir: Path, codec="stored", level=None):
+        if codec not in self.COMPRESS_TYPES:
+            raise ValueError(f"Unsupported ZIP codec: {codec}" + (" (use 7z output)" if codec == "lzma2" else ""))
+        self.codec = codec
+        super().__init__(output_dir, level)
+
+    def prepare(self, arcname, data):
+        # zlib / bz2 在压缩时会释放 GIL，因此多个转换线程可以真正并行压缩
+        if self.codec == "deflate":
+            level = 6 if self.level is None else self.level
+            compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+            compressed = compressor.compress(data) + compressor.flush()
+        elif self.codec == "bzip2":
+            compressed = bz2.compress(data, 9 if self.level is None else max(1, self.level))
+        else:
+            compressed = data
+        zinfo = zipfile.ZipInfo(arcname, datetime.now().timetuple()[:6])
+        zinfo.compress_type = self.COMPRESS_TYPES[self.codec]
+        zinfo.external_attr = 0o644 << 16
+        zinfo.file_size = len(data)
+        zinfo.compress_size = len(compressed)
+        zinfo.CRC = zlib.crc32(data)
+        return zinfo, compressed
+
+    def _open(self, path):
+        return RawZipWriter(path)
+
+    def _append(self, writer, arcname, payload):
+        writer.write(*payload)
+
+class RawZipWriter:
+    """按 ZIP 规范直接写入已压缩好的成员（本地文件头 + 数据，关闭时写中央目录）。
+    zipfile 没有写入预压缩数据的公开接口，这里只读取 ZipInfo 的公开属性，不改动 ZipFile 的内部状态。
+    偏移或成员数超过 32 位 / 16 位上限时写 ZIP64 记录"""
+    ZIP64_LIMIT = 0xFFFFFFFF  # 超过即改用 ZIP64 记录，原字段写 0xFFFFFFFF
+
+    def __init__(self, path):
+        self.fp = open(path, "wb")
+        self.entries = []  # (ZipInfo, 本地文件头偏移)
+
+    @staticmethod
+    def _dos_time(date_time):
+        year, month, day, hour, minute, second = date_time
+        return (hour << 11 | minute << 5 | second // 2), ((year - 1980) << 9 | month << 5 | day)
+
+    @staticmethod
+    def _name(zinfo):
+        try:
+            return zinfo.filename.encode("ascii"), 0
+        except UnicodeEncodeError:
+            return zinfo.filename.encode("utf-8"), 0x800  # 通用标志位 11：文件名为 UTF-8
+
+    @staticmethod
+    def _version(zinfo):
+        return 46 if zinfo.compress_type == zipfile.ZIP_BZIP2 else 20
+
+    def write(self, zinfo, compressed):
+        if zinfo.file_size > 0xFFFFFFFF or len(compressed) > 0xFFFFFFFF:
+            raise ValueError(f"{zinfo.filename}: member larger than 4 GB")
+        offset = self.fp.tell()
+        name, flags = self._name(zinfo)
+        dos_time, dos_date = self._dos_time(zinfo.date_time)
+        self.fp.write(struct.pack("<IHHHHHIIIHH", 0x04034B50, self._version(zinfo), flags, zinfo.compress_type,
+                                  dos_time, dos_date, zinfo.CRC, len(compressed), zinfo.file_size, len(name), 0))
+        self.fp.write(name)
+        self.fp.write(compressed)
+        self.entries.append((zinfo, offset))
+
+    def close(self):
+        if self.fp is None:
+            return
+        fp = self.fp
+        start = fp.tell()
+        for zinfo, offset in self.entries:
+            name, flags = self._name(zinfo)
+            dos_time, dos_date = self._dos_time(zinfo.date_time)
+            extra = b""
+            if offset > self.ZIP64_LIMIT:
+                extra = struct.pack("<HHQ", 0x0001, 8, offset)
+                offset = 0xFFFFFFFF
+            version = 45 if extra else self._version(zinfo)
+            fp.write(struct.pack("<IHHHHHHIIIHHHHHII", 0x02014B50, 3 << 8 | version, version, flags,
+                                 zinfo.compress_type, dos_time, dos_date, zinfo.CRC, zinfo.compress_size,
+                                 zinfo.file_size, len(name), len(extra), 0, 0, 0, zinfo.external_attr, offset))
+            fp.write(name)
+            fp.write(extra)
+        end = fp.tell()
+        count, size = len(self.entries), end - start
+        if count >= 0xFFFF or start > self.ZIP64_LIMIT or size > self.ZIP64_LIMIT:
+            # ZIP64 中央目录结束记录及其定位器
+            fp.write(struct.pack("<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0, count, count, size, start))
+            fp.write(struct.pack("<IIQI", 0x07064B50, 0, end, 1))
+            count, size, start = min(count, 0xFFFF), 0xFFFFFFFF, 0xFFFFFFFF
+        fp.write(struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, count, count, size, start, 0))
+        fp.close()
+        self.fp = None
+
+class SevenZipSink(ArchiveSink):
+    """7z (LZMA2) 输出，依赖可选的 py7zr；py7zr 不接受预压缩数据，压缩在写入线程中进行"""
+    extension = ".7z"
+
+    def __init__(self, output_dir: Path, level=None):
+        if not HAS_7Z:
+            raise RuntimeError("py7zr not installed. Run: pip install py7zr")
+        super().__init__(output_dir, level)
+
+    def _open(self, path):
+        preset = 6 if self.level is None else self.level
+        return py7zr.SevenZipFile(path, 'w', filters=[{"id": py7zr.FILTER_LZMA2, "preset": preset}])
+
+    def _append(self, archive, arcname, payload):
+        archive.writestr(payload, arcname)
+
+def create_archive_sink(output_method, output_dir: Path, codec="stored", level=None):
+    # lzma2 只对应 7z 输出；-o zip 时由 ZipSink 拒绝，不再悄悄改写成 .7z
+    if output_method == "7z":
+        return SevenZipSink(output_dir, level)
+    return ZipSink(output_dir, codec, level)
+
+# ========== DDS 文件头 ==========
+DDS_MAGIC = b"DDS "
+DDS_HEADER_SIZE = 128        # "DDS " + DDS_HEADER
+DDS_DX10_HEADER_SIZE = 148   # 再加上 DDS_HEADER_DXT10
+DDPF_ALPHAPIXELS = 0x1
+DDPF_FOURCC = 0x4
+DDPF_RGB = 0x40
+DDPF_LUMINANCE = 0x20000
+DDSCAPS2_CUBEMAP = 0x200
+DDSCAPS2_VOLUME = 0x200000
+
+# FourCC -> 统一格式名
+FOURCC_FORMATS = {
+    b"DXT1": "BC1", b"DXT2": "BC2", b"DXT3": "BC2", b"DXT4": "BC3", b"DXT5": "BC3",
+    b"ATI1": "BC4", b"BC4U": "BC4", b"BC4S": "BC4",
+    b"ATI2": "BC5", b"BC5U": "BC5", b"BC5S": "BC5",
+}
+
+# DXGI_FORMAT -> 统一格式名
+DXGI_FORMATS = {
+    2: "RGBA32F", 10: "RGBA16F", 24: "RGB10A2",
+    27: "RGBA8", 28: "RGBA8", 29: "RGBA8",
+    49: "RG8", 61: "R8", 65: "A8",
+    70: "BC1", 71: "BC1", 72: "BC1",
+    73: "BC2", 74: "BC2", 75: "BC2",
+    76: "BC3", 77: "BC3", 78: "BC3",
+    79: "BC4", 80: "BC4", 81: "BC4",
+    82: "BC5", 83: "BC5", 84: "BC5",
+    87: "BGRA8", 88: "BGRX8", 90: "BGRA8", 91: "BGRA8", 92: "BGRX8", 93: "BGRX8",
+    94: "BC6H", 95: "BC6H", 96: "BC6H",
+    97: "BC7", 98: "BC7", 99: "BC7",
+}
+
+# 块压缩格式每 4x4 块的字节数
+BLOCK_BYTES = {"BC1": 8, "BC4": 8, "BC2": 16, "BC3": 16, "BC5": 16, "BC6H": 16, "BC7": 16}
+
+# 非压缩 DXGI 格式的每像素位数
+DXGI_BITS_PER_PIXEL = {
+    "RGBA32F": 128, "RGBA16F": 64, "RGB10A2": 32, "RGBA8": 32, "BGRA8": 32, "BGRX8": 32,
+    "RG8": 16, "R8": 8, "A8": 8,
+}
+
+def parse_dds_header(data: bytes):
+    """解析 DDS 文件头（至少 128 字节，DX10 需要 148 字节），非 DDS 返回 None"""
+    if len(data) < DDS_HEADER_SIZE or data[:4] != DDS_MAGIC:
+        return None
+    (height, width, pitch, depth, mip_count) = struct.unpack_from("<5I", data, 12)
+    pf_flags, fourcc, rgb_bits = struct.unpack_from("<I4sI", data, 80)
+    alpha_mask = struct.unpack_from("<I", data, 104)[0]
+    caps2 = struct.unpack_from("<I", data, 112)[0]
+
+    header_size = DDS_HEADER_SIZE
+    array_size = 1
+    bits_per_pixel = 0
+    if pf_flags & DDPF_FOURCC:
+        if fourcc == b"DX10":
+            if len(data) < DDS_DX10_HEADER_SIZE:
+                return None
+            dxgi_format, _, misc_flag, array_size = struct.unpack_from("<4I", data, 128)
+            header_size = DDS_DX10_HEADER_SIZE
+            fmt = DXGI_FORMATS.get(dxgi_format, f"DXGI_{dxgi_format}")
+            bits_per_pixel = DXGI_BITS_PER_PIXEL.get(fmt, 0)
+            if misc_flag & 0x4:  # D3D11_RESOURCE_MISC_TEXTURECUBE
+                caps2 |= DDSCAPS2_CUBEMAP
+        else:
+            fmt = FOURCC_FORMATS.get(fourcc, fourcc.decode("latin1", errors="replace").strip("\0 "))
+    elif pf_flags & (DDPF_RGB | DDPF_LUMINANCE):
+        bits_per_pixel = rgb_bits
+        has_alpha = bool(pf_flags & DDPF_ALPHAPIXELS and alpha_mask)
+        if pf_flags & DDPF_LUMINANCE:
+            fmt = f"L{rgb_bits}"
+        elif rgb_bits == 32:
+            fmt = "RGBA8" if has_alpha else "RGBX8"
+        elif rgb_bits == 24:
+            fmt = "RGB8"
+        else:
+            fmt = f"RGB{rgb_bits}"
+    else:
+        fmt = "UNKNOWN"
+
+    block_bytes = BLOCK_BYTES.get(fmt, 0)
+    return {
+        "width": width,
+        "height": height,
+        "depth": depth if caps2 & DDSCAPS2_VOLUME else 1,
+        "mip_count": max(1, mip_count),
+        "format": fmt,
+        "block_bytes": block_bytes,
+        "bits_per_pixel": bits_per_pixel,
+        "header_size": header_size,
+        "is_cubemap": bool(caps2 & DDSCAPS2_CUBEMAP),
+        "array_size": max(1, array_size),
+    }
+
+def read_dds_header(path: Path):
+    """只读取文件开头 148 字节解析 DDS 头，失败返回 None"""
+    try:
+        with open(path, "rb") as f:
+            return parse_dds_header(f.read(DDS_DX10_HEADER_SIZE))
+    except OSError:
+        return None
+
+def needs_downscale(info, resolution) -> bool:
+    """贴图是否大于目标分辨率（无法解析头时按需要处理）"""
+    if not info:
+        return True
+    return max(info["width"], info["height"]) > int(resolution)
+
+def dds_level_size(info, width, height):
+    """单个 mip 层的数据字节数"""
+    if info["block_bytes"]:
+        return max(1, (width + 3) // 4) * max(1, (height + 3) // 4) * info["block_bytes"]
+    return (width * info["bits_per_pixel"] + 7) // 8 * height
+
+def mip_truncation_level(info, resolution, exact=True):
+    """目标分辨率恰好是源贴图的 2 的幂次缩小且已有对应 mip 层时，返回该层级，否则返回 None。
+    exact=False 时取不超过目标分辨率的最大一层（用于 magick 无法编码的格式）"""
+    if not info or info["mip_count"] < 2:
+        return None
+    if info["is_cubemap"] or info["depth"] > 1 or info["array_size"] > 1:
+        return None
+    if not info["block_bytes"] and not info["bits_per_pixel"]:
+        return None
+    res = int(resolution)
+    longest = max(info["width"], info["height"])
+    if longest <= res:
+        return None
+    if exact:
+        if longest % res:
+            return None
+        ratio = longest // res
+        if ratio & (ratio - 1):
+            return None
+        level = ratio.bit_length() - 1
+    else:
+        level = 0
+        while longest >> level > res:
+            level += 1
+    if level >= info["mip_count"]:
+        return None
+    return level
+
+def truncate_dds_mips(src: Path, info, level):
+    """复制 level 及以下的 mip 层并改写文件头，得到缩小后的 DDS（不重新编码）"""
+    dims = []
+    w, h = info["width"], info["height"]
+    for _ in range(info["mip_count"]):
+        dims.append((w, h))
+        w, h = max(1, w // 2), max(1, h // 2)
+    sizes = [dds_level_size(info, lw, lh) for lw, lh in dims]
+    offset = info["header_size"] + sum(sizes[:level])
+    length = sum(sizes[level:])
+
+    with open(src, "rb") as f:
+        header = bytearray(f.read(info["header_size"]))
+        f.seek(offset)
+        data = f.read(length)
+    if len(data) < length:
+        raise ValueError("DDS data shorter than its mip chain")
+
+    new_w, new_h = dims[level]
+    flags = struct.unpack_from("<I", header, 8)[0]
+    if flags & 0x8:  # DDSD_PITCH
+        pitch = (new_w * info["bits_per_pixel"] + 7) // 8
+    else:            # DDSD_LINEARSIZE
+        pitch = sizes[level]
+    struct.pack_into("<3I", header, 12, new_h, new_w, pitch)
+    struct.pack_into("<I", header, 28, info["mip_count"] - level)
+    return bytes(header) + data
+
+# ========== 输出编码选择 ==========
+# magick 的 DDS 编码器只能写 DXT1 / DXT5 / 非压缩。按源格式直接指定编码，省去 compression=auto 的分析，
+# 也避免把不透明的贴图编码成两倍大小的 DXT5
+OPAQUE_FORMATS = {"RGBX8", "BGRX8", "RGB8"}               # 没有 alpha 通道
+# alpha 全部不透明时可降为 DXT1；BC1 的 3 色块可含 1 位镂空 alpha（植被、镂空贴图常见）
+ALPHA_FORMATS = {"BC1", "BC2", "BC3", "BC7", "RGBA8", "BGRA8"}
+# magick 无法编码、重新编码会损坏的格式（BC5 法线的双通道、BC6H 的 HDR 等）：只截取 mip 层或保留原文件
+KEEP_FORMATS = {"BC4", "BC5", "BC6H"}
+# BC3 的 6 值模式中，索引 6 固定为 alpha 0
+_BC3_INDEX_SIX = bytes.fromhex("b66ddbb66ddb0000")      # 16 个 3 位组均为 110
+_BC3_GROUP_LOW = bytes.fromhex("4992244992240000")      # 每个 3 位组的最低位
+
+def keeps_source_format(info, is_normal) -> bool:
+    """源格式 magick 写不出来，应保留原编码（BC7 法线贴图同样保留）"""
+    if not info:
+        return False
+    return info["format"] in KEEP_FORMATS or (is_normal and info["format"] == "BC7")
+
+def _bc3_opaque(data):
+    a0, a1 = data[0::16], data[1::16]
+    if not a0 or min(a0) < 255 or min(a1) < 255:
+        return not a0
+    # 两个端点都是 255 即处于 6 值模式，只有索引 6 会产生透明像素。
+    # 把所有块的 48 位索引按 64 位对齐拼成一个大整数，与 110 模式异或后检查是否有全零的 3 位组
+    indices = bytearray(len(a0) * 8)
+    for k in range(6):
+        indices[k::8] = data[2 + k::16]
+    x = int.from_bytes(indices, "little") ^ int.from_bytes(_BC3_INDEX_SIX * len(a0), "little")
+    y = x | (x >> 1) | (x >> 2)
+    return not (int.from_bytes(_BC3_GROUP_LOW * len(a0), "little") & ~y)
+
+def _bc1_opaque(data):
+    # c0 <= c1 的块处于 3 色模式，索引 3 为透明黑。与 _bc3_opaque 相同，把各块的字段按 32 位对齐拼成大整数：
+    # 每组 0x10000 + c1 - c0 不会向相邻组借位，第 16 位为 1 即 c0 <= c1；再与索引中 11 组的位置求交
+    n = len(data) // 8
+    c0, c1, indices = bytearray(n * 4), bytearray(n * 4), bytearray(n * 4)
+    c0[0::4], c0[1::4] = data[0::8], data[1::8]
+    c1[0::4], c1[1::4], c1[2::4] = data[2::8], data[3::8], b"\x01" * n
+    for k in range(4):
+        indices[k::4] = data[4 + k::8]
+    ones = int.from_bytes(b"\x01\x00\x00\x00" * n, "little")
+    three_colour = ((int.from_bytes(c1, "little") - int.from_bytes(c0, "little")) >> 16) & ones
+    x = int.from_bytes(indices, "little")
+    transparent = x & (x >> 1) & int.from_bytes(b"\x55\x55\x55\x55" * n, "little")
+    return not (transparent & three_colour * 0xFFFFFFFF)
+
+def _bc7_opaque(data):
+    # 模式 0-3 没有 alpha；模式 6 的两个 alpha 端点（含 P 位）都为 255 时不透明；模式 4 / 5 / 7 按有 alpha 处理
+    return all(b0 & 0x0F or (b0 & 0x7F == 0x40 and b6 | 0x01 == 0xFF and b7 == 0xFF and b8 & 0x01)
+               for b0, b6, b7, b8 in zip(data[0::16], data[6::16], data[7::16], data[8::16]))
+
+def dds_alpha_opaque(src: Path, info) -> bool:
+    """检查最大一层 mip 的 alpha 是否全为 255。按块步长切片，在 C 层完成逐块比较；
+    立方体贴图、数组和体积贴图按有 alpha 处理"""
+    if info["is_cubemap"] or info["array_size"] > 1 or info["depth"] > 1:
+        return False
+    size = dds_level_size(info, info["width"], info["height"])
+    with open(src, "rb") as f:
+        f.seek(info["header_size"])
+        data = f.read(size)
+    if len(data) < size:
+        return False
+    fmt = info["format"]
+    if fmt == "BC1":
+        return _bc1_opaque(data)
+    if fmt in ("RGBA8", "BGRA8"):
+        return min(data[3::4]) == 255
+    if fmt == "BC2":
+        # 每块前 8 字节是 4 位显式 alpha
+        return all(min(data[k::16]) == 255 for k in range(8))
+    if fmt == "BC3":
+        return _bc3_opaque(data)
+    if fmt == "BC7":
+        return _bc7_opaque(data)
+    return False
+
+def select_dds_compression(src: Path, info) -> str:
+    """按源格式选择 dds:compression：没有 alpha 或 alpha 全不透明时用 DXT1，否则 DXT5；其余格式交给 magick"""
+    if not info:
+        return "auto"
+    if info["format"] in OPAQUE_FORMATS:
+        return "dxt1"
+    if info["format"] in ALPHA_FORMATS:
+        return "dxt1" if dds_alpha_opaque(src, info) else "dxt5"
+    return "auto"
+
+# ========== 增量清单 ==========
+MANIFEST_NAME = "_ddscompressor_manifest.json"
+MANIFEST_VERSION = 1
+
+def file_digest(path: Path) -> str:
+    """计算文件内容的 SHA-1"""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def source_fingerprint(path: Path, with_hash=False):
+    """记录源文件的大小、修改时间以及可选的内容哈希"""
+    st = path.stat()
+    fp = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if with_hash:
+        fp["hash"] = file_digest(path)
+    return fp
+
+def load_manifest(output_root: Path):
+    """读取输出目录中的清单，不存在或损坏时返回空清单"""
+    try:
+        with open(output_root / MANIFEST_NAME, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION and isinstance(manifest.get("files"), dict):
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {"version": MANIFEST_VERSION, "params": None, "files": {}}
+
+def save_manifest(output_root: Path, manifest):
+    """原子写入清单，避免中断时留下半个文件"""
+    output_root.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_root / (MANIFEST_NAME + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, output_root / MANIFEST_NAME)
+
+def remove_output(output_root: Path, rel_path: str):
+    """删除过期输出文件，并清理因此变空的目录"""
+    target = output_root / rel_path
+    try:
+        target.unlink()
+    except FileNotFoundError:
+        pass
+    parent = target.parent
+    while parent != output_root and output_root in parent.parents:
+        try:
+            parent.rmdir()
+        except OSError:
+            break
+        parent = parent.parent
+
+# ========== 结果缓存 ==========
+DEFAULT_CACHE_SIZE = 2 * 1024 ** 3  # 2 GiB
+
+def default_cache_dir() -> Path:
+    """跨运行共享的缓存目录"""
+    if sys.platform == "win32" and os.environ.get("LOCALAPPDATA"):
+        return Path(os.environ["LOCALAPPDATA"]) / "DDSCompressor" / "cache"
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "ddscompressor"
+
+def link_or_copy(src: Path, dst: Path):
+    """优先建立硬链接，跨盘或文件系统不支持时退回复制"""
+    try:
+        dst.unlink()
+    except FileNotFoundError:
+        pass
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+class ResultCache:
+    """按内容寻址的转换结果缓存：键为源文件内容哈希 + 转换参数，
+    总大小超过上限时按最近使用时间（文件 mtime）淘汰。"""
+
+    def __init__(self, cache_dir: Path, max_bytes=DEFAULT_CACHE_SIZE):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self._lock = threading.Lock()
+        self._inflight = {}  # 键 -> 正在生成该结果的线程完成时触发的 Event
+        self._entries = {}  # 键 -> (最近使用时间, 大小)
+        self._total = 0
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for path in self.cache_dir.glob("*/*.dds"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            self._entries[path.stem] = (st.st_mtime, st.st_size)
+            self._total += st.st_size
+
+    @staticmethod
+    def key(src: Path, params) -> str:
+        h = hashlib.sha256(file_digest(src).encode())
+        h.update(json.dumps(params, sort_keys=True).encode())
+        return h.hexdigest()
+
+    def path(self, key) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.dds"
+
+    def acquire(self, key, block=True):
+        """命中时返回缓存文件路径；未命中时登记当前线程为生产者并返回 None。
+        其他线程正在生成同一结果时，block=True 等待其完成，block=False 返回 False"""
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self.hits += 1
+                    self._entries[key] = (time.time(), self._entries[key][1])
+                    path = self.path(key)
+                    try:
+                        os.utime(path)
+                    except OSError:
+                        pass
+                    return path
+                event = self._inflight.get(key)
+                if event is None:
+                    self._inflight[key] = threading.Event()
+                    return None
+            if not block:
+                return False
+            event.wait()
+
+    def release(self, key):
+        """生产者结束（无论成功与否），唤醒等待同一结果的线程"""
+        with self._lock:
+            event = self._inflight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def store(self, key, data=None, file: Path = None):
+        """写入结果（字节或已生成的文件），随后按需淘汰"""
+        path = self.path(key)
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+        if data is not None:
+            tmp.write_bytes(data)
+        else:
+            link_or_copy(file, tmp)
+        os.replace(tmp, path)
+        with self._lock:
+            size = path.stat().st_size
+            old = self._entries.get(key)
+            self._total += size - (old[1] if old else 0)
+            self._entries[key] = (time.time(), size)
+            self._evict()
+
+    def _evict(self):
+        if self._total <= self.max_bytes:
+            return
+        # 一次淘汰到上限的 90%，避免每次写入都触发
+        for key, (_, size) in sorted(self._entries.items(), key=lambda kv: kv[1][0]):
+            if self._total <= self.max_bytes * 0.9:
+                break
+            try:
+                self.path(key).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            del self._entries[key]
+            self._total -= size
+
+# ========== 调度与耗时估计 ==========
+TIMING_HISTORY_NAME = "timings.json"
+# 各动作的 (固定开销秒, 每百万像素秒) 初始值，之后按实测修正
+DEFAULT_COSTS = {"convert": (0.15, 0.4), "mips": (0.005, 0.01), "copy": (0.002, 0.005)}
+UNKNOWN_PIXELS = 2048 * 2048  # 读不到文件头时按 2K 估计
+
+# magick 以 Q16 HDRI 浮点像素工作：解码、模糊、缩放各持有一份 RGBA 副本，约 48 字节/像素
+MAGICK_BYTES_PER_PIXEL = 48
+MAGICK_BASE_MEMORY = 64 * 1024 ** 2  # 进程本身的开销
+
+def estimate_job_memory(job):
+    """按文件头尺寸估计任务的峰值内存（字节）"""
+    info = job["info"]
+    pixels = CostModel._megapixels(job) * 1e6
+    if job["action"] == "convert":
+        return int(MAGICK_BASE_MEMORY + pixels * MAGICK_BYTES_PER_PIXEL)
+    # 截取 mip / 复制只在内存中保留压缩数据
+    bytes_per_pixel = info["bits_per_pixel"] / 8 if info and info.get("bits_per_pixel") else 1
+    return int(pixels * bytes_per_pixel)
+
+def pick_admissible(pending, available, idle):
+    """在按耗时降序排列的 [(-耗时, 序号, 内存, 单元)] 中选第一个放得下的；都放不下时，空闲则放行第一个"""
+    for index, entry in enumerate(pending):
+        if entry[2] <= available:
+            return index
+    return 0 if idle and pending else None
+
+def default_timing_history() -> Path:
+    return default_cache_dir() / TIMING_HISTORY_NAME
+
+def format_duration(seconds) -> str:
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    return f"{hours}:{rest // 60:02d}:{rest % 60:02d}" if hours else f"{rest // 60}:{rest % 60:02d}"
+
+class CostModel:
+    """按像素数和格式估计任务耗时。每完成一个任务就用实测耗时修正对应 (动作, 格式) 的
+    每百万像素耗时，修正结果保存到 timings.json 供下次运行使用。"""
+    ALPHA = 0.2  # 指数滑动平均的权重
+
+    def __init__(self, path: Path = None):
+        self.path = Path(path) if path else None
+        self.rates = {}
+        if self.path is not None and self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.rates = {k: float(v) for k, v in json.load(f).get("rates", {}).items()}
+            except (OSError, ValueError, AttributeError):
+                self.rates = {}
+
+    @staticmethod
+    def _key(job):
+        return f"{job['action']}:{job['info']['format'] if job['info'] else '?'}"
+
+    @staticmethod
+    def _megapixels(job):
+        info = job["info"]
+        if info is None:
+            return UNKNOWN_PIXELS / 1e6
+        layers = info["depth"] * info["array_size"] * (6 if info["is_cubemap"] else 1)
+        return info["width"] * info["height"] * layers / 1e6
+
+    def estimate(self, job):
+        base, rate = DEFAULT_COSTS[job["action"]]
+        return base + self.rates.get(self._key(job), rate) * self._megapixels(job)
+
+    def observe(self, job, duration):
+        megapixels = self._megapixels(job)
+        if megapixels <= 0:
+            return
+        sample = max(0.0, duration - DEFAULT_COSTS[job["action"]][0]) / megapixels
+        key = self._key(job)
+        old = self.rates.get(key)
+        self.rates[key] = sample if old is None else old + self.ALPHA * (sample - old)
+
+    def save(self):
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "rates": self.rates}, f, indent=1)
+        os.replace(tmp_path, self.path)
+
+SCAN_THREADS = 4         # 同时扫描的输入项数
+SCAN_QUEUE_SIZE = 1024   # 扫描结果队列的容量，扫描远快于转换时由此限流
+
+def scan_dds_files(root: Path, on_error=None):
+    """用 os.scandir 逐目录遍历，边遍历边产出 .dds 文件（不跟随目录符号链接）。
+    读不了的目录或条目跳过，并以 on_error(路径, 异常) 通知调用方扫描不完整"""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                subdirs = []
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif entry.name.lower().endswith(".dds") and entry.is_file():
+                            yield Path(entry.path)
+                    except OSError as e:
+                        if on_error:
+                            on_error(entry.path, e)
+                        continue
+        except OSError as e:
+            if on_error:
+                on_error(directory, e)
+            continue
+        stack.extend(reversed(subdirs))
+
+# ========== 显存预算 ==========
+# 权重规则：(相对路径通配符, 权重)，不区分大小写，按顺序取第一个匹配，都不匹配时为 1。
+# 权重越高越晚被缩小
+DEFAULT_VRAM_RULES = (
+    ("textures/actors/character/*", 4.0),  # 角色：脸部、皮肤、头发
+    ("*_n.dds", 2.0),
+    ("*_msn.dds", 2.0),
+    ("textures/landscape/*", 0.5),
+    ("textures/clutter/*", 0.5),
+)
+VRAM_MIN_RESOLUTION = 256
+
+def texture_vram_bytes(info, level=0):
+    """贴图缩小 level 次后占用的显存：mip 链各层之和，立方体贴图、数组和体积贴图按层数计。
+    不计编码变化（如 BC7 转为 DXT1），估计偏保守"""
+    if not info or not (info["block_bytes"] or info["bits_per_pixel"]):
+        return 0
+    levels = range(level, info["mip_count"]) if info["mip_count"] > level + 1 else (level,)
+    total = 0
+    for lv in levels:
+        w, h, d = (max(1, n >> lv) for n in (info["width"], info["height"], info["depth"]))
+        total += dds_level_size(info, w, h) * d
+    return total * info["array_size"] * (6 if info["is_cubemap"] else 1)
+
+def vram_weight(rel: str, rules) -> float:
+    rel = rel.lower()
+    for pattern, weight in rules:
+        if fnmatch.fnmatchcase(rel, pattern.lower()):
+            return weight
+    return 1.0
+
+def solve_vram_budget(textures, budget, rules=DEFAULT_VRAM_RULES, min_resolution=VRAM_MIN_RESOLUTION):
+    """为每张贴图选择缩小次数，使显存总量不超过 budget。
+    textures 为 [(键, 相对路径, 头信息)]；贪心地每次把“节省字节 / 权重”最大的贴图再缩小一半，
+    直到满足预算或所有贴图都已到 min_resolution（magick 写不出的格式只能截取已有的 mip 层）。
+    返回 [{键, 相对路径, 头信息, weight, level, target, before, after}]"""
+    entries = []
+    heap = []
+    total = 0
+    for key, rel, info in textures:
+        before = texture_vram_bytes(info)
+        if not before:
+            continue
+        longest = max(info["width"], info["height"])
+        entry = {"key": key, "path": rel, "info": info, "weight": max(vram_weight(rel, rules), 1e-6),
+                 "level": 0, "target": longest, "before": before, "after": before}
+        # 只截取 mip 的格式不能超过已有层数
+        entry["max_level"] = info["mip_count"] - 1 if keeps_source_format(info, is_normal_map(Path(rel))) else 32
+        entries.append(entry)
+        total += before
+        _push_vram_step(heap, len(entries) - 1, entry, min_resolution)
+    while total > budget and heap:
+        _, index, after = heapq.heappop(heap)
+        entry = entries[index]
+        total -= entry["after"] - after
+        entry["level"] += 1
+        entry["target"] >>= 1
+        entry["after"] = after
+        _push_vram_step(heap, index, entry, min_resolution)
+    return entries
+
+def _push_vram_step(heap, index, entry, min_resolution):
+    level = entry["level"] + 1
+    if entry["target"] >> 1 < min_resolution or level > entry["max_level"]:
+        return
+    after = texture_vram_bytes(entry["info"], level)
+    heapq.heappush(heap, (-(entry["after"] - after) / entry["weight"], index, after))
+
+# ========== Mod Organizer 2 ==========
+MO2_INI = "ModOrganizer.ini"
+MO2_MODLIST = "modlist.txt"
+
+def find_mo2_instance(profile_dir: Path):
+    """从配置（profile）目录向上查找 ModOrganizer.ini 所在的实例目录"""
+    for parent in profile_dir.parents:
+        if (parent / MO2_INI).is_file():
+            return parent
+    return None
+
+def _mo2_path(value: str, base: Path) -> Path:
+    # QSettings 写入的路径可能是 @ByteArray(...) 形式，反斜杠被转义
+    if value.startswith("@ByteArray(") and value.endswith(")"):
+        value = value[len("@ByteArray("):-1]
+    return Path(value.replace("\\\\", "\\").replace("%BASE_DIR%", str(base)))
+
+def mo2_mods_dir(instance: Path) -> Path:
+    """实例的 mods 目录：ModOrganizer.ini 中的 mod_directory，未设置时为 <base_directory>/mods"""
+    parser = configparser.ConfigParser(interpolation=None, strict=False)
+    try:
+        parser.read(instance / MO2_INI, encoding="utf-8")
+    except (configparser.Error, UnicodeDecodeError):
+        pass
+    settings = parser["Settings"] if parser.has_section("Settings") else {}
+    base = _mo2_path(settings["base_directory"], instance) if settings.get("base_directory") else instance
+    if settings.get("mod_directory"):
+        return _mo2_path(settings["mod_directory"], base)
+    return base / "mods"
+
+def read_modlist(path: Path):
+    """modlist.txt 中启用的模组名，按优先级从高到低（文件第一行优先级最高）。
+    跳过禁用（-）、非托管（*）、分隔符以及本工具生成的 _low_res 模组"""
+    names = []
+    with open(path, encoding="utf-8-sig", errors="replace") as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if not line.startswith("+"):
+                continue
+            name = line[1:]
+            if name.endswith("_separator") or name.endswith("_low_res"):
+                continue
+            names.append(name)
+    return names
+
+def resolve_mo2_profile(modlist: Path):
+    """按加载顺序解析虚拟文件树：每个相对路径（不区分大小写）只保留优先级最高的模组中的那一份。
+    每个模组一个输入项，"files" 为它胜出的贴图，"overridden" 为被更高优先级模组覆盖的贴图数"""
+    instance = find_mo2_instance(modlist.parent)
+    if instance is None:
+        raise RuntimeError(f"{MO2_INI} not found above {modlist.parent}")
+    mods_dir = mo2_mods_dir(instance)
+    winners = set()
+    items = []
+    for name in read_modlist(modlist):
+        mod = mods_dir / name
+        if not mod.is_dir():
+            continue
+        files = []
+        overridden = 0
+        errors = []
+        for src in scan_dds_files(mod, on_error=lambda path, e: errors.append((path, e))):
+            rel = src.relative_to(mod).as_posix().lower()
+            if rel in winners:
+                overridden += 1
+                continue
+            winners.add(rel)
+            files.append(src)
+        if files or overridden or errors:
+            # 全部被覆盖的模组也保留，增量模式下据此删除它过去生成的输出
+            items.append({
+                "type": "folder",
+                "source_path": mod,
+                "work_dir": mod,
+                "is_temp": False,
+                "files": files,
+                "overridden": overridden,
+                "scan_errors": errors,
+            })
+    return items
+
+def parse_input_lines(lines):
+    """解析输入行，返回标准化的输入项列表"""
+    items = []
+    temp_dirs = []
+    try:
+        for line in lines:
+            p = line.strip()
+            if not p:
+                continue
+            if p.startswith("file:///"):
+                p = p[8:]
+            try:
+                p = urllib.parse.unquote(p)
+            except:
+                pass
+            p = Path(os.path.normpath(p))
+            if not p.exists():
+                continue
+
+            if p.is_file() and p.name.lower() == MO2_MODLIST:
+                items.extend(resolve_mo2_profile(p))
+            elif p.is_dir():
+                items.append({
+                    "type": "folder",
+                    "source_path": p,
+                    "work_dir": p,
+                    "is_temp": False
+                })
+            elif p.is_file():
+                suffix = p.suffix.lower()
+                if suffix in ('.zip', '.7z'):
+                    if suffix == '.7z' and not HAS_7Z:
+                        raise RuntimeError("py7zr not installed. Run: pip install py7zr")
+                    # 不再整体解压：成员在转换时按需解压到此临时目录
+                    temp_dir = Path(tempfile.mkdtemp())
+                    temp_dirs.append(temp_dir)
+                    items.append({
+                        "type": "archive",
+                        "source_path": p,
+                        "work_dir": temp_dir,
+                        "is_temp": True
+                    })
+                elif suffix == '.bsa':
+                    temp_dir = Path(tempfile.mkdtemp())
+                    temp_dirs.append(temp_dir)
+                    items.append({
+                        "type": "bsa",
+                        "source_path": p,
+                        "work_dir": temp_dir,
+                        "is_temp": True
+                    })
+                else:
+                    pass
+        return items, temp_dirs
+    except Exception as e:
+        for td in temp_dirs:
+            shutil.rmtree(td, ignore_errors=True)
+        raise e
+
+class ConversionEngine:
+    """扫描、转换、打包的完整流程，不依赖 Qt。
+    通过 on_progress / on_log / on_finished / on_error 回调汇报状态，
+    GUI 的 Worker 和命令行都只是这些回调的使用者。"""
+
+    def __init__(self, input_items, magick_exec, resolution, process_mode, current_lang, output_method="folder", zip_output_path=None, max_workers=None, copy_small=False, use_mip_fast_path=True, incremental=True, hash_sources=False,
+                 archive_codec="stored", compression_level=None, batch_size=8, backend="magick",
+                 cache_dir=None, cache_size=DEFAULT_CACHE_SIZE, timing_history=None, memory_budget=None,
+                 timeout_floor=DEFAULT_TIMEOUT_FLOOR, timeout_ceiling=DEFAULT_TIMEOUT_CEILING, trace_path=None,
+                 on_progress=None, on_log=None, on_finished=None, on_error=None, on_eta=None, on_tick=None,
+                 on_cancelled=None):
+        self.input_items = input_items  # List of dicts
+        self.magick_exec = magick_exec
+        self.resolution = resolution
+        self.target_resolutions = {}  # 显存规划得到的逐文件目标分辨率，见 plan_vram()
+        self.process_mode = process_mode
+        self.current_lang = current_lang
+        self.output_method = output_method
+        self.zip_output_path = Path(zip_output_path) if zip_output_path else None
+        self.max_workers = max(1, int(max_workers or default_worker_count()))
+        self.copy_small = copy_small
+        self.use_mip_fast_path = use_mip_fast_path
+        self.incremental = incremental and output_method == "folder"
+        self.hash_sources = hash_sources
+        self.archive_codec = archive_codec
+        self.compression_level = compression_level
+        self.batch_size = max(1, int(batch_size or 1))
+        self.backend = backend if isinstance(backend, ConversionBackend) else create_backend(backend, magick_exec)
+        self.cache_dir = Path(cache_dir) if cache_dir else None  # None 表示不使用结果缓存
+        self.cache_size = cache_size
+        self._cache = None
+        self._costs = CostModel()
+        self.trace_path = Path(trace_path) if trace_path else None
+        self.tracer = Tracer(enabled=self.trace_path is not None)
+        self.timing_history = timing_history
+        self.memory_budget = memory_budget or default_memory_budget()
+        self.timeout_floor = timeout_floor
+        self.timeout_ceiling = max(timeout_floor, timeout_ceiling)
+        self.on_eta = on_eta
+        self.on_tick = on_tick
+        self.on_progress = on_progress
+        self.on_log = on_log
+        self.on_finished = on_finished
+        self.on_error = on_error
+        self.on_cancelled = on_cancelled
+        self.summary = {}
+        self._canceled = False
+        self._processes = ProcessGroup()
+        self._zip_sink = None
+
+    def cancel(self):
+        """停止调度并立即终止正在运行的 magick 进程；run() 清理临时数据后返回"""
+        self._canceled = True
+        self._processes.kill_all()
+
+    def _log(self, msg):
+        if self.on_log:
+            self.on_log(msg)
+
+    def _progress(self, current, total, success):
+        self.summary.update(done=current, total=total, success=success, failed=current - success)
+        if self.on_progress:
+            self.on_progress(current, total, success)
+
+    def _eta(self, seconds):
+        if self.on_eta:
+            self.on_eta(seconds)
+
+    def _tick(self):
+        # 转换期间至少每 TICK_INTERVAL 秒调用一次，供调用方按时间合并刷新界面
+        if self.on_tick:
+            self.on_tick()
+
+    def _finished(self, status, success, total, output):
+        self.summary.update(status=status, success=success, total=total, failed=total - success,
+                            output=output.split("\n"))
+        if self.on_finished:
+            self.on_finished(status, success, total, output)
+
+    def _error(self, key):
+        self.summary.update(status="error", error=key)
+        if self.on_error:
+            self.on_error(key)
+
+    def _cancelled(self):
+        if self.on_cancelled:
+            self.on_cancelled()
+
+    def _failure(self, job, msg):
+        """任务失败：删除可能只写了一半的输出；已取消时统一报告为取消"""
+        if self._zip_sink is None:
+            try:
+                job["dst"].unlink(missing_ok=True)
+            except OSError:
+                pass
+        if self._canceled:
+            return False, f"CANCELLED: {job['src'].name}"
+        return False, msg
+
+    def _(self, key):
+        # 支持自定义翻译
+        if self.current_lang == "custom" and "custom" in LANGUAGES:
+            return LANGUAGES["custom"].get(key, LANGUAGES["en"].get(key, key))
+        return LANGUAGES.get(self.current_lang, LANGUAGES["en"]).get(key, key)
+
+    def _open_archive(self, item):
+        """列出压缩包中的 .dds 成员；ZIP / BSA 保持打开，供转换时按需读取单个成员"""
+        if "members" in item:
+            pass  # 显存规划时已经打开
+        elif item["type"] == "bsa":
+            item["reader"] = BSAArchive(item["source_path"])
+            item["members"] = list_bsa_members(item["reader"])
+        else:
+            item["members"] = list_archive_members(item["source_path"])
+            if item["source_path"].suffix.lower() == ".zip":
+                item["reader"] = ZipReader(item["source_path"])
+        return [item["work_dir"] / rel for rel in item["members"]]
+
+    def _member_name(self, item, src):
+        return item["members"][src.relative_to(item["work_dir"]).as_posix()][0]
+
+    def _fingerprint(self, item, src):
+        """压缩包成员直接使用其大小和 CRC，无需解压；BSA 没有 CRC，对原始数据计算哈希"""
+        if item["type"] == "bsa":
+            return {"hash": item["reader"].digest(self._member_name(item, src))}
+        if item["type"] == "archive":
+            return dict(item["members"][src.relative_to(item["work_dir"]).as_posix()][1])
+        return source_fingerprint(src, self.hash_sources)
+
+    def _read_header(self, item, src):
+        if "reader" in item and not src.exists():
+            try:
+                return parse_dds_header(item["reader"].read_head(self._member_name(item, src), DDS_DX10_HEADER_SIZE))
+            except Exception:
+                return None
+        return read_dds_header(src)
+
+    def _materialize(self, job):
+        """ZIP / BSA 成员在转换前才解压到临时文件"""
+        item, src = job["item"], job["src"]
+        if "reader" in item and not src.exists():
+            item["reader"].extract(self._member_name(item, src), src)
+
+    def _release(self, job):
+        # 压缩包成员转换完立即删除，临时占用不超过并行任务数
+        if job["item"].get("is_temp"):
+            try:
+                job["src"].unlink()
+            except OSError:
+                pass
+
+    def _run_job(self, job):
+        """执行单个任务，返回 (是否成功, 日志消息)"""
+        if job["action"] == "copy":
+            return self._copy_file(job)
+        if job["action"] == "mips":
+            return self._truncate_file(job)
+        return self._convert_file(job)
+
+    def _run_unit(self, unit):
+        """在线程池中执行一个调度单元（单个任务或一批小贴图），返回 [(任务, 是否成功, 日志消息)]"""
+        tracer = self.tracer
+        results = []
+        ready = []
+        try:
+            for job in unit:
+                start = tracer.now()
+                try:
+                    self._materialize(job)
+                    if self._zip_sink is None:
+                        # 输出可能是缓存文件的硬链接，先断开再写，避免原地改写缓存
+                        job["dst"].unlink(missing_ok=True)
+                    ready.append(job)
+                except Exception as e:
+                    results.append((job, False, f"EXCEPTION: {job['src'].name}: {str(e)}"))
+                if job["item"].get("is_temp"):
+                    tracer.add("extract", "file", start, tracer.now(), file=self._member_name(job["item"], job["src"]))
+            start = tracer.now()
+            if len(ready) > 1:
+                results += self._convert_batch(ready)
+                tracer.add("batch", "batch", start, tracer.now(), files=len(ready))
+            else:
+                results += [(job,) + self._run_job(job) for job in ready]
+            if tracer.enabled:
+                end = tracer.now()
+                for job, ok, msg in results:
+                    job_start = job.get("trace_start", start)
+                    tracer.add(job["action"], "file", job_start, job_start + job.get("duration", end - job_start),
+                               **self._trace_args(job, ok, msg))
+        finally:
+            for job in unit:
+                self._release(job)
+        return results
+
+    def _trace_args(self, job, ok, msg):
+        """文件区间的附加信息：大小、尺寸、格式、结果"""
+        info = job["info"] or {}
+        try:
+            size = job["src"].stat().st_size
+        except OSError:
+            size = None
+        return {"file": job["src"].relative_to(job["item"]["work_dir"]).as_posix(), "size": size,
+                "width": info.get("width"), "height": info.get("height"), "format": info.get("format"),
+                "status": "ok" if ok else msg.split(":", 1)[0].lower(), "cached": bool(job.get("cached"))}
+
+    def _batchable(self, job):
+        info = job["info"]
+        return (self.batch_size > 1 and self.backend.supports_batch and job["action"] == "convert" and info is not None
+                and info["width"] * info["height"] <= BATCH_MAX_PIXELS)
+
+    def _timeout(self, job):
+        """magick 超时：按截至此刻的实测耗时估计该贴图的转换时间，取 TIMEOUT_FACTOR 倍，
+        并限制在 [timeout_floor, timeout_ceiling] 内（截取 mip 失败回退时同样按转换估计）"""
+        estimate = self._costs.estimate(dict(job, action="convert"))
+        return min(self.timeout_ceiling, max(self.timeout_floor, TIMEOUT_FACTOR * estimate))
+
+    def _cache_key(self, job):
+        if "cache_key" not in job:
+            src = job["src"]
+            params = {"backend": self.backend.name, "args": build_magick_args(is_normal_map(src), job["resolution"]),
+                      "encoding": "source_format_v2"}
+            job["cache_key"] = ResultCache.key(src, params)
+        return job["cache_key"]
+
+    def _compression(self, job):
+        """输出编码由源格式和 alpha 决定（在工作线程中读取像素数据）"""
+        if "compression" not in job:
+            try:
+                job["compression"] = select_dds_compression(job["src"], job["info"])
+            except OSError:
+                job["compression"] = "auto"
+        return job["compression"]
+
+    def _job_memory(self, job):
+        """远程后端的转换在代理上进行，不占本机的内存预算"""
+        if job["action"] == "convert" and not self.backend.runs_locally:
+            return 0
+        return estimate_job_memory(job)
+
+    def _serve_cached(self, job, cached: Path, start_time):
+        """用缓存结果生成输出；缓存文件刚被淘汰时返回 None"""
+        try:
+            if self._zip_sink is not None:
+                self._write_output(job, cached.read_bytes())
+            else:
+                link_or_copy(cached, job["dst"])
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            return False, f"EXCEPTION: {job['src'].name}: {str(e)}"
+        job["cached"] = True
+        return True, self._done_message(job, start_time)
+
+    def _cache_result(self, job, data=None):
+        if self._cache is None:
+            return
+        try:
+            self._cache.store(self._cache_key(job), data=data, file=None if data is not None else job["dst"])
+        except OSError:
+            pass  # 缓存写入失败不影响本次输出
+
+    def _convert_batch(self, jobs):
+        """先查缓存，未命中的贴图交给一个 magick 进程批量转换。
+        其他线程正在生成同一结果的贴图放到最后逐个处理，届时通常已能命中缓存"""
+        if self._cache is None:
+            return self._run_batch(jobs)
+        start_time = datetime.now()
+        results = []
+        claimed = []
+        deferred = []
+        for job in jobs:
+            try:
+                cached = self._cache.acquire(self._cache_key(job), block=False)
+            except Exception as e:
+                results.append((job, False, f"EXCEPTION: {job['src'].name}: {str(e)}"))
+                continue
+            if cached is False:
+                deferred.append(job)
+                continue
+            hit = self._serve_cached(job, cached, start_time) if cached else None
+            if hit:
+                results.append((job,) + hit)
+            else:
+                job["cache_claimed"] = cached is None
+                claimed.append(job)
+        try:
+            if len(claimed) > 1:
+                results += self._run_batch(claimed)
+            else:
+                results += [(job,) + self._convert_file(job) for job in claimed]
+        finally:
+            for job in claimed:
+                if job.pop("cache_claimed"):
+                    self._cache.release(job["cache_key"])
+        return results + [(job,) + self._convert_file(job) for job in deferred]
+
+    def _run_batch(self, jobs):
+        """一个 magick 进程依次转换多张贴图。
+        已输出完成标记的贴图直接采用；超时的那一张单独报告 TIMEOUT，其余未完成的重新排队；
+        进程出错时只逐个重跑没有完成标记的贴图，以得到准确的错误信息"""
+        staging = Path(tempfile.mkdtemp()) if self._zip_sink is not None else None
+        try:
+            outputs = []
+            cmd = [self.backend.magick_exec]
+            for i, job in enumerate(jobs):
+                out = staging / f"{i}.dds" if staging else job["dst"]
+                outputs.append(out)
+                cmd += [str(job["src"])] + build_magick_args(is_normal_map(job["src"]), job["resolution"],
+                                                             self._compression(job))
+                cmd += ["-write", str(out), "-print", f"{BATCH_MARKER} {i};\\n"]
+                if i < len(jobs) - 1:
+                    cmd += ["-delete", "0--1"]
+            # 最后一张留在图像列表中写到 null:，空列表时 magick 会报 "no images defined" 并返回非零
+            cmd.append("null:")
+            started = self.tracer.now()
+            try:
+                done, timed_out, _, _ = run_magick_batch(cmd, [self._timeout(job) for job in jobs],
+                                                         self._processes)
+            except Exception as e:
+                return [(job,) + self._failure(job, f"EXCEPTION: {job['src'].name}: {str(e)}") for job in jobs]
+            # 批量进程中各贴图依次处理，按完成标记的间隔还原每张的起止时间
+            for i in sorted(done):
+                jobs[i]["trace_start"] = started
+                started += done[i]
+
+            results = []
+            missing = []
+            for i, job in enumerate(jobs):
+                if i not in done:
+                    missing.append(job)
+                    continue
+                try:
+                    data = outputs[i].read_bytes() if staging else None
+                    if staging:
+                        self._write_output(job, data)
+                    self._cache_result(job, data)
+                    results.append((job, True, self._done_message(job, None, done[i])))
+                except Exception as e:
+                    results.append((job,) + self._failure(job, f"EXCEPTION: {job['src'].name}: {str(e)}"))
+            if self._canceled:
+                # 已完成的输出是完整的，其余的删除
+                return results + [(job,) + self._failure(job, "") for job in missing]
+            if timed_out and missing:
+                hung = missing.pop(0)
+                results.append((hung, False, f"TIMEOUT: {hung['src'].name} (after {self._timeout(hung):.1f}s)"))
+                if len(missing) > 1:
+                    return results + self._run_batch(missing)
+            return results + [(job,) + self._convert_file(job) for job in missing]
+        finally:
+            if staging:
+                shutil.rmtree(staging, ignore_errors=True)
+
+    def _write_output(self, job, data):
+        """写出转换结果：文件夹模式写文件，ZIP 模式交给写入线程"""
+        if self._zip_sink is not None:
+            with self.tracer.span("compress", "package", member=job["arcname"], bytes=len(data)):
+                payload = self._zip_sink.prepare(job["arcname"], data)
+            with self.tracer.span("archive_wait", "package", member=job["arcname"]):
+                self._zip_sink.put(job["zip_name"], job["arcname"], payload).result()
+        else:
+            with open(job["dst"], "wb") as f:
+                f.write(data)
+
+    def _done_message(self, job, start_time, duration=None):
+        output_path = job["arcname"] if self._zip_sink is not None else str(job["dst"])
+        if duration is None:
+            duration = (datetime.now() - start_time).total_seconds()
+        job["duration"] = duration
+        msg = f"{self._('file_processed').format(filename=job['src'].name, output_path=output_path)}\n"
+        msg += f"{self._('processing_time').format(duration=round(duration, 2))}"
+        return msg
+
+    def _truncate_file(self, job):
+        """直接截取已有 mip 层，失败时回退到 magick"""
+        src, info = job["src"], job["info"]
+        start_time = datetime.now()
+        try:
+            data = truncate_dds_mips(src, info, job["mip_level"])
+        except Exception as e:
+            if keeps_source_format(info, is_normal_map(src)):
+                return self._failure(job, f"EXCEPTION: {src.name}: {str(e)}")
+            return self._convert_file(job)
+        try:
+            self._write_output(job, data)
+        except Exception as e:
+            return self._failure(job, f"EXCEPTION: {src.name}: {str(e)}")
+        return True, self._done_message(job, start_time)
+
+    def _copy_file(self, job):
+        """原样复制已不大于目标分辨率的贴图"""
+        src = job["src"]
+        start_time = datetime.now()
+        try:
+            if self._zip_sink is not None:
+                self._write_output(job, src.read_bytes())
+            else:
+                shutil.copyfile(src, job["dst"])
+        except Exception as e:
+            return self._failure(job, f"EXCEPTION: {src.name}: {str(e)}")
+        return True, self._done_message(job, start_time)
+
+    def _convert_file(self, job):
+        """用当前后端转换单张贴图；ZIP 模式下直接取得结果字节，不落地临时文件。
+        启用缓存时先查缓存，同一结果正在由其他线程生成时等待其完成"""
+        src = job["src"]
+        start_time = datetime.now()
+        to_memory = self._zip_sink is not None
+        claimed = False
+        if self._canceled:
+            return self._failure(job, "")
+        try:
+            if self._cache is not None and "cache_claimed" not in job:
+                cached = self._cache.acquire(self._cache_key(job))
+                claimed = cached is None
+                hit = self._serve_cached(job, cached, start_time) if cached else None
+                if hit:
+                    return hit
+            data = self.backend.convert(src, None if to_memory else job["dst"], is_normal_map(src), job["resolution"],
+                                        timeout=self._timeout(job), processes=self._processes,
+                                        compression=self._compression(job))
+            if to_memory:
+                self._write_output(job, data)
+            self._cache_result(job, data)
+            return True, self._done_message(job, start_time)
+        except BackendError as e:
+            return self._failure(job, f"ERROR: {src.name}: {e}")
+        except subprocess.TimeoutExpired:
+            duration = (datetime.now() - start_time).total_seconds()
+            return self._failure(job, f"TIMEOUT: {src.name} (after {duration:.1f}s)")
+        except Exception as e:
+            return self._failure(job, f"EXCEPTION: {src.name}: {str(e)}")
+        finally:
+            if claimed:
+                self._cache.release(job["cache_key"])
+
+    def _output_root(self, item):
+        """文件夹输出模式下该输入项对应的 _low_res 目录"""
+        if item["type"] == "folder":
+            mod_root = item["source_path"]
+            return mod_root.parent / (mod_root.name + "_low_res")
+        original_name = item["source_path"].stem
+        return item["source_path"].parent / (original_name + "_low_res")
+
+    def _conversion_params(self):
+        """影响输出内容的全部参数，任一变化都会使清单失效"""
+        return {
+            "resolution": str(self.resolution),
+            "process_mode": self.process_mode,
+            "copy_small": self.copy_small,
+            "use_mip_fast_path": self.use_mip_fast_path,
+            "normal_args": build_magick_args(True, self.resolution),
+            "diffuse_args": build_magick_args(False, self.resolution),
+            "encoding": "source_format_v2",
+            "vram_plan": bool(self.target_resolutions),
+        }
+
+    def _manifest_entry(self, item):
+        """该输入项输出目录的清单状态，首次用到时加载（扫描线程间共享）"""
+        output_root = self._output_root(item)
+        key = str(output_root)
+        with self._manifest_lock:
+            if key not in self._manifests:
+                old = load_manifest(output_root)
+                self._manifests[key] = {
+                    "root": output_root,
+                    "old": old["files"],
+                    "valid": old["files"] if old["params"] == self._params else {},
+                    "new": {"version": MANIFEST_VERSION, "params": self._params, "files": {}},
+                    "seen": set(),
+                    "failed": False,  # 打开或扫描出错，不能据此判断哪些源文件已不存在
+                    "existed": (output_root / MANIFEST_NAME).exists(),
+                }
+            return key, self._manifests[key]
+
+    def _check_unchanged(self, item, src):
+        """对照清单判断文件是否无需处理；返回 None 表示未变化，否则返回 (清单键, 指纹)。
+        读取指纹失败时返回 (None, None)：照常处理，但不记入清单"""
+        key, entry = self._manifest_entry(item)
+        output_root = entry["root"]
+        rel = src.relative_to(item["work_dir"]).as_posix()
+        with self._manifest_lock:
+            entry["seen"].add(rel)
+        try:
+            fp = self._fingerprint(item, src)
+        except OSError:
+            return None, None
+        if self.target_resolutions:
+            # 规划的目标分辨率变化时需要重新生成
+            fp["resolution"] = self._target_resolution(item, src)
+        prev = entry["valid"].get(rel)
+        if prev and {k: prev.get(k) for k in fp} == fp and (not prev.get("output") or (output_root / rel).exists()):
+            with self._manifest_lock:
+                entry["new"]["files"][rel] = prev
+            return None
+        return (key, rel), fp
+
+    def _finish_manifests(self, scan_complete):
+        """扫描完整结束后才删除源文件已不存在的输出；扫描被取消或该输出目录的输入打开、扫描出错时保留未扫描到的旧记录"""
+        removed = 0
+        for entry in self._manifests.values():
+            for rel, prev in entry["old"].items():
+                if rel in entry["seen"]:
+                    continue
+                if not scan_complete or entry["failed"]:
+                    if rel in entry["valid"]:
+                        entry["new"]["files"][rel] = prev
+                    continue
+                if prev.get("output"):
+                    remove_output(entry["root"], rel)
+                    removed += 1
+        return removed
+
+    def _keep_excluded(self, item, src):
+        """按处理模式排除的文件源文件仍在：保留上次的输出，记录原样带入新清单，源文件以后删除时仍能清理"""
+        _, entry = self._manifest_entry(item)
+        rel = src.relative_to(item["work_dir"]).as_posix()
+        with self._manifest_lock:
+            entry["seen"].add(rel)
+            if rel in entry["old"]:
+                entry["new"]["files"][rel] = entry["old"][rel]
+
+    def _scan_failed(self, item):
+        """标记该输入项的输出目录扫描不完整（扫描线程中调用）"""
+        if self.incremental:
+            _, entry = self._manifest_entry(item)
+            entry["failed"] = True
+
+    def _record_manifest(self, job, has_output):
+        if job.get("manifest_key") is None:
+            return
+        key, rel = job["manifest_key"]
+        entry = self._manifests[key]
+        if not has_output and entry["old"].get(rel, {}).get("output"):
+            # 上次有输出、这次无需输出（目标分辨率提高了），删除旧输出
+            remove_output(entry["root"], rel)
+        entry["new"]["files"][rel] = dict(job["fingerprint"], output=has_output)
+
+    def _save_manifests(self):
+        for entry in self._manifests.values():
+            if not entry["new"]["files"] and not entry["existed"]:
+                # 没有任何输出的输入项（如 MO2 中被完全覆盖的模组）不创建 _low_res 目录
+                continue
+            try:
+                save_manifest(entry["root"], entry["new"])
+            except OSError as e:
+                self._log(f"EXCEPTION: {MANIFEST_NAME}: {str(e)}")
+
+    def _included(self, path: Path):
+        is_normal = is_normal_map(path)
+        if self.process_mode == "skip_normals":
+            return not is_normal
+        if self.process_mode == "only_normals":
+            return is_normal
+        return True
+
+    def _plan(self, item, src, manifest_key, fp):
+        """读取文件头并决定处理方式，返回 ("job", 任务)、("skip", 任务) 或 ("kept", 任务)"""
+        info = self._read_header(item, src)
+        res = self._target_resolution(item, src)
+        job = {"item": item, "src": src, "info": info, "resolution": res, "manifest_key": manifest_key,
+               "fingerprint": fp}
+        if needs_downscale(info, res):
+            if keeps_source_format(info, is_normal_map(src)):
+                # magick 写不出这种格式：截取不超过目标分辨率的 mip 层，没有 mip 时保留原文件
+                job["mip_level"] = mip_truncation_level(info, res, exact=False)
+                if job["mip_level"] is None:
+                    return "kept", job
+                job["action"] = "mips"
+            elif self.use_mip_fast_path and mip_truncation_level(info, res) is not None:
+                job["mip_level"] = mip_truncation_level(info, res)
+                job["action"] = "mips"
+            else:
+                job["action"] = "convert"
+        elif self.copy_small:
+            job["action"] = "copy"
+        else:
+            return "skip", job
+        rel_path = src.relative_to(item["work_dir"])
+        if self.output_method == "folder":
+            job["dst"] = self._output_root(item) / rel_path
+            job["dst"].parent.mkdir(parents=True, exist_ok=True)
+        else:  # zip / 7z mode
+            safe_name = safe_archive_name(item["source_path"])
+            job["zip_name"] = safe_name
+            job["arcname"] = f"{safe_name}/{rel_path.as_posix()}"
+        return "job", job
+
+    def _target_resolution(self, item, src):
+        key = (str(item["source_path"]), src.relative_to(item["work_dir"]).as_posix())
+        return self.target_resolutions.get(key, self.resolution)
+
+    def _survey(self):
+        """只读取文件头，返回 [(键, 相对路径, 头信息)]；.7z 需要先解压"""
+        textures = []
+        for item in self.input_items:
+            try:
+                if item["type"] in ("archive", "bsa"):
+                    paths = self._open_archive(item)
+                else:
+                    paths = item["files"] if "files" in item else scan_dds_files(item["work_dir"])
+                paths = [src for src in paths if self._included(src)]
+                if item["type"] == "archive" and "reader" not in item and paths:
+                    extract_7z_members(item["source_path"], {self._member_name(item, src): src for src in paths},
+                                       item["work_dir"])
+            except Exception as e:
+                self._log(f"EXCEPTION: {item['source_path'].name}: {str(e)}")
+                continue
+            for src in paths:
+                rel = src.relative_to(item["work_dir"]).as_posix()
+                textures.append(((str(item["source_path"]), rel), rel, self._read_header(item, src)))
+        return textures
+
+    def plan_vram(self, budget, rules=DEFAULT_VRAM_RULES, min_resolution=VRAM_MIN_RESOLUTION):
+        """规划逐文件目标分辨率，使全部贴图的显存占用不超过 budget 字节；在 run() 之前调用。
+        返回规划结果：{"budget", "before", "after", "textures": [...]}"""
+        with self.tracer.span("vram_plan"):
+            entries = solve_vram_budget(self._survey(), budget, rules, min_resolution)
+        self.target_resolutions = {entry["key"]: entry["target"] for entry in entries}
+        textures = [{"input": entry["key"][0], "path": entry["path"], "format": entry["info"]["format"],
+                     "width": entry["info"]["width"], "height": entry["info"]["height"],
+                     "weight": entry["weight"], "target": entry["target"],
+                     "before": entry["before"], "after": entry["after"]}
+                    for entry in entries]
+        plan = {"budget": budget, "before": sum(t["before"] for t in textures),
+                "after": sum(t["after"] for t in textures), "textures": textures}
+        self.summary["vram"] = {key: plan[key] for key in ("budget", "before", "after")}
+        return plan
+
+    def _put(self, out: queue.Queue, entry):
+        # 队列满时等待转换线程消费，取消后不再阻塞
+        while not self._canceled:
+            try:
+                out.put(entry, timeout=TICK_INTERVAL)
+                return
+            except queue.Full:
+                pass
+
+    def _produce(self, item, out: queue.Queue):
+        """扫描线程：遍历一个输入项，边扫描边把规划好的任务放入有界队列，结束时放入 ("done", 文件数)"""
+        tracer = self.tracer
+        start = tracer.now()
+        found = 0
+        def scan_error(path, e):
+            self._scan_failed(item)
+            self._put(out, ("log", f"⚠ {path}: {str(e)}"))
+
+        try:
+            if item["type"] in ("archive", "bsa"):
+                paths = self._open_archive(item)
+            elif "files" in item:
+                paths = item["files"]  # MO2 配置中已按加载顺序筛出的胜出文件
+                for path, error in item.get("scan_errors", ()):
+                    scan_error(path, error)
+            else:
+                paths = scan_dds_files(item["work_dir"], on_error=scan_error)
+            if self.incremental:
+                # 输入能打开后才载入清单：没有任何胜出文件的模组也要据此删除过去的输出
+                self._manifest_entry(item)
+            solid = []  # .7z 成员需要先整体解压需要的部分
+            for src in paths:
+                if self._canceled:
+                    break
+                if not self._included(src):
+                    if self.incremental:
+                        self._keep_excluded(item, src)
+                    continue
+                found += 1
+                manifest_key = fp = None
+                if self.incremental:
+                    checked = self._check_unchanged(item, src)
+                    if checked is None:
+                        self._put(out, ("unchanged",))
+                        continue
+                    manifest_key, fp = checked
+                if item["type"] == "archive" and "reader" not in item and not src.exists():
+                    solid.append((src, manifest_key, fp))
+                    continue
+                self._put(out, self._plan(item, src, manifest_key, fp))
+            if solid and not self._canceled:
+                with tracer.span("prefetch_7z", input=item["source_path"].name, files=len(solid)):
+                    extract_7z_members(item["source_path"], {self._member_name(item, src): src
+                                                             for src, _, _ in solid}, item["work_dir"])
+                for src, manifest_key, fp in solid:
+                    self._put(out, self._plan(item, src, manifest_key, fp))
+        except Exception as e:
+            self._scan_failed(item)
+            self._put(out, ("log", f"EXCEPTION: {item['source_path'].name}: {str(e)}"))
+        finally:
+            tracer.add("scan", "stage", start, tracer.now(), input=item["source_path"].name, files=found)
+            out.put(("done", found))
+
+    def run(self):
+        try:
+            self._run()
+        finally:
+            # 无论完成、出错还是取消都释放临时数据
+            with self.tracer.span("cleanup"):
+                self.cleanup()
+            self._export_trace()
+        if self.summary.get("status") == "cancelled":
+            self._cancelled()
+
+    def cleanup(self):
+        """关闭压缩包读取器并删除临时解压目录。run() 结束时自动调用；只调用了 plan_vram() 或
+        没有调用 run() 的使用者需要自行调用，重复调用无害"""
+        for item in self.input_items:
+            if "reader" in item:
+                item["reader"].close()
+            if item.get("is_temp") and item["work_dir"].exists():
+                shutil.rmtree(item["work_dir"], ignore_errors=True)
+
+    def _run(self):
+        self._manifests = {}
+        self._manifest_lock = threading.Lock()
+        self._params = self._conversion_params()
+        tracer = self.tracer
+
+        self._zip_sink = None
+        if self.output_method != "folder":
+            try:
+                self._zip_sink = create_archive_sink(self.output_method, self.zip_output_path,
+                                                     self.archive_codec, self.compression_level)
+            except Exception as e:
+                self._error(str(e))
+                return
+            self._zip_sink.tracer = tracer
+
+        if self.cache_dir is not None:
+            try:
+                self._cache = ResultCache(self.cache_dir, self.cache_size)
+            except OSError as e:
+                self._log(f"EXCEPTION: cache: {str(e)}")
+        costs = self._costs = CostModel(self.timing_history)
+
+        # 扫描与转换并行：每个输入项一个扫描线程（os.scandir 遍历、读文件头、规划），
+        # 结果经有界队列交给调度循环，扫描未结束时转换已经开始
+        scan_queue = queue.Queue(maxsize=SCAN_QUEUE_SIZE)
+        scanners = ThreadPoolExecutor(max_workers=max(1, min(SCAN_THREADS, len(self.input_items))),
+                                      thread_name_prefix="scan")
+        for item in self.input_items:
+            scanners.submit(self._produce, item, scan_queue)
+        producers = len(self.input_items)
+
+        # 调度：待执行单元按估计耗时降序排列（最长任务优先，避免最后只剩一两个核在处理大贴图），
+        # 同时运行的单元不超过 max_workers，估计峰值内存之和不超过预算，大贴图放不下时由小贴图填满剩余容量。
+        # 小贴图先攒成批量单元；扫描结束或调度空闲时不足一批的也立即提交
+        pending = []  # (-估计耗时, 序号, 峰值内存, 单元)
+        batch = []
+        order = 0
+        found = total = done = success = skipped = kept = unchanged = 0
+        remaining_cost = estimated_done = measured_done = 0.0
+        memory_in_use = 0
+        convert_start = tracer.now()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="worker") as pool:
+            running = {}  # future -> 预留的内存
+            while True:
+                new_units = []
+                reported_total = total
+                try:
+                    if producers and not running and (not pending or self._canceled):
+                        entry = scan_queue.get(timeout=TICK_INTERVAL)
+                    else:
+                        entry = scan_queue.get_nowait()
+                    while True:
+                        kind = entry[0]
+                        if kind == "job":
+                            job = entry[1]
+                            job["cost"] = costs.estimate(job)
+                            remaining_cost += job["cost"]
+                            total += 1
+                            if self._batchable(job):
+                                batch.append(job)
+                                if len(batch) == self.batch_size:
+                                    new_units.append(batch)
+                                    batch = []
+                            else:
+                                new_units.append([job])
+                        elif kind in ("skip", "kept"):
+                            if kind == "skip":
+                                skipped += 1
+                            else:
+                                kept += 1
+                            # 无需输出，但记入清单，下次不再读取文件头
+                            self._record_manifest(entry[1], False)
+                        elif kind == "unchanged":
+                            unchanged += 1
+                        elif kind == "log":
+                            self._log(entry[1])
+                        elif kind == "done":
+                            producers -= 1
+                            found += entry[1]
+                        if len(pending) + len(new_units) >= SCAN_QUEUE_SIZE:
+                            # 待执行的单元已足够多，其余留在队列中，扫描线程随之暂停
+                            break
+                        entry = scan_queue.get_nowait()
+                except queue.Empty:
+                    pass
+                if batch and (not producers or not (running or pending or new_units)):
+                    new_units.append(batch)
+                    batch = []
+                for unit in new_units:
+                    order += 1
+                    pending.append((-sum(j["cost"] for j in unit), order,
+                                    max(self._job_memory(j) for j in unit), unit))
+                if new_units:
+                    pending.sort()
+                if total != reported_total:
+                    # 扫描过程中不断修正总数
+                    self._progress(done, total, success)
+
+                while not self._canceled and len(running) < self.max_workers:
+                    index = pick_admissible(pending, self.memory_budget - memory_in_use, idle=not running)
+                    if index is None:
+                        break
+                    _, _, memory, unit = pending.pop(index)
+                    memory_in_use += memory
+                    running[pool.submit(self._run_unit, unit)] = memory
+                if not running:
+                    if producers or (batch and not self._canceled):
+                        continue
+                    break
+                completed, _ = wait(running, timeout=TICK_INTERVAL, return_when=FIRST_COMPLETED)
+                self._tick()
+                for future in completed:
+                    memory_in_use -= running.pop(future)
+                    for job, ok, msg in future.result():
+                        done += 1
+                        if ok:
+                            success += 1
+                            self._record_manifest(job, True)
+                        # 剩余估计按已完成任务的实测/估计比例校正，得到剩余时间
+                        remaining_cost -= job["cost"]
+                        if "duration" in job and not job.get("cached"):
+                            estimated_done += job["cost"]
+                            measured_done += job["duration"]
+                            costs.observe(job, job["duration"])
+                        scale = measured_done / estimated_done if estimated_done > 0 else 1.0
+                        self._log(msg)
+                        self._eta(max(0.0, remaining_cost) * scale / self.max_workers)
+                        self._progress(done, total, success)
+        scanners.shutdown(wait=True)
+        tracer.add("convert", "stage", convert_start, tracer.now(), jobs=total, success=success)
+
+        scan_complete = not self._canceled
+        removed = self._finish_manifests(scan_complete)
+        overridden = sum(item.get("overridden", 0) for item in self.input_items)
+        self.summary.update(skipped=skipped, kept=kept, unchanged=unchanged, removed=removed,
+                            overridden=overridden)
+        if overridden:
+            self._log(f"⏭ Skipped {overridden} texture(s) overridden by higher-priority mods in modlist.txt")
+        if unchanged:
+            self._log(f"⏭ Unchanged since last run: {unchanged} texture(s)")
+        if removed:
+            self._log(f"🗑 Removed {removed} output(s) whose source no longer exists or is overridden")
+        if skipped:
+            target = "their planned size" if self.target_resolutions else f"{self.resolution}px"
+            self._log(f"⏭ Skipped {skipped} texture(s) already at or below {target}")
+        if kept:
+            self._log(f"⏭ Left {kept} BC4/BC5/BC6H texture(s) or BC7 normal map(s) without mipmaps unchanged "
+                      "(magick cannot write these formats)")
+
+        # 取消时同样保存清单，已完成的文件下次无需重做
+        with tracer.span("save_manifests"):
+            self._save_manifests()
+        try:
+            costs.save()
+        except OSError:
+            pass
+        if self._cache is not None:
+            self.summary["cache_hits"] = self._cache.hits
+        with tracer.span("package"):
+            created_zips = self._zip_sink.close() if self._zip_sink is not None else []
+        if self._canceled:
+            # 压缩包只含已完成的贴图，改名标记为不完整，避免被当作完整补丁使用
+            for zip_path in created_zips:
+                partial = zip_path.with_name(f"{zip_path.stem}.partial{zip_path.suffix}")
+                try:
+                    os.replace(zip_path, partial)
+                    self._log(f"⚠ Incomplete archive: {partial.name}")
+                except OSError as e:
+                    self._log(f"EXCEPTION: {zip_path.name}: {str(e)}")
+            self.summary["status"] = "cancelled"
+            return
+        if not found:
+            self._error("no_dds")
+            return
+
+        # === 输出汇总 ===
+        if self.output_method != "folder":
+            for zip_path in created_zips:
+                self._log(f"📦 Created: {zip_path.name}")
+            self._finished("success", success, total, str(self.zip_output_path))
+        elif self.output_method == "folder":
+            # 没有任何输出的输入项不会创建输出目录
+            output_dirs = [self._output_root(item) for item in self.input_items]
+            output_text = "\n".join(dict.fromkeys(str(d) for d in output_dirs if d.exists()))
+            self._finished("success", success, total, output_text)
+
+    def _export_trace(self):
+        if self.trace_path is None:
+            return
+        try:
+            self.tracer.export(self.trace_path)
+        except OSError as e:
+            self._log(f"EXCEPTION: trace: {str(e)}")
@@ -0,0 +1,341 @@
+# ========== 多语言字典 ==========
+LANGUAGES = {
+    "zh": {
+        "title": "上古卷轴DDS压缩工具",
+        "language_label": "语言 Language",
+        "material_folder": "材质文件夹或压缩包（每行一个路径）:",
+        "image_magick": "ImageMagick (magick.exe):",
+        "resolution": "分辨率:",
+        "process_mode": "处理模式:",
+        "mode_all": "全部处理",
+        "mode_skip_normals": "跳过法线贴图 (*_n, *_msn)",
+        "mode_only_normals": "仅处理法线贴图",
+        "copy_small": "复制已不大于目标分辨率的贴图到输出",
+        "use_cache": "复用缓存的转换结果（跨模组、跨运行共享）",
+        "output_method": "输出方式:",
+        "method_folder": "输出到文件夹",
+        "method_zip": "输出为 ZIP 压缩包",
+        "method_7z": "输出为 7Z 压缩包",
+        "compression_level": "压缩级别 (0 = 仅存储):",
+        "worker_count": "并行任务数:",
+        "memory_budget": "内存预算（0 为自动）:",
+        "start_button": "开始压缩",
+        "cancel_button": "取消压缩",
+        "browse": "浏览...",
+        "res_0.5k": "0.5K (512)",
+        "res_1k": "1K (1024)",
+        "res_2k": "2K (2048)",
+        "res_4k": "4K (4096)",
+        "error_input": "请输入有效的材质文件夹或压缩包路径！",
+        "error_magick": "请选择有效的 magick.exe！",
+        "no_dds": "未找到 .dds 文件！",
+        "processing": "处理中... {current}/{total}",
+        "eta": "剩余约 {eta}",
+        "success": "完成！\n成功处理: {success}/{total}\n输出路径:\n{output_dir}",
+        "auto_not_found": "注册表未找到 ImageMagick，请手动选择路径。",
+        "export_log": "导出日志",
+        "view_log": "查看日志",
+        "log_exported": "日志已导出至: {path}",
+        "file_processed": "{filename} → {output_path}",
+        "processing_time": "处理时间: {duration}s",
+        "canceling": "取消中...",
+        "cancelled": "已取消。",
+        "magick_not_found_tip": "无法通过注册表找到 magick.exe，请手动选择。",
+        "drag_hint": "↑ 可直接拖放文件夹、ZIP、7Z 或 BSA 到窗口",
+        "select_zip_path": "选择 ZIP 保存文件夹",
+        "zip_file": "ZIP 文件 (*.zip)",
+        "compressing_to_zip": "正在写入 ZIP... {current}/{total}",
+        "unsupported_archive": "不支持的压缩包格式: {ext}",
+        "info": "信息",
+        "no_log": "无日志内容可显示。",
+        "log_filter_all": "全部",
+        "log_filter_errors": "仅错误",
+        "log_filter_timeouts": "仅超时",
+        "log_export_success": "日志已导出至: {path}",
+        "log_export_error": "导出日志失败: {error}",
+        "success_title": "成功",
+        "error_title": "错误",
+        "cancel_confirm": "确定要取消当前操作吗？",
+        "custom_translation": "自定义翻译(custom)",
+        "select_custom_translation": "选择自定义翻译文件 (translate.json)",
+        "custom_translation_loaded": "自定义翻译已加载: {filename}",
+        "custom_translation_error": "加载自定义翻译失败: {error}",
+        "custom_translation_invalid": "无效的翻译文件: 缺少必要字段 '{missing_key}'",
+        "custom_translation_corrupted": "翻译文件损坏或格式不正确",
+        "custom_translation_path_saved": "自定义翻译路径已保存",
+        "custom_translation_not_found": "自定义翻译文件不存在: {path}",
+        "custom_translation_reset": "自定义翻译已重置"
+    },
+    "en": {
+        "title": "Skyrim DDS Compressor",
+        "language_label": "Language",
+        "material_folder": "Texture Folders or Archives (one per line):",
+        "image_magick": "ImageMagick (magick.exe):",
+        "resolution": "Resolution:",
+        "process_mode": "Processing Mode:",
+        "mode_all": "Process All",
+        "mode_skip_normals": "Skip Normal Maps (*_n, *_msn)",
+        "mode_only_normals": "Process Normals Only",
+        "copy_small": "Copy textures already at or below target resolution",
+        "use_cache": "Reuse cached results (shared across mods and runs)",
+        "output_method": "Output Method:",
+        "method_folder": "Output to Folder",
+        "method_zip": "Output as ZIP Archive",
+        "method_7z": "Output as 7Z Archive",
+        "compression_level": "Compression Level (0 = store only):",
+        "worker_count": "Parallel Jobs:",
+        "memory_budget": "Memory Budget (0 = auto):",
+        "start_button": "Start Compression",
+        "cancel_button": "Cancel Compression",
+        "browse": "Browse...",
+        "res_0.5k": "0.5K (512)",
+        "res_1k": "1K (1024)",
+        "res_2k": "2K (2048)",
+        "res_4k": "4K (4096)",
+        "error_input": "Please enter valid texture folders or archives!",
+        "error_magick": "Please select a valid magick.exe!",
+        "no_dds": "No .dds files found!",
+        "processing": "Processing... {current}/{total}",
+        "eta": "about {eta} left",
+        "success": "Completed!\nSuccessfully processed: {success}/{total}\nOutput paths:\n{output_dir}",
+        "auto_not_found": "ImageMagick not found in registry. Please select manually.",
+        "export_log": "Export Log",
+        "view_log": "View Log",
+        "log_exported": "Log exported to: {path}",
+        "file_processed": "{filename} → {output_path}",
+        "processing_time": "Processing time: {duration}s",
+        "canceling": "Canceling...",
+        "cancelled": "Cancelled.",
+        "magick_not_found_tip": "Could not find magick.exe via registry. Please select manually.",
+        "drag_hint": "↑ Drag & drop folders, ZIP, 7Z or BSA directly onto the window",
+        "select_zip_path": "Select ZIP Output Folder",
+        "zip_file": "ZIP Files (*.zip)",
+        "compressing_to_zip": "Writing to ZIP... {current}/{total}",
+        "unsupported_archive": "Unsupported archive format: {ext}",
+        "info": "Info",
+        "no_log": "No log content to display.",
+        "log_filter_all": "All",
+        "log_filter_errors": "Errors only",
+        "log_filter_timeouts": "Timeouts only",
+        "log_export_success": "Log exported to: {path}",
+        "log_export_error": "Failed to export log: {error}",
+        "success_title": "Success",
+        "error_title": "Error",
+        "cancel_confirm": "Are you sure you want to cancel the current operation?",
+        "custom_translation": "Custom Translation",
+        "select_custom_translation": "Select Custom Translation File (translate.json)",
+        "custom_translation_loaded": "Custom translation loaded: {filename}",
+        "custom_translation_error": "Failed to load custom translation: {error}",
+        "custom_translation_invalid": "Invalid translation file: Missing required field '{missing_key}'",
+        "custom_translation_corrupted": "Translation file corrupted or invalid format",
+        "custom_translation_path_saved": "Custom translation path saved",
+        "custom_translation_not_found": "Custom translation file not found: {path}",
+        "custom_translation_reset": "Custom translation reset"
+    },
+    "ru": {
+        "title": "Компрессор текстур Skyrim DDS",
+        "language_label": "Язык",
+        "material_folder": "Папки с текстурами или архивы (по одной на строку):",
+        "image_magick": "ImageMagick (magick.exe):",
+        "resolution": "Разрешение:",
+        "process_mode": "Режим обработки:",
+        "mode_all": "Обработать всё",
+        "mode_skip_normals": "Пропустить карты нормалей (*_n, *_msn)",
+        "mode_only_normals": "Только карты нормалей",
+        "copy_small": "Копировать текстуры, уже не превышающие целевое разрешение",
+        "use_cache": "Использовать кэш результатов (общий для модов и запусков)",
+        "output_method": "Способ вывода:",
+        "method_folder": "Вывод в папку",
+        "method_zip": "Вывод в ZIP-архив",
+        "method_7z": "Вывод в 7Z-архив",
+        "compression_level": "Уровень сжатия (0 = без сжатия):",
+        "worker_count": "Параллельные задачи:",
+        "memory_budget": "Лимит памяти (0 = авто):",
+        "start_button": "Начать сжатие",
+        "cancel_button": "Отменить сжатие",
+        "browse": "Обзор...",
+        "res_0.5k": "0.5K (512)",
+        "res_1k": "1K (1024)",
+        "res_2k": "2K (2048)",
+        "res_4k": "4K (4096)",
+        "error_input": "Введите корректные пути к папкам или архивам!",
+        "error_magick": "Выберите magick.exe!",
+        "no_dds": "Файлы .dds не найдены!",
+        "processing": "Обработка... {current}/{total}",
+        "eta": "осталось около {eta}",
+        "success": "Готово!\nУспешно: {success}/{total}\nПути вывода:\n{output_dir}",
+        "auto_not_found": "ImageMagick не найден в реестре. Выберите вручную.",
+        "export_log": "Экспорт журнала",
+        "view_log": "Просмотр журнала",
+        "log_exported": "Журнал экспортирован в: {path}",
+        "file_processed": "{filename} → {output_path}",
+        "processing_time": "Время обработки: {duration}s",
+        "canceling": "Отмена...",
+        "cancelled": "Отменено.",
+        "magick_not_found_tip": "Не удалось найти magick.exe через реестр. Пожалуйста, выберите вручную.",
+        "drag_hint": "↑ Перетащите папки, ZIP, 7Z или BSA прямо в окно",
+        "select_zip_path": "Выберите папку для сохранения ZIP",
+        "zip_file": "ZIP-файлы (*.zip)",
+        "compressing_to_zip": "Запись в ZIP... {current}/{total}",
+        "unsupported_archive": "Неподдерживаемый формат архива: {ext}",
+        "info": "Информация",
+        "no_log": "Нет содержимого журнала для отображения.",
+        "log_filter_all": "Все",
+        "log_filter_errors": "Только ошибки",
+        "log_filter_timeouts": "Только тайм-ауты",
+        "log_export_success": "Журнал экспортирован в: {path}",
+        "log_export_error": "Не удалось экспортировать журнал: {error}",
+        "success_title": "Готово",
+        "error_title": "Ошибка",
+        "cancel_confirm": "Вы уверены, что хотите отменить текущую операцию?",
+        "custom_translation": "Пользовательский перевод",
+        "select_custom_translation": "Выберите файл пользовательского перевода (translate.json)",
+        "custom_translation_loaded": "Пользовательский перевод загружен: {filename}",
+        "custom_translation_error": "Ошибка загрузки пользовательского перевода: {error}",
+        "custom_translation_invalid": "Неверный файл перевода: Отсутствует обязательное поле '{missing_key}'",
+        "custom_translation_corrupted": "Файл перевода поврежден или имеет неверный формат",
+        "custom_translation_path_saved": "Путь к пользовательскому переводу сохранен",
+        "custom_translation_not_found": "Файл пользовательского перевода не найден: {path}",
+        "custom_translation_reset": "Пользовательский перевод сброшен"
+    },
+    "fr": {
+        "title": "Compresseur DDS Skyrim",
+        "language_label": "Langue",
+        "material_folder": "Dossiers de textures ou archives (un par ligne):",
+        "image_magick": "ImageMagick (magick.exe):",
+        "resolution": "Résolution:",
+        "process_mode": "Mode de traitement:",
+        "mode_all": "Tout traiter",
+        "mode_skip_normals": "Ignorer les normales (*_n, *_msn)",
+        "mode_only_normals": "Normales uniquement",
+        "copy_small": "Copier les textures déjà à la résolution cible ou moins",
+        "use_cache": "Réutiliser les résultats en cache (partagés entre mods et exécutions)",
+        "output_method": "Méthode de sortie:",
+        "method_folder": "Exporter vers un dossier",
+        "method_zip": "Exporter en archive ZIP",
+        "method_7z": "Exporter en archive 7Z",
+        "compression_level": "Niveau de compression (0 = stockage seul) :",
+        "worker_count": "Tâches parallèles :",
+        "memory_budget": "Budget mémoire (0 = auto) :",
+        "start_button": "Commencer la compression",
+        "cancel_button": "Annuler la compression",
+        "browse": "Parcourir...",
+        "res_0.5k": "0.5K (512)",
+        "res_1k": "1K (1024)",
+        "res_2k": "2K (2048)",
+        "res_4k": "4K (4096)",
+        "error_input": "Entrez des chemins valides !",
+        "error_magick": "Sélectionnez magick.exe !",
+        "no_dds": "Aucun fichier .dds trouvé !",
+        "processing": "Traitement... {current}/{total}",
+        "eta": "environ {eta} restant",
+        "success": "Terminé!\nRéussi : {success}/{total}\nChemins sortie :\n{output_dir}",
+        "auto_not_found": "ImageMagick non trouvé. Sélectionnez manuellement.",
+        "export_log": "Exporter le journal",
+        "view_log": "Voir le journal",
+        "log_exported": "Journal exporté vers : {path}",
+        "file_processed": "{filename} → {output_path}",
+        "processing_time": "Temps d'exécution : {duration}s",
+        "canceling": "Annulation...",
+        "cancelled": "Annulé.",
+        "magick_not_found_tip": "Impossible de trouver magick.exe via le registre. Veuillez sélectionner manuellement.",
+        "drag_hint": "↑ Glissez-déposez des dossiers, ZIP, 7Z ou BSA directement dans la fenêtre",
+        "select_zip_path": "Choisir le dossier de sortie ZIP",
+        "zip_file": "Fichiers ZIP (*.zip)",
+        "compressing_to_zip": "Écriture dans le ZIP... {current}/{total}",
+        "unsupported_archive": "Format d'archive non pris en charge : {ext}",
+        "info": "Info",
+        "no_log": "Aucun contenu de journal à afficher.",
+        "log_filter_all": "Tout",
+        "log_filter_errors": "Erreurs uniquement",
+        "log_filter_timeouts": "Délais dépassés uniquement",
+        "log_export_success": "Journal exporté vers : {path}",
+        "log_export_error": "Échec de l'exportation du journal : {error}",
+        "success_title": "Succès",
+        "error_title": "Erreur",
+        "cancel_confirm": "Voulez-vous vraiment annuler l'opération en cours ?",
+        "custom_translation": "Traduction personnalisée",
+        "select_custom_translation": "Sélectionner le fichier de traduction personnalisée (translate.json)",
+        "custom_translation_loaded": "Traduction personnalisée chargée : {filename}",
+        "custom_translation_error": "Échec du chargement de la traduction personnalisée : {error}",
+        "custom_translation_invalid": "Fichier de traduction invalide : Champ requis manquant '{missing_key}'",
+        "custom_translation_corrupted": "Fichier de traduction corrompu ou format invalide",
+        "custom_translation_path_saved": "Chemin de la traduction personnalisée enregistré",
+        "custom_translation_not_found": "Fichier de traduction personnalisée introuvable : {path}",
+        "custom_translation_reset": "Traduction personnalisée réinitialisée"
+    },
+    "ko": {
+        "title": "스카이림 DDS 압축기",
+        "language_label": "언어",
+        "material_folder": "텍스처 폴더 또는 압축파일 (한 줄에 하나씩):",
+        "image_magick": "ImageMagick (magick.exe):",
+        "resolution": "해상도:",
+        "process_mode": "처리 모드:",
+        "mode_all": "모두 처리",
+        "mode_skip_normals": "노멀 맵 건너뛰기 (*_n, *_msn)",
+        "mode_only_normals": "노멀 맵만 처리",
+        "copy_small": "이미 목표 해상도 이하인 텍스처를 출력에 복사",
+        "use_cache": "캐시된 변환 결과 재사용 (모드·실행 간 공유)",
+        "output_method": "출력 방식:",
+        "method_folder": "폴더로 출력",
+        "method_zip": "ZIP 압축파일로 출력",
+        "method_7z": "7Z 압축파일로 출력",
+        "compression_level": "압축 수준 (0 = 저장만):",
+        "worker_count": "병렬 작업 수:",
+        "memory_budget": "메모리 예산 (0 = 자동):",
+        "start_button": "압축 시작",
+        "cancel_button": "압축 취소",
+        "browse": "찾아보기...",
+        "res_0.5k": "0.5K (512)",
+        "res_1k": "1K (1024)",
+        "res_2k": "2K (2048)",
+        "res_4k": "4K (4096)",
+        "error_input": "유효한 텍스처 폴더 또는 압축파일 경로를 입력하세요!",
+        "error_magick": "magick.exe를 선택하세요!",
+        "no_dds": ".dds 파일을 찾을 수 없습니다!",
+        "processing": "처리 중... {current}/{total}",
+        "eta": "약 {eta} 남음",
+        "success": "완료!\n성공: {success}/{total}\n출력 경로:\n{output_dir}",
+        "auto_not_found": "레지스트리에서 ImageMagick을 찾을 수 없습니다.",
+        "export_log": "로그 내보내기",
+        "view_log": "로그 보기",
+        "log_exported": "로그가 내보내졌습니다: {path}",
+        "file_processed": "{filename} → {output_path}",
+        "processing_time": "처리 시간: {duration}s",
+        "canceling": "취소 중...",
+        "cancelled": "취소됨.",
+        "magick_not_found_tip": "레지스트리를 통해 magick.exe를 찾을 수 없습니다. 직접 선택해 주세요.",
+        "drag_hint": "↑ 폴더, ZIP, 7Z 또는 BSA를 창 위로 직접 끌어다 놓으세요",
+        "select_zip_path": "ZIP 저장 폴더 선택",
+        "zip_file": "ZIP 파일 (*.zip)",
+        "compressing_to_zip": "ZIP에 쓰는 중... {current}/{total}",
+        "unsupported_archive": "지원되지 않는 압축 형식: {ext}",
+        "info": "정보",
+        "no_log": "표시할 로그 내용이 없습니다.",
+        "log_filter_all": "전체",
+        "log_filter_errors": "오류만",
+        "log_filter_timeouts": "시간 초과만",
+        "log_export_success": "로그가 내보내졌습니다: {path}",
+        "log_export_error": "로그 내보내기 실패: {error}",
+        "success_title": "완료",
+        "error_title": "오류",
+        "cancel_confirm": "현재 작업을 취소하시겠습니까?",
+        "custom_translation": "사용자 정의 번역",
+        "select_custom_translation": "사용자 정의 번역 파일 선택 (translate.json)",
+        "custom_translation_loaded": "사용자 정의 번역 로드됨: {filename}",
+        "custom_translation_error": "사용자 정의 번역 로드 실패: {error}",
+        "custom_translation_invalid": "잘못된 번역 파일: 필수 필드 '{missing_key}' 누락",
+        "custom_translation_corrupted": "번역 파일 손상 또는 잘못된 형식",
+        "custom_translation_path_saved": "사용자 정의 번역 경로 저장됨",
+        "custom_translation_not_found": "사용자 정의 번역 파일을 찾을 수 없음: {path}",
+        "custom_translation_reset": "사용자 정의 번역 재설정됨"
+    },
+    # "custom" 将在运行时动态加载
+}
+
+# 验证翻译文件所需的最小键集（关键界面元素）
+REQUIRED_TRANSLATION_KEYS = {
+    "title", "language_label", "material_folder", "image_magick", 
+    "resolution", "process_mode", "output_method", "start_button", 
+    "browse", "error_input", "error_magick", "success_title", "error_title"
+}
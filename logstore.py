@@ -0,0 +1,147 @@
+"""日志存储：日志边产生边追加到磁盘上的分段文件，内存中只保留最近的尾部和每条的位置索引。
+不依赖 Qt，查看器按需读取可见的行。"""
+import shutil
+from array import array
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+from engine import default_cache_dir
+
+LOG_SEGMENT_BYTES = 8 * 1024 * 1024  # 单个分段文件的上限
+LOG_MAX_SEGMENTS = 32                # 超过后删除最早的分段
+LOG_KEEP_RUNS = 10                   # 日志目录中保留的最近运行数
+LOG_TAIL_LINES = 2000                # 内存中的最近日志条数
+
+# 日志条目类型，用于过滤
+KIND_INFO, KIND_ERROR, KIND_TIMEOUT = 0, 1, 2
+LOG_FILTERS = {
+    "all": None,
+    "errors": (KIND_ERROR, KIND_TIMEOUT),
+    "timeouts": (KIND_TIMEOUT,),
+}
+
+
+def default_log_dir() -> Path:
+    return default_cache_dir() / "logs"
+
+
+def classify(msg: str) -> int:
+    if msg.startswith("TIMEOUT:"):
+        return KIND_TIMEOUT
+    if msg.startswith(("ERROR:", "EXCEPTION:")):
+        return KIND_ERROR
+    return KIND_INFO
+
+
+class LogStore:
+    """一次运行的日志。每条消息（可含换行）为一个条目，按 (分段, 偏移, 长度) 索引，
+    最近 LOG_TAIL_LINES 条同时留在内存中。分段轮转后最早的条目不再可读。"""
+
+    def __init__(self, log_dir: Path = None, segment_bytes=LOG_SEGMENT_BYTES, max_segments=LOG_MAX_SEGMENTS):
+        self.log_dir = Path(log_dir) if log_dir else default_log_dir()
+        self.log_dir.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.max_segments = max_segments
+        self.run_name = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        self._prune_runs()
+
+        self._segments = []           # 仍在磁盘上的分段号
+        self._dropped = 0             # 已被轮转删除的条目数
+        self._seg = array("I")        # 条目 -> 分段号
+        self._offset = array("Q")     # 条目 -> 分段内偏移
+        self._length = array("I")     # 条目 -> 字节数（含结尾换行）
+        self._kind = bytearray()      # 条目 -> 类型
+        self._tail = deque(maxlen=LOG_TAIL_LINES)
+        self._writer = None
+        self._readers = {}
+        self._open_segment(0)
+
+    def _segment_path(self, number) -> Path:
+        return self.log_dir / f"{self.run_name}.{number:03d}.log"
+
+    def _prune_runs(self):
+        runs = sorted({p.name.split(".")[0] for p in self.log_dir.glob("*.log")})
+        for run in runs[:max(0, len(runs) - (LOG_KEEP_RUNS - 1))]:
+            for p in self.log_dir.glob(f"{run}.*.log"):
+                try:
+                    p.unlink()
+                except OSError:
+                    pass
+
+    def _open_segment(self, number):
+        if self._writer is not None:
+            self._writer.close()
+        self._writer = open(self._segment_path(number), "ab")
+        self._segments.append(number)
+        if len(self._segments) > self.max_segments:
+            oldest = self._segments.pop(0)
+            reader = self._readers.pop(oldest, None)
+            if reader is not None:
+                reader.close()
+            try:
+                self._segment_path(oldest).unlink()
+            except OSError:
+                pass
+            while self._dropped < len(self._seg) and self._seg[self._dropped] == oldest:
+                self._dropped += 1
+
+    def append(self, msg: str):
+        data = (msg + "\n").encode("utf-8")
+        if self._writer.tell() and self._writer.tell() + len(data) > self.segment_bytes:
+            self._open_segment(self._segments[-1] + 1)
+        self._seg.append(self._segments[-1])
+        self._offset.append(self._writer.tell())
+        self._length.append(len(data))
+        self._kind.append(classify(msg))
+        self._writer.write(data)
+        self._tail.append(msg)
+
+    def __len__(self):
+        return len(self._seg)
+
+    @property
+    def first_available(self):
+        """最早仍可读取的条目序号"""
+        return self._dropped
+
+    def get(self, index) -> str:
+        """读取第 index 条；尾部直接取内存，其余从磁盘读取"""
+        tail_start = len(self._seg) - len(self._tail)
+        if index >= tail_start:
+            return self._tail[index - tail_start]
+        if index < self._dropped:
+            return ""
+        number = self._seg[index]
+        reader = self._readers.get(number)
+        if reader is None:
+            reader = self._readers[number] = open(self._segment_path(number), "rb")
+        if self._writer is not None:
+            self._writer.flush()
+        reader.seek(self._offset[index])
+        return reader.read(self._length[index]).decode("utf-8", errors="replace").rstrip("\n")
+
+    def matching(self, name="all"):
+        """符合过滤条件的条目序号（array），只扫描类型字节，不读取内容"""
+        kinds = LOG_FILTERS[name]
+        start = self._dropped
+        if kinds is None:
+            return array("Q", range(start, len(self._kind)))
+        return array("Q", (i for i in range(start, len(self._kind)) if self._kind[i] in kinds))
+
+    def export(self, dest):
+        """按顺序把磁盘上的分段拼接复制到 dest"""
+        if self._writer is not None:
+            self._writer.flush()
+        with open(dest, "wb") as out:
+            for number in self._segments:
+                with open(self._segment_path(number), "rb") as f:
+                    shutil.copyfileobj(f, out, 1024 * 1024)
+
+    def close(self):
+        for reader in self._readers.values():
+            reader.close()
+        self._readers = {}
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
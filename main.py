@@ -1,33 +1,28 @@
 import sys
 import os
-import subprocess
+import time
 import threading
 from pathlib import Path
-import winreg
 from datetime import datetime
-import urllib.parse
-import tempfile
-import shutil
-import zipfile
 import json
-import re
-import locale
-
-# 可选：7z 支持
-try:
-    import py7zr
-    HAS_7Z = True
-except ImportError:
-    HAS_7Z = False
 
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
     QPushButton, QComboBox, QProgressBar, QMessageBox, QFileDialog, 
-    QCheckBox, QTextEdit, QDialog, QInputDialog
+    QCheckBox, QTextEdit, QDialog, QInputDialog, QSpinBox, QListView
+)
+from PyQt5.QtCore import (
+    Qt, pyqtSignal, QObject, QThread, QSettings, QTimer, QTranslator, QLocale, QAbstractListModel, QModelIndex
 )
-from PyQt5.QtCore import Qt, pyqtSignal, QObject, QThread, QSettings, QTimer, QTranslator, QLocale
 from PyQt5.QtGui import QFont, QIcon
 
+from languages import LANGUAGES, REQUIRED_TRANSLATION_KEYS
+from logstore import LogStore
+from engine import (
+    HAS_7Z, MO2_MODLIST, ConversionEngine, default_cache_dir, default_timing_history, default_worker_count,
+    find_imagemagick, format_duration, parse_input_lines
+)
+
 def resource_path(relative_path):
     try:
         base_path = sys._MEIPASS
@@ -35,523 +30,86 @@ def resource_path(relative_path):
         base_path = Path(__file__).resolve().parent
     return Path(base_path) / relative_path
 
-# ========== 辅助函数 ==========
-def get_unique_filename(base_name, extension=".zip"):
-    base_path = Path(base_name).with_suffix("")
-    candidate = base_path.with_suffix(extension)
-    counter = 0
-    while candidate.exists():
-        counter += 1
-        candidate = base_path.with_name(f"{base_path.name}_{counter}").with_suffix(extension)
-    return candidate
-
-def find_imagemagick_from_registry():
-    try:
-        with winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\ImageMagick\Current") as key:
-            path, _ = winreg.QueryValueEx(key, "BinPath")
-            magick_path = os.path.join(path, "magick.exe")
-            if os.path.isfile(magick_path):
-                return magick_path
-    except Exception:
-        pass
-    return None
-
-def is_normal_map(filepath: Path) -> bool:
-    stem = filepath.stem.lower()
-    return stem.endswith('_n') or stem.endswith('_msn')
-
-def extract_archive(archive_path: Path, temp_dir: Path):
-    """解压 .zip 或 .7z 到 temp_dir，返回解压后的根目录列表"""
-    extracted_roots = []
-    archive_name = archive_path.stem
-    extract_to = temp_dir / archive_name
-    extract_to.mkdir(parents=True, exist_ok=True)
-
-    try:
-        if archive_path.suffix.lower() == '.zip':
-            with zipfile.ZipFile(archive_path, 'r') as zf:
-                zf.extractall(extract_to)
-        elif archive_path.suffix.lower() == '.7z':
-            if not HAS_7Z:
-                raise RuntimeError("py7zr not installed. Run: pip install py7zr")
-            with py7zr.SevenZipFile(archive_path, mode='r') as z:
-                z.extractall(path=extract_to)
-        else:
-            return extracted_roots  # 不支持
-
-        # 获取顶级文件夹（可能有多个）
-        for item in extract_to.iterdir():
-            if item.is_dir():
-                extracted_roots.append(item)
-            else:
-                # 如果没有顶层文件夹（平铺文件），则以 extract_to 为根
-                extracted_roots.append(extract_to)
-                break
-
-        if not extracted_roots:
-            extracted_roots.append(extract_to)
-    except Exception as e:
-        raise RuntimeError(f"Failed to extract {archive_path}: {e}")
-
-    return list(set(extracted_roots))  # 去重
-
-# ========== 多语言字典 ==========
-LANGUAGES = {
-    "zh": {
-        "title": "上古卷轴DDS压缩工具",
-        "language_label": "语言 Language",
-        "material_folder": "材质文件夹或压缩包（每行一个路径）:",
-        "image_magick": "ImageMagick (magick.exe):",
-        "resolution": "分辨率:",
-        "process_mode": "处理模式:",
-        "mode_all": "全部处理",
-        "mode_skip_normals": "跳过法线贴图 (*_n, *_msn)",
-        "mode_only_normals": "仅处理法线贴图",
-        "output_method": "输出方式:",
-        "method_folder": "输出到文件夹",
-        "method_zip": "输出为 ZIP 压缩包",
-        "start_button": "开始压缩",
-        "cancel_button": "取消压缩",
-        "browse": "浏览...",
-        "res_0.5k": "0.5K (512)",
-        "res_1k": "1K (1024)",
-        "res_2k": "2K (2048)",
-        "res_4k": "4K (4096)",
-        "error_input": "请输入有效的材质文件夹或压缩包路径！",
-        "error_magick": "请选择有效的 magick.exe！",
-        "no_dds": "未找到 .dds 文件！",
-        "processing": "处理中... {current}/{total}",
-        "success": "完成！\n成功处理: {success}/{total}\n输出路径:\n{output_dir}",
-        "auto_not_found": "注册表未找到 ImageMagick，请手动选择路径。",
-        "export_log": "导出日志",
-        "view_log": "查看日志",
-        "log_exported": "日志已导出至: {path}",
-        "file_processed": "{filename} → {output_path}",
-        "processing_time": "处理时间: {duration}s",
-        "canceling": "取消中...",
-        "cancelled": "已取消。",
-        "magick_not_found_tip": "无法通过注册表找到 magick.exe，请手动选择。",
-        "drag_hint": "↑ 可直接拖放文件夹、ZIP 或 7Z 到窗口",
-        "select_zip_path": "选择 ZIP 保存文件夹",
-        "zip_file": "ZIP 文件 (*.zip)",
-        "compressing_to_zip": "正在写入 ZIP... {current}/{total}",
-        "unsupported_archive": "不支持的压缩包格式: {ext}",
-        "info": "信息",
-        "no_log": "无日志内容可显示。",
-        "log_export_success": "日志已导出至: {path}",
-        "log_export_error": "导出日志失败: {error}",
-        "success_title": "成功",
-        "error_title": "错误",
-        "cancel_confirm": "确定要取消当前操作吗？",
-        "custom_translation": "自定义翻译(custom)",
-        "select_custom_translation": "选择自定义翻译文件 (translate.json)",
-        "custom_translation_loaded": "自定义翻译已加载: {filename}",
-        "custom_translation_error": "加载自定义翻译失败: {error}",
-        "custom_translation_invalid": "无效的翻译文件: 缺少必要字段 '{missing_key}'",
-        "custom_translation_corrupted": "翻译文件损坏或格式不正确",
-        "custom_translation_path_saved": "自定义翻译路径已保存",
-        "custom_translation_not_found": "自定义翻译文件不存在: {path}",
-        "custom_translation_reset": "自定义翻译已重置"
-    },
-    "en": {
-        "title": "Skyrim DDS Compressor",
-        "language_label": "Language",
-        "material_folder": "Texture Folders or Archives (one per line):",
-        "image_magick": "ImageMagick (magick.exe):",
-        "resolution": "Resolution:",
-        "process_mode": "Processing Mode:",
-        "mode_all": "Process All",
-        "mode_skip_normals": "Skip Normal Maps (*_n, *_msn)",
-        "mode_only_normals": "Process Normals Only",
-        "output_method": "Output Method:",
-        "method_folder": "Output to Folder",
-        "method_zip": "Output as ZIP Archive",
-        "start_button": "Start Compression",
-        "cancel_button": "Cancel Compression",
-        "browse": "Browse...",
-        "res_0.5k": "0.5K (512)",
-        "res_1k": "1K (1024)",
-        "res_2k": "2K (2048)",
-        "res_4k": "4K (4096)",
-        "error_input": "Please enter valid texture folders or archives!",
-        "error_magick": "Please select a valid magick.exe!",
-        "no_dds": "No .dds files found!",
-        "processing": "Processing... {current}/{total}",
-        "success": "Completed!\nSuccessfully processed: {success}/{total}\nOutput paths:\n{output_dir}",
-        "auto_not_found": "ImageMagick not found in registry. Please select manually.",
-        "export_log": "Export Log",
-        "view_log": "View Log",
-        "log_exported": "Log exported to: {path}",
-        "file_processed": "{filename} → {output_path}",
-        "processing_time": "Processing time: {duration}s",
-        "canceling": "Canceling...",
-        "cancelled": "Cancelled.",
-        "magick_not_found_tip": "Could not find magick.exe via registry. Please select manually.",
-        "drag_hint": "↑ Drag & drop folders, ZIP or 7Z directly onto the window",
-        "select_zip_path": "Select ZIP Output Folder",
-        "zip_file": "ZIP Files (*.zip)",
-        "compressing_to_zip": "Writing to ZIP... {current}/{total}",
-        "unsupported_archive": "Unsupported archive format: {ext}",
-        "info": "Info",
-        "no_log": "No log content to display.",
-        "log_export_success": "Log exported to: {path}",
-        "log_export_error": "Failed to export log: {error}",
-        "success_title": "Success",
-        "error_title": "Error",
-        "cancel_confirm": "Are you sure you want to cancel the current operation?",
-        "custom_translation": "Custom Translation",
-        "select_custom_translation": "Select Custom Translation File (translate.json)",
-        "custom_translation_loaded": "Custom translation loaded: {filename}",
-        "custom_translation_error": "Failed to load custom translation: {error}",
-        "custom_translation_invalid": "Invalid translation file: Missing required field '{missing_key}'",
-        "custom_translation_corrupted": "Translation file corrupted or invalid format",
-        "custom_translation_path_saved": "Custom translation path saved",
-        "custom_translation_not_found": "Custom translation file not found: {path}",
-        "custom_translation_reset": "Custom translation reset"
-    },
-    "ru": {
-        "title": "Компрессор текстур Skyrim DDS",
-        "language_label": "Язык",
-        "material_folder": "Папки с текстурами или архивы (по одной на строку):",
-        "image_magick": "ImageMagick (magick.exe):",
-        "resolution": "Разрешение:",
-        "process_mode": "Режим обработки:",
-        "mode_all": "Обработать всё",
-        "mode_skip_normals": "Пропустить карты нормалей (*_n, *_msn)",
-        "mode_only_normals": "Только карты нормалей",
-        "output_method": "Способ вывода:",
-        "method_folder": "Вывод в папку",
-        "method_zip": "Вывод в ZIP-архив",
-        "start_button": "Начать сжатие",
-        "cancel_button": "Отменить сжатие",
-        "browse": "Обзор...",
-        "res_0.5k": "0.5K (512)",
-        "res_1k": "1K (1024)",
-        "res_2k": "2K (2048)",
-        "res_4k": "4K (4096)",
-        "error_input": "Введите корректные пути к папкам или архивам!",
-        "error_magick": "Выберите magick.exe!",
-        "no_dds": "Файлы .dds не найдены!",
-        "processing": "Обработка... {current}/{total}",
-        "success": "Готово!\nУспешно: {success}/{total}\nПути вывода:\n{output_dir}",
-        "auto_not_found": "ImageMagick не найден в реестре. Выберите вручную.",
-        "export_log": "Экспорт журнала",
-        "view_log": "Просмотр журнала",
-        "log_exported": "Журнал экспортирован в: {path}",
-        "file_processed": "{filename} → {output_path}",
-        "processing_time": "Время обработки: {duration}s",
-        "canceling": "Отмена...",
-        "cancelled": "Отменено.",
-        "magick_not_found_tip": "Не удалось найти magick.exe через реестр. Пожалуйста, выберите вручную.",
-        "drag_hint": "↑ Перетащите папки, ZIP или 7Z прямо в окно",
-        "select_zip_path": "Выберите папку для сохранения ZIP",
-        "zip_file": "ZIP-файлы (*.zip)",
-        "compressing_to_zip": "Запись в ZIP... {current}/{total}",
-        "unsupported_archive": "Неподдерживаемый формат архива: {ext}",
-        "info": "Информация",
-        "no_log": "Нет содержимого журнала для отображения.",
-        "log_export_success": "Журнал экспортирован в: {path}",
-        "log_export_error": "Не удалось экспортировать журнал: {error}",
-        "success_title": "Готово",
-        "error_title": "Ошибка",
-        "cancel_confirm": "Вы уверены, что хотите отменить текущую операцию?",
-        "custom_translation": "Пользовательский перевод",
-        "select_custom_translation": "Выберите файл пользовательского перевода (translate.json)",
-        "custom_translation_loaded": "Пользовательский перевод загружен: {filename}",
-        "custom_translation_error": "Ошибка загрузки пользовательского перевода: {error}",
-        "custom_translation_invalid": "Неверный файл перевода: Отсутствует обязательное поле '{missing_key}'",
-        "custom_translation_corrupted": "Файл перевода поврежден или имеет неверный формат",
-        "custom_translation_path_saved": "Путь к пользовательскому переводу сохранен",
-        "custom_translation_not_found": "Файл пользовательского перевода не найден: {path}",
-        "custom_translation_reset": "Пользовательский перевод сброшен"
-    },
-    "fr": {
-        "title": "Compresseur DDS Skyrim",
-        "language_label": "Langue",
-        "material_folder": "Dossiers de textures ou archives (un par ligne):",
-        "image_magick": "ImageMagick (magick.exe):",
-        "resolution": "Résolution:",
-        "process_mode": "Mode de traitement:",
-        "mode_all": "Tout traiter",
-        "mode_skip_normals": "Ignorer les normales (*_n, *_msn)",
-        "mode_only_normals": "Normales uniquement",
-        "output_method": "Méthode de sortie:",
-        "method_folder": "Exporter vers un dossier",
-        "method_zip": "Exporter en archive ZIP",
-        "start_button": "Commencer la compression",
-        "cancel_button": "Annuler la compression",
-        "browse": "Parcourir...",
-        "res_0.5k": "0.5K (512)",
-        "res_1k": "1K (1024)",
-        "res_2k": "2K (2048)",
-        "res_4k": "4K (4096)",
-        "error_input": "Entrez des chemins valides !",
-        "error_magick": "Sélectionnez magick.exe !",
-        "no_dds": "Aucun fichier .dds trouvé !",
-        "processing": "Traitement... {current}/{total}",
-        "success": "Terminé!\nRéussi : {success}/{total}\nChemins sortie :\n{output_dir}",
-        "auto_not_found": "ImageMagick non trouvé. Sélectionnez manuellement.",
-        "export_log": "Exporter le journal",
-        "view_log": "Voir le journal",
-        "log_exported": "Journal exporté vers : {path}",
-        "file_processed": "{filename} → {output_path}",
-        "processing_time": "Temps d'exécution : {duration}s",
-        "canceling": "Annulation...",
-        "cancelled": "Annulé.",
-        "magick_not_found_tip": "Impossible de trouver magick.exe via le registre. Veuillez sélectionner manuellement.",
-        "drag_hint": "↑ Glissez-déposez des dossiers, ZIP ou 7Z directement dans la fenêtre",
-        "select_zip_path": "Choisir le dossier de sortie ZIP",
-        "zip_file": "Fichiers ZIP (*.zip)",
-        "compressing_to_zip": "Écriture dans le ZIP... {current}/{total}",
-        "unsupported_archive": "Format d'archive non pris en charge : {ext}",
-        "info": "Info",
-        "no_log": "Aucun contenu de journal à afficher.",
-        "log_export_success": "Journal exporté vers : {path}",
-        "log_export_error": "Échec de l'exportation du journal : {error}",
-        "success_title": "Succès",
-        "error_title": "Erreur",
-        "cancel_confirm": "Voulez-vous vraiment annuler l'opération en cours ?",
-        "custom_translation": "Traduction personnalisée",
-        "select_custom_translation": "Sélectionner le fichier de traduction personnalisée (translate.json)",
-        "custom_translation_loaded": "Traduction personnalisée chargée : {filename}",
-        "custom_translation_error": "Échec du chargement de la traduction personnalisée : {error}",
-        "custom_translation_invalid": "Fichier de traduction invalide : Champ requis manquant '{missing_key}'",
-        "custom_translation_corrupted": "Fichier de traduction corrompu ou format invalide",
-        "custom_translation_path_saved": "Chemin de la traduction personnalisée enregistré",
-        "custom_translation_not_found": "Fichier de traduction personnalisée introuvable : {path}",
-        "custom_translation_reset": "Traduction personnalisée réinitialisée"
-    },
-    "ko": {
-        "title": "스카이림 DDS 압축기",
-        "language_label": "언어",
-        "material_folder": "텍스처 폴더 또는 압축파일 (한 줄에 하나씩):",
-        "image_magick": "ImageMagick (magick.exe):",
-        "resolution": "해상도:",
-        "process_mode": "처리 모드:",
-        "mode_all": "모두 처리",
-        "mode_skip_normals": "노멀 맵 건너뛰기 (*_n, *_msn)",
-        "mode_only_normals": "노멀 맵만 처리",
-        "output_method": "출력 방식:",
-        "method_folder": "폴더로 출력",
-        "method_zip": "ZIP 압축파일로 출력",
-        "start_button": "압축 시작",
-        "cancel_button": "압축 취소",
-        "browse": "찾아보기...",
-        "res_0.5k": "0.5K (512)",
-        "res_1k": "1K (1024)",
-        "res_2k": "2K (2048)",
-        "res_4k": "4K (4096)",
-        "error_input": "유효한 텍스처 폴더 또는 압축파일 경로를 입력하세요!",
-        "error_magick": "magick.exe를 선택하세요!",
-        "no_dds": ".dds 파일을 찾을 수 없습니다!",
-        "processing": "처리 중... {current}/{total}",
-        "success": "완료!\n성공: {success}/{total}\n출력 경로:\n{output_dir}",
-        "auto_not_found": "레지스트리에서 ImageMagick을 찾을 수 없습니다.",
-        "export_log": "로그 내보내기",
-        "view_log": "로그 보기",
-        "log_exported": "로그가 내보내졌습니다: {path}",
-        "file_processed": "{filename} → {output_path}",
-        "processing_time": "처리 시간: {duration}s",
-        "canceling": "취소 중...",
-        "cancelled": "취소됨.",
-        "magick_not_found_tip": "레지스트리를 통해 magick.exe를 찾을 수 없습니다. 직접 선택해 주세요.",
-        "drag_hint": "↑ 폴더, ZIP 또는 7Z를 창 위로 직접 끌어다 놓으세요",
-        "select_zip_path": "ZIP 저장 폴더 선택",
-        "zip_file": "ZIP 파일 (*.zip)",
-        "compressing_to_zip": "ZIP에 쓰는 중... {current}/{total}",
-        "unsupported_archive": "지원되지 않는 압축 형식: {ext}",
-        "info": "정보",
-        "no_log": "표시할 로그 내용이 없습니다.",
-        "log_export_success": "로그가 내보내졌습니다: {path}",
-        "log_export_error": "로그 내보내기 실패: {error}",
-        "success_title": "완료",
-        "error_title": "오류",
-        "cancel_confirm": "현재 작업을 취소하시겠습니까?",
-        "custom_translation": "사용자 정의 번역",
-        "select_custom_translation": "사용자 정의 번역 파일 선택 (translate.json)",
-        "custom_translation_loaded": "사용자 정의 번역 로드됨: {filename}",
-        "custom_translation_error": "사용자 정의 번역 로드 실패: {error}",
-        "custom_translation_invalid": "잘못된 번역 파일: 필수 필드 '{missing_key}' 누락",
-        "custom_translation_corrupted": "번역 파일 손상 또는 잘못된 형식",
-        "custom_translation_path_saved": "사용자 정의 번역 경로 저장됨",
-        "custom_translation_not_found": "사용자 정의 번역 파일을 찾을 수 없음: {path}",
-        "custom_translation_reset": "사용자 정의 번역 재설정됨"
-    },
-    # "custom" 将在运行时动态加载
-}
-
-# 验证翻译文件所需的最小键集（关键界面元素）
-REQUIRED_TRANSLATION_KEYS = {
-    "title", "language_label", "material_folder", "image_magick", 
-    "resolution", "process_mode", "output_method", "start_button", 
-    "browse", "error_input", "error_magick", "success_title", "error_title"
-}
-
 class Worker(QObject):
-    progress = pyqtSignal(int, int, int)
-    log = pyqtSignal(str)
+    """把 ConversionEngine 的回调转成 Qt 信号，在 QThread 中运行。
+    日志和进度先缓存，每 FLUSH_INTERVAL 秒或攒够 FLUSH_LINES 行时合并为一次 updates 信号，
+    界面开销与转换速度无关"""
+    FLUSH_INTERVAL = 0.1
+    FLUSH_LINES = 500
+    updates = pyqtSignal(list, int, int, int, float)  # 日志行, 当前, 总数, 成功, 剩余秒数（未知为 -1）
     finished = pyqtSignal(str, int, int, str)
     error = pyqtSignal(str)
+    cancelled = pyqtSignal()
 
-    def __init__(self, input_items, magick_exec, resolution, process_mode, current_lang, output_method="folder", zip_output_path=None):
+    def __init__(self, input_items, magick_exec, resolution, process_mode, current_lang, **options):
         super().__init__()
-        self.input_items = input_items  # List of dicts
-        self.magick_exec = magick_exec
-        self.resolution = resolution
-        self.process_mode = process_mode
-        self.current_lang = current_lang
-        self.output_method = output_method
-        self.zip_output_path = Path(zip_output_path) if zip_output_path else None
-        self._canceled = False
-
-    def cancel(self):
-        self._canceled = True
-
-    def _(self, key):
-        # 支持自定义翻译
-        if self.current_lang == "custom" and "custom" in LANGUAGES:
-            return LANGUAGES["custom"].get(key, LANGUAGES["en"].get(key, key))
-        return LANGUAGES.get(self.current_lang, LANGUAGES["en"]).get(key, key)
-
-    def run(self):
-        total_files = []
-        for item in self.input_items:
-            work_dir = item["work_dir"]
-            for p in work_dir.rglob("*.dds"):
-                is_normal = is_normal_map(p)
-                include = False
-                if self.process_mode == "all":
-                    include = True
-                elif self.process_mode == "skip_normals":
-                    include = not is_normal
-                elif self.process_mode == "only_normals":
-                    include = is_normal
-                if include:
-                    total_files.append((item, p))
+        self._lock = threading.Lock()
+        self._lines = []
+        self._progress = (0, 0, 0)
+        self._eta = -1.0
+        self._dirty = False
+        self._last_flush = 0.0
+        self.engine = ConversionEngine(
+            input_items, magick_exec, resolution, process_mode, current_lang,
+            on_progress=self._on_progress,
+            on_log=self._on_log,
+            on_finished=self._on_finished,
+            on_error=self._on_error,
+            on_eta=self._on_eta,
+            on_tick=self._maybe_flush,
+            on_cancelled=self._on_cancelled,
+            **options
+        )
 
-        if not total_files:
-            self.error.emit("no_dds")
-            return
+    def _on_log(self, msg):
+        with self._lock:
+            self._lines.append(msg)
+            self._dirty = True
+        self._maybe_flush()
 
-        success = 0
-        total = len(total_files)
+    def _on_progress(self, current, total, success):
+        with self._lock:
+            self._progress = (current, total, success)
+            self._dirty = True
+        self._maybe_flush()
 
-        temp_output_base = None
-        if self.output_method == "zip":
-            temp_output_base = Path(tempfile.mkdtemp())
+    def _on_eta(self, seconds):
+        with self._lock:
+            self._eta = seconds
 
-        for i, (item, src) in enumerate(total_files):
-            if self._canceled:
-                return
+    def _on_finished(self, status, success, total, output):
+        self.flush()
+        self.finished.emit(status, success, total, output)
 
-            start_time = datetime.now()
-            
-            if self.output_method == "folder":
-                if item["type"] == "folder":
-                    mod_root = item["source_path"]
-                    output_root = mod_root.parent / (mod_root.name + "_low_res")
-                else:  # archive
-                    mod_root = item["work_dir"]
-                    original_name = item["source_path"].stem
-                    output_root = item["source_path"].parent / (original_name + "_low_res")
-                rel_path = src.relative_to(item["work_dir"])
-                dst = output_root / rel_path
-                dst.parent.mkdir(parents=True, exist_ok=True)
-            else:  # zip mode
-                safe_name = "".join(c if c.isalnum() or c in "._-" else "_" for c in item["source_path"].stem)
-                temp_mod_dir = temp_output_base / safe_name
-                rel_path = src.relative_to(item["work_dir"])
-                dst = temp_mod_dir / rel_path
-                dst.parent.mkdir(parents=True, exist_ok=True)
+    def _on_error(self, key):
+        self.flush()
+        self.error.emit(key)
 
-            is_normal = is_normal_map(src)
-            cmd = [self.magick_exec, str(src)]
-            if is_normal:
-                cmd += ["-blur", "0x1.0",  f"{self.resolution}x{self.resolution}>", "-define", "dds:compression=auto"]
-            else:
-                cmd += ["-blur", "0x1.0", "-filter", "Lanczos", f"{self.resolution}x{self.resolution}>", "-define", "dds:compression=auto"]
-            cmd.append(str(dst))
-            
-            creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
-            try:
-                # 不使用text=True，手动处理编码
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    timeout=60,
-                    creationflags=creationflags
-                )
-                duration = (datetime.now() - start_time).total_seconds()
+    def _on_cancelled(self):
+        # 子进程已终止、临时文件已清理后才通知界面
+        self.flush()
+        self.cancelled.emit()
 
-                # 安全处理stderr输出
-                stderr_text = ""
-                if result.stderr:
-                    try:
-                        # 尝试用UTF-8解码，失败时用系统默认编码
-                        stderr_text = result.stderr.decode('utf-8', errors='replace')
-                    except UnicodeDecodeError:
-                        try:
-                            # 获取系统默认编码
-                            default_encoding = locale.getpreferredencoding()
-                            stderr_text = result.stderr.decode(default_encoding, errors='replace')
-                        except:
-                            stderr_text = result.stderr.decode('latin1', errors='replace')
-                
-                if result.returncode == 0:
-                    success += 1
-                    msg = f"{self._('file_processed').format(filename=src.name, output_path=str(dst))}\n"
-                    msg += f"{self._('processing_time').format(duration=round(duration, 2))}"
-                    self.log.emit(msg)
-                else:
-                    # 安全截取错误信息，确保不会因NoneType出错
-                    error_msg = stderr_text[:200] if stderr_text else "Unknown error"
-                    self.log.emit(f"ERROR: {src.name}: {error_msg}")
-            except subprocess.TimeoutExpired:
-                duration = (datetime.now() - start_time).total_seconds()
-                self.log.emit(f"TIMEOUT: {src.name} (after {duration:.1f}s)")
-            except Exception as e:
-                self.log.emit(f"EXCEPTION: {src.name}: {str(e)}")
+    def _maybe_flush(self):
+        if len(self._lines) >= self.FLUSH_LINES or time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL:
+            self.flush()
 
-            self.progress.emit(i + 1, total, success)
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            lines, self._lines = self._lines, []
+            self._dirty = False
+            self._last_flush = time.monotonic()
+            update = (lines,) + self._progress + (self._eta,)
+        self.updates.emit(*update)
 
-        # === 打包输出 ===
-        if self.output_method == "zip" and not self._canceled:
-            for item in self.input_items:
-                if self._canceled:
-                    break
-                safe_name = "".join(c if c.isalnum() or c in "._-" else "_" for c in item["source_path"].stem)
-                zip_base = self.zip_output_path / (safe_name + "_low_res")
-                zip_path = get_unique_filename(str(zip_base))
-                temp_mod_dir = temp_output_base / safe_name
-                if not temp_mod_dir.exists():
-                    continue
-                with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_STORED) as zf:
-                    for root, _, files in os.walk(temp_mod_dir):
-                        for file in files:
-                            full_path = Path(root) / file
-                            arcname = full_path.relative_to(temp_output_base)
-                            zf.write(full_path, arcname)
-                self.log.emit(f"📦 Created: {zip_path.name}")
-            self.finished.emit("success", success, total, str(self.zip_output_path))
-        elif self.output_method == "folder":
-            output_dirs = []
-            for item in self.input_items:
-                if item["type"] == "folder":
-                    mod_root = item["source_path"]
-                    output_root = mod_root.parent / (mod_root.name + "_low_res")
-                else:
-                    original_name = item["source_path"].stem
-                    output_root = item["source_path"].parent / (original_name + "_low_res")
-                output_dirs.append(str(output_root))
-            output_text = "\n".join(dict.fromkeys(output_dirs))
-            self.finished.emit("success", success, total, output_text)
+    def cancel(self):
+        self.engine.cancel()
 
-        # 清理临时目录
-        for item in self.input_items:
-            if item.get("is_temp") and item["work_dir"].exists():
-                shutil.rmtree(item["work_dir"], ignore_errors=True)
-        if temp_output_base and temp_output_base.exists():
-            shutil.rmtree(temp_output_base, ignore_errors=True)
+    def run(self):
+        self.engine.run()
+        self.flush()
 
 # ========== 主窗口类 ==========
 class DDSCompressorApp(QWidget):
@@ -587,7 +145,8 @@ class DDSCompressorApp(QWidget):
             self.current_lang = "zh"
         
         self.tr_dict = LANGUAGES[self.current_lang]
-        self.log_content = ""
+        self.log_store = None
+        self.eta_text = ""
         self.worker_thread = None
         self.worker = None
         self.init_ui()
@@ -727,6 +286,16 @@ class DDSCompressorApp(QWidget):
         ])
         layout.addWidget(self.mode_combo)
         
+        self.copy_small_check = QCheckBox(self._("copy_small"))
+        self.copy_small_check.setObjectName("copy_small_check")
+        self.copy_small_check.toggled.connect(lambda checked: self.settings.setValue("copy_small", checked))
+        layout.addWidget(self.copy_small_check)
+        
+        self.use_cache_check = QCheckBox(self._("use_cache"))
+        self.use_cache_check.setObjectName("use_cache_check")
+        self.use_cache_check.toggled.connect(lambda checked: self.settings.setValue("use_cache", checked))
+        layout.addWidget(self.use_cache_check)
+        
         # ===== 输出方式 =====
         output_method_label = QLabel(self._("output_method"))
         output_method_label.setObjectName("output_method_label")
@@ -737,10 +306,49 @@ class DDSCompressorApp(QWidget):
         self.output_method_combo.setObjectName("output_method_combo")
         self.output_method_combo.addItems([
             self._("method_folder"),
-            self._("method_zip")
+            self._("method_zip"),
+            self._("method_7z")
         ])
         layout.addWidget(self.output_method_combo)
         
+        # ===== 压缩级别（ZIP: 0 为仅存储，1-9 为 Deflate；7Z: LZMA2 预设） =====
+        compression_label = QLabel(self._("compression_level"))
+        compression_label.setObjectName("compression_label")
+        compression_label.setStyleSheet("font-weight: bold;")
+        layout.addWidget(compression_label)
+        
+        self.compression_spin = QSpinBox()
+        self.compression_spin.setObjectName("compression_spin")
+        self.compression_spin.setRange(0, 9)
+        self.compression_spin.valueChanged.connect(lambda value: self.settings.setValue("compression_level", value))
+        layout.addWidget(self.compression_spin)
+        
+        # ===== 并行任务数 =====
+        worker_count_label = QLabel(self._("worker_count"))
+        worker_count_label.setObjectName("worker_count_label")
+        worker_count_label.setStyleSheet("font-weight: bold;")
+        layout.addWidget(worker_count_label)
+        
+        self.worker_count_spin = QSpinBox()
+        self.worker_count_spin.setObjectName("worker_count_spin")
+        self.worker_count_spin.setRange(1, max(64, default_worker_count()))
+        self.worker_count_spin.setValue(default_worker_count())
+        self.worker_count_spin.valueChanged.connect(lambda value: self.settings.setValue("worker_count", value))
+        layout.addWidget(self.worker_count_spin)
+        
+        # ===== 内存预算 =====
+        memory_budget_label = QLabel(self._("memory_budget"))
+        memory_budget_label.setObjectName("memory_budget_label")
+        memory_budget_label.setStyleSheet("font-weight: bold;")
+        layout.addWidget(memory_budget_label)
+        
+        self.memory_budget_spin = QSpinBox()
+        self.memory_budget_spin.setObjectName("memory_budget_spin")
+        self.memory_budget_spin.setRange(0, 1024)
+        self.memory_budget_spin.setSuffix(" GB")
+        self.memory_budget_spin.valueChanged.connect(lambda value: self.settings.setValue("memory_budget", value))
+        layout.addWidget(self.memory_budget_spin)
+        
         # ===== 按钮区域 =====
         button_layout = QHBoxLayout()
         self.export_btn = QPushButton(self._("export_log"))
@@ -846,50 +454,7 @@ class DDSCompressorApp(QWidget):
 
     def parse_input_lines(self, lines):
         """解析输入行，返回标准化的输入项列表"""
-        items = []
-        temp_dirs = []
-        try:
-            for line in lines:
-                p = line.strip()
-                if not p:
-                    continue
-                if p.startswith("file:///"):
-                    p = p[8:]
-                try:
-                    p = urllib.parse.unquote(p)
-                except:
-                    pass
-                p = Path(os.path.normpath(p))
-                if not p.exists():
-                    continue
-                
-                if p.is_dir():
-                    items.append({
-                        "type": "folder",
-                        "source_path": p,
-                        "work_dir": p,
-                        "is_temp": False
-                    })
-                elif p.is_file():
-                    suffix = p.suffix.lower()
-                    if suffix in ('.zip', '.7z'):
-                        temp_dir = Path(tempfile.mkdtemp())
-                        temp_dirs.append(temp_dir)
-                        roots = extract_archive(p, temp_dir)
-                        for root in roots:
-                            items.append({
-                                "type": "archive",
-                                "source_path": p,
-                                "work_dir": root,
-                                "is_temp": True
-                            })
-                    else:
-                        pass
-            return items, temp_dirs
-        except Exception as e:
-            for td in temp_dirs:
-                shutil.rmtree(td, ignore_errors=True)
-            raise e
+        return parse_input_lines(lines)
 
     def get_input_items(self):
         text = self.input_edit.toPlainText().strip()
@@ -902,17 +467,24 @@ class DDSCompressorApp(QWidget):
         last_input = self.settings.value("last_input", "")
         last_magick = self.settings.value("last_magick", "")
         output_method = self.settings.value("output_method", 0, type=int)
+        worker_count = self.settings.value("worker_count", default_worker_count(), type=int)
         
         if isinstance(last_input, str):
             self.input_edit.setPlainText(last_input)
         self.magick_edit.setText(last_magick)
         self.output_method_combo.setCurrentIndex(output_method)
+        self.worker_count_spin.setValue(worker_count)
+        self.copy_small_check.setChecked(self.settings.value("copy_small", False, type=bool))
+        self.use_cache_check.setChecked(self.settings.value("use_cache", True, type=bool))
+        self.compression_spin.setValue(self.settings.value("compression_level", 0, type=int))
+        self.memory_budget_spin.setValue(self.settings.value("memory_budget", 0, type=int))
 
     def save_settings(self):
         paths = "\n".join([str(Path(line.strip())) for line in self.input_edit.toPlainText().splitlines() if line.strip()])
         self.settings.setValue("last_input", paths)
         self.settings.setValue("last_magick", self.magick_edit.text())
         self.settings.setValue("output_method", self.output_method_combo.currentIndex())
+        self.settings.setValue("worker_count", self.worker_count_spin.value())
         
         # 保存当前语言（如果是custom，同时保存路径）
         self.settings.setValue("language", self.current_lang)
@@ -923,7 +495,7 @@ class DDSCompressorApp(QWidget):
             pass
 
     def check_magick_auto(self):
-        auto_magick = find_imagemagick_from_registry()
+        auto_magick = find_imagemagick()
         if auto_magick:
             self.magick_edit.setText(auto_magick)
             self.magick_tip_label.setVisible(False)
@@ -1100,6 +672,9 @@ class DDSCompressorApp(QWidget):
             ("res_label", "resolution"),
             ("mode_label", "process_mode"),
             ("output_method_label", "output_method"),
+            ("worker_count_label", "worker_count"),
+            ("memory_budget_label", "memory_budget"),
+            ("compression_label", "compression_level"),
             ("magick_tip_label", "magick_not_found_tip"),
             ("drag_hint", "drag_hint")
         ]
@@ -1121,6 +696,13 @@ class DDSCompressorApp(QWidget):
             if btn:
                 btn.setText(self._(text_key))
         
+        copy_small_check = self.findChild(QCheckBox, "copy_small_check")
+        if copy_small_check:
+            copy_small_check.setText(self._("copy_small"))
+        use_cache_check = self.findChild(QCheckBox, "use_cache_check")
+        if use_cache_check:
+            use_cache_check.setText(self._("use_cache"))
+        
         # 组合框：分辨率
         res_combo = self.findChild(QComboBox, "res_combo")
         if res_combo:
@@ -1147,7 +729,7 @@ class DDSCompressorApp(QWidget):
         output_combo = self.findChild(QComboBox, "output_method_combo")
         if output_combo:
             current_idx = output_combo.currentIndex()
-            items = ["method_folder", "method_zip"]
+            items = ["method_folder", "method_zip", "method_7z"]
             for i, key in enumerate(items):
                 if i < output_combo.count():
                     output_combo.setItemText(i, self._(key))
@@ -1170,7 +752,8 @@ class DDSCompressorApp(QWidget):
             self,
             self._("material_folder"),
             "",
-            "All Supported (*.zip *.7z);;ZIP Archives (*.zip);;7z Archives (*.7z);;All Files (*)"
+            "All Supported (*.zip *.7z *.bsa modlist.txt);;ZIP Archives (*.zip);;7z Archives (*.7z);;BSA Archives (*.bsa);;"
+            "MO2 Profile (modlist.txt);;All Files (*)"
         )
         if not files:
             folder = QFileDialog.getExistingDirectory(self, self._("material_folder"), "")
@@ -1215,7 +798,7 @@ class DDSCompressorApp(QWidget):
         for url in urls:
             raw_path = url.toLocalFile()
             p = Path(raw_path)
-            if p.suffix.lower() in ('.zip', '.7z') or p.is_dir():
+            if p.suffix.lower() in ('.zip', '.7z', '.bsa') or p.name.lower() == MO2_MODLIST or p.is_dir():
                 paths.append(str(p))
         if paths:
             current = self.input_edit.toPlainText().strip()
@@ -1271,10 +854,15 @@ class DDSCompressorApp(QWidget):
         process_mode = mode_map[mode_index]
         
         output_method_index = self.output_method_combo.currentIndex()
-        output_method = "folder" if output_method_index == 0 else "zip"
+        output_method = ["folder", "zip", "7z"][output_method_index]
+        if output_method == "7z" and not HAS_7Z:
+            QMessageBox.critical(self, self._("error_title"), "py7zr not installed. Run: pip install py7zr")
+            return
+        compression_level = self.compression_spin.value()
+        archive_codec = "deflate" if compression_level > 0 else "stored"
         
         zip_output_path = None
-        if output_method == "zip":
+        if output_method != "folder":
             zip_dir = QFileDialog.getExistingDirectory(
                 self,
                 self._("select_zip_path"),
@@ -1284,7 +872,11 @@ class DDSCompressorApp(QWidget):
                 return
             zip_output_path = Path(zip_dir)
         
-        self.log_content = ""
+        # 每次运行一个新的日志文件，日志边产生边写盘，内存中只保留尾部
+        if self.log_store is not None:
+            self.log_store.close()
+        self.log_store = LogStore()
+        self.eta_text = ""
         self.start_btn.setEnabled(False)
         self.progress_bar.setValue(0)
         self.status_label.setText(self._("processing").format(current="0", total="..."))
@@ -1301,17 +893,25 @@ class DDSCompressorApp(QWidget):
             process_mode=process_mode,
             current_lang=self.current_lang,
             output_method=output_method,
-            zip_output_path=zip_output_path
+            zip_output_path=zip_output_path,
+            max_workers=self.worker_count_spin.value(),
+            memory_budget=self.memory_budget_spin.value() * 1024 ** 3 or None,
+            copy_small=self.copy_small_check.isChecked(),
+            archive_codec=archive_codec,
+            compression_level=compression_level,
+            cache_dir=default_cache_dir() if self.use_cache_check.isChecked() else None,
+            timing_history=default_timing_history()
         )
         self.thread = QThread()
         self.worker.moveToThread(self.thread)
         self.thread.started.connect(self.worker.run)
-        self.worker.progress.connect(self.update_progress)
-        self.worker.log.connect(self.append_log)
+        self.worker.updates.connect(self.apply_updates)
         self.worker.finished.connect(self.on_finished)
         self.worker.error.connect(self.on_error)
+        self.worker.cancelled.connect(self.reset_cancel_state)
         self.worker.finished.connect(self.thread.quit)
         self.worker.error.connect(self.thread.quit)
+        self.worker.cancelled.connect(self.thread.quit)
         self.thread.finished.connect(self.thread.deleteLater)
         self.thread.start()
         self.worker_thread = self.thread
@@ -1326,16 +926,33 @@ class DDSCompressorApp(QWidget):
             }
         """)
         self.status_label.setText(self._("cancelled"))
+        self.worker_thread = None
+        self.worker = None
         self.start_btn.setText(self._("start_button"))
         self.start_btn.setEnabled(True)
 
+    def apply_updates(self, lines, current, total, success, eta):
+        """Worker 合并后的更新：一次追加多行日志，只刷新一次进度"""
+        for msg in lines:
+            self.append_log(msg)
+        if eta >= 0:
+            self.update_eta(eta)
+        if total:
+            self.update_progress(current, total, success)
+
     def append_log(self, msg):
-        self.log_content += msg + "\n"
+        self.log_store.append(msg)
+
+    def update_eta(self, seconds):
+        self.eta_text = self._("eta").format(eta=format_duration(seconds))
 
     def update_progress(self, current, total, success):
         progress = int((current / total) * 100)
         self.progress_bar.setValue(progress)
-        self.status_label.setText(self._("processing").format(current=current, total=total))
+        text = self._("processing").format(current=current, total=total)
+        if self.eta_text:
+            text += f"  ({self.eta_text})"
+        self.status_label.setText(text)
 
     def on_finished(self, msg_type, success, total, extra_info):
         tr = LANGUAGES.get(self.current_lang, LANGUAGES["en"])
@@ -1365,7 +982,7 @@ class DDSCompressorApp(QWidget):
         """)
 
     def export_log(self):
-        if not self.log_content.strip():
+        if not self.log_store:
             QMessageBox.information(self, self._("info"), self._("no_log"))
             return
         
@@ -1373,22 +990,60 @@ class DDSCompressorApp(QWidget):
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         log_file = os.path.join(exe_dir, f"DDS_Compression_Log_{timestamp}.txt")
         try:
-            with open(log_file, 'w', encoding='utf-8') as f:
-                f.write(self.log_content)
+            self.log_store.export(log_file)
             QMessageBox.information(self, self._("success_title"), self._("log_export_success").format(path=log_file))
         except Exception as e:
             QMessageBox.critical(self, self._("error_title"), self._("log_export_error").format(error=str(e)))
 
     def view_log(self):
-        if not self.log_content.strip():
+        if not self.log_store:
             QMessageBox.information(self, self._("info"), self._("no_log"))
             return
         
-        dialog = LogDialog(self.log_content, self.current_lang, self.tr_dict, self)
+        dialog = LogDialog(self.log_store, self.current_lang, self.tr_dict, self)
         dialog.exec_()
 
+class LogModel(QAbstractListModel):
+    """日志列表模型：只保存符合过滤条件的条目序号，行内容在显示时才从 LogStore 读取，
+    行数随滚动按 FETCH_ROWS 分批放出"""
+    FETCH_ROWS = 1000
+
+    def __init__(self, log_store, parent=None):
+        super().__init__(parent)
+        self.log_store = log_store
+        self.rows = log_store.matching("all")
+        self.loaded = 0
+
+    def set_filter(self, name):
+        self.beginResetModel()
+        self.rows = self.log_store.matching(name)
+        self.loaded = 0
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.loaded < len(self.rows)
+
+    def fetchMore(self, parent=QModelIndex()):
+        count = min(self.FETCH_ROWS, len(self.rows) - self.loaded)
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            # 多行消息（文件名 + 耗时）合并为一行显示，保证行高一致
+            return self.log_store.get(self.rows[index.row()]).replace("\n", "  |  ")
+        if role == Qt.ToolTipRole:
+            return self.log_store.get(self.rows[index.row()])
+        return None
+
 class LogDialog(QDialog):
-    def __init__(self, log_content, current_lang, tr_dict, parent=None):
+    def __init__(self, log_store, current_lang, tr_dict, parent=None):
         super().__init__(parent)
         self.current_lang = current_lang
         self.tr_dict = tr_dict
@@ -1396,10 +1051,18 @@ class LogDialog(QDialog):
         self.resize(600, 400)
         
         layout = QVBoxLayout()
-        self.text_edit = QTextEdit()
-        self.text_edit.setReadOnly(True)
-        self.text_edit.setPlainText(log_content)
-        layout.addWidget(self.text_edit)
+        self.filter_combo = QComboBox()
+        self.filter_combo.addItems([self.tr_text("log_filter_all"), self.tr_text("log_filter_errors"),
+                                    self.tr_text("log_filter_timeouts")])
+        layout.addWidget(self.filter_combo)
+        
+        self.model = LogModel(log_store, self)
+        self.list_view = QListView()
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setModel(self.model)
+        self.filter_combo.currentIndexChanged.connect(
+            lambda idx: self.model.set_filter(["all", "errors", "timeouts"][idx]))
+        layout.addWidget(self.list_view)
         
         close_btn = QPushButton(self.tr_text("Close"))
         close_btn.clicked.connect(self.accept)
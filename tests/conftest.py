@@ -0,0 +1,57 @@
+import struct
+import sys
+from pathlib import Path
+
+import pytest
+
+# 仓库根目录下的模块（engine.py 等）不是安装包，测试时直接导入
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from engine import ConversionEngine, parse_input_lines  # noqa: E402
+from run_bench import stub_executable  # noqa: E402
+
+DDSD_LINEARSIZE = 0x80000
+DDSD_PITCH = 0x8
+
+
+def dds_header(width, height, mips=1, fourcc=b"DXT1", dxgi=None, misc_flag=0, array_size=1, pf_flags=0x4,
+               rgb_bits=0, alpha_mask=0, pitch_flag=DDSD_LINEARSIZE, linear_size=0):
+    """手工拼出的 DDS 文件头（dxgi 不为 None 时附加 DX10 扩展头）"""
+    header = bytearray(128)
+    header[:4] = b"DDS "
+    struct.pack_into("<7I", header, 4, 124, 0x1007 | pitch_flag | (0x20000 if mips > 1 else 0), height, width,
+                     linear_size, 0, mips)
+    struct.pack_into("<2I4sI", header, 76, 32, pf_flags, fourcc, rgb_bits)
+    struct.pack_into("<I", header, 104, alpha_mask)
+    if dxgi is not None:
+        header += struct.pack("<5I", dxgi, 3, misc_flag, array_size, 0)
+    return bytes(header)
+
+
+def dds_file(path: Path, width, height, fourcc=b"DXT1", fill=b"\0"):
+    """写出只有一层 mip 的 BC1 / BC3 贴图"""
+    block_bytes = 8 if fourcc == b"DXT1" else 16
+    size = max(1, width // 4) * max(1, height // 4) * block_bytes
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(dds_header(width, height, fourcc=fourcc, linear_size=size) + fill * size)
+    return path
+
+
+@pytest.fixture
+def magick(tmp_path_factory, monkeypatch):
+    """benchmarks/fake_magick.py 替身，默认不模拟耗时"""
+    monkeypatch.setenv("FAKE_MAGICK_STARTUP", "0")
+    monkeypatch.setenv("FAKE_MAGICK_DELAY", "0")
+    monkeypatch.setenv("FAKE_MAGICK_DELAY_PER_MP", "0")
+    return stub_executable(tmp_path_factory.mktemp("magick"))
+
+
+def run_engine(inputs, magick, resolution=512, mode="all", **kwargs):
+    """在当前线程完整运行一次转换，返回 (引擎, 日志行)"""
+    items, _ = parse_input_lines([str(p) for p in inputs])
+    logs = []
+    engine = ConversionEngine(items, magick, str(resolution), mode, "en", on_log=logs.append, **kwargs)
+    engine.run()
+    return engine, logs
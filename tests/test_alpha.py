@@ -0,0 +1,85 @@
+"""按源格式选择输出编码：BC1 / BC3 / BC7 的 alpha 是否全不透明"""
+import struct
+
+import pytest
+
+from conftest import dds_header
+from engine import dds_alpha_opaque, keeps_source_format, parse_dds_header, select_dds_compression
+
+RED, BLUE = 0xF800, 0x001F
+
+
+def bc1_block(c0, c1, indices):
+    """indices 为 16 个 2 位索引"""
+    return struct.pack("<HHI", c0, c1, sum(index << (2 * i) for i, index in enumerate(indices)))
+
+
+def bc3_block(a0, a1, indices):
+    """indices 为 16 个 3 位 alpha 索引；颜色部分取一个不透明的 BC1 块"""
+    bits = sum(index << (3 * i) for i, index in enumerate(indices))
+    return bytes([a0, a1]) + bits.to_bytes(6, "little") + bc1_block(RED, BLUE, [0] * 16)
+
+
+def bc7_block(mode, a0=0, a1=0, p0=0, p1=0):
+    """模式位为最低位起第 mode 位的 1；模式 6 的 alpha 端点（7 位）位于第 49 / 56 位，P 位位于第 63 / 64 位"""
+    bits = 1 << mode
+    if mode == 6:
+        bits |= a0 << 49 | a1 << 56 | p0 << 63 | p1 << 64
+    return bits.to_bytes(16, "little")
+
+
+def write_dds(tmp_path, fourcc, blocks, dxgi=None):
+    # 16x16 贴图正好 16 个块，用一个块重复填满，最后一块可替换
+    data = blocks if isinstance(blocks, bytes) else b"".join(blocks)
+    header = dds_header(16, 16, fourcc=fourcc, dxgi=dxgi)
+    path = tmp_path / "t.dds"
+    path.write_bytes(header + data)
+    return path, parse_dds_header(header)
+
+
+@pytest.mark.parametrize("last, expected", [
+    (bc1_block(RED, BLUE, [3] * 16), "dxt1"),              # 4 色块的索引 3 是插值颜色
+    (bc1_block(BLUE, RED, [2] * 16), "dxt1"),              # 3 色块，但没有用到索引 3
+    (bc1_block(BLUE, RED, [0] * 15 + [3]), "dxt5"),        # 最后一个像素镂空
+    (bc1_block(RED, RED, [3] + [0] * 15), "dxt5"),         # c0 == c1 同样是 3 色模式
+])
+def test_bc1_punch_through(tmp_path, last, expected):
+    path, info = write_dds(tmp_path, b"DXT1", [bc1_block(RED, BLUE, [1] * 16)] * 15 + [last])
+    assert select_dds_compression(path, info) == expected
+
+
+@pytest.mark.parametrize("last, opaque", [
+    (bc3_block(255, 255, [7] * 16), True),                 # 6 值模式的索引 7 固定为 255
+    (bc3_block(255, 255, [0] * 15 + [6]), False),          # 索引 6 固定为 0，位于最高的 3 位组
+    (bc3_block(255, 255, [6] + [1] * 15), False),
+    (bc3_block(255, 200, [0] * 16), False),                # 端点不是 255
+])
+def test_bc3(tmp_path, last, opaque):
+    path, info = write_dds(tmp_path, b"DXT5", [bc3_block(255, 255, [0, 1, 7] * 5 + [1])] * 15 + [last])
+    assert dds_alpha_opaque(path, info) is opaque
+    assert select_dds_compression(path, info) == ("dxt1" if opaque else "dxt5")
+
+
+@pytest.mark.parametrize("last, opaque", [
+    (bc7_block(1), True),                                  # 模式 0-3 没有 alpha
+    (bc7_block(6, 127, 127, 1, 1), True),
+    (bc7_block(6, 127, 127, 1, 0), False),                 # 第二个端点的 P 位为 0 -> alpha 254
+    (bc7_block(6, 127, 126, 1, 1), False),
+    (bc7_block(5), False),                                 # 模式 5 有独立的 alpha 通道，按有 alpha 处理
+])
+def test_bc7(tmp_path, last, opaque):
+    path, info = write_dds(tmp_path, b"DX10", [bc7_block(6, 127, 127, 1, 1)] * 15 + [last], dxgi=98)
+    assert dds_alpha_opaque(path, info) is opaque
+
+
+def test_short_data_is_not_opaque(tmp_path):
+    path, info = write_dds(tmp_path, b"DXT5", [bc3_block(255, 255, [7] * 16)] * 8)
+    assert dds_alpha_opaque(path, info) is False
+
+
+def test_keep_formats():
+    bc5 = parse_dds_header(dds_header(64, 64, fourcc=b"ATI2"))
+    bc7 = parse_dds_header(dds_header(64, 64, fourcc=b"DX10", dxgi=98))
+    assert keeps_source_format(bc5, False)
+    assert keeps_source_format(bc7, True) and not keeps_source_format(bc7, False)
+    assert select_dds_compression(None, bc5) == "auto"
@@ -0,0 +1,47 @@
+"""压缩包 / BSA 成员名不能把文件写到临时目录或输出目录之外（zip-slip）"""
+import zipfile
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import dds_file, run_engine
+from engine import list_archive_members, list_bsa_members, safe_member_path
+
+UNSAFE = ["Mod/../../../escaped.dds", "/abs.dds", "C:/Windows/x.dds", "c:x.dds", "Mod\\..\\..\\y.dds", "..", "./"]
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("Mod/textures/a.dds", "Mod/textures/a.dds"),
+    ("Mod\\textures\\a.dds", "Mod/textures/a.dds"),
+    ("Mod//./textures/a.dds", "Mod/textures/a.dds"),
+    ("Mod/textures/a..b.dds", "Mod/textures/a..b.dds"),
+] + [(name, None) for name in UNSAFE])
+def test_safe_member_path(name, expected):
+    assert safe_member_path(name) == expected
+
+
+def write_zip(path, names, data):
+    with zipfile.ZipFile(path, "w") as zf:
+        for name in names:
+            zf.writestr(zipfile.ZipInfo(name), data)  # ZipInfo 保留原样的名称，不做 zipfile 自己的清理
+
+
+def test_list_archive_members_drops_unsafe(tmp_path):
+    write_zip(tmp_path / "evil.zip", ["Mod/textures/a.dds"] + UNSAFE[:5], b"DDS ")
+    assert set(list_archive_members(tmp_path / "evil.zip")) == {"textures/a.dds"}
+
+
+def test_list_bsa_members_drops_unsafe():
+    bsa = SimpleNamespace(files={"textures/a.dds": None, "../../textures/b.dds": None, "textures/c.nif": None})
+    assert list_bsa_members(bsa) == {"textures/a.dds": ("textures/a.dds", None)}
+
+
+def test_copy_small_stays_inside_output(tmp_path, magick):
+    source = dds_file(tmp_path / "src.dds", 64, 64).read_bytes()
+    root = tmp_path / "rv" / "in"
+    root.mkdir(parents=True)
+    write_zip(root / "evil.zip", ["Mod/textures/a.dds", "Mod/../../../escaped.dds", "Mod/../../escaped2.dds"], source)
+    engine, _ = run_engine([root / "evil.zip"], magick, copy_small=True)
+    assert engine.summary["status"] == "success"
+    assert (root / "evil_low_res" / "textures" / "a.dds").read_bytes() == source
+    assert not list(tmp_path.rglob("escaped*.dds"))
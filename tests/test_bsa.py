@@ -0,0 +1,126 @@
+"""BSAArchive：用手工拼出的 103 / 104 / 105 版 BSA 检查目录解析、内嵌文件名和压缩标志位"""
+import struct
+import zlib
+
+import pytest
+
+from engine import (BSA_COMPRESSED, BSA_EMBED_FILE_NAMES, BSA_INCLUDE_DIRECTORY_NAMES, BSA_INCLUDE_FILE_NAMES,
+                    BSA_SIZE_COMPRESS_TOGGLE, BSAArchive, list_bsa_members)
+
+NAMES = BSA_INCLUDE_DIRECTORY_NAMES | BSA_INCLUDE_FILE_NAMES
+DIFFUSE = b"DDS " + bytes(range(256)) * 4
+NORMAL = b"DDS " + b"\x7f" * 2000
+FOLDERS = {
+    "textures\\armor\\iron": {"cuirass.dds": DIFFUSE, "cuirass_n.dds": NORMAL},
+    "meshes\\armor": {"cuirass.nif": b"NIF data"},
+}
+
+
+def build_bsa(path, version, flags, compress=zlib.compress, toggled=()):
+    """按 BSA 布局写出 FOLDERS：文件头、文件夹记录、目录块（文件夹名 + 文件记录）、文件名表、数据区。
+    toggled 中的文件设置大小字段的压缩切换位"""
+    folder_record = 24 if version == 105 else 16
+    file_names = b"".join(name.encode() + b"\0" for files in FOLDERS.values() for name in files)
+    directory = sum(2 + len(folder) + 16 * len(files) for folder, files in FOLDERS.items())
+    offset = 36 + folder_record * len(FOLDERS) + directory + len(file_names)
+
+    folder_records = b""
+    blocks = b""
+    data = b""
+    for folder, files in FOLDERS.items():
+        if version == 105:
+            folder_records += struct.pack("<QIIQ", 0, len(files), 0, 0)
+        else:
+            folder_records += struct.pack("<QII", 0, len(files), 0)
+        blocks += bytes([len(folder) + 1]) + folder.encode() + b"\0"
+        for name, content in files.items():
+            compressed = bool(flags & BSA_COMPRESSED) != (name in toggled)
+            payload = b""
+            if version >= 104 and flags & BSA_EMBED_FILE_NAMES:
+                full = f"{folder}\\{name}".encode()
+                payload += bytes([len(full)]) + full
+            payload += struct.pack("<I", len(content)) + compress(content) if compressed else content
+            size = len(payload) | (BSA_SIZE_COMPRESS_TOGGLE if name in toggled else 0)
+            blocks += struct.pack("<QII", 0, size, offset + len(data))
+            data += payload
+    header = struct.pack("<4s8I", b"BSA\0", version, 36, flags, len(FOLDERS),
+                         sum(len(files) for files in FOLDERS.values()), 0, len(file_names), 0)
+    path.write_bytes(header + folder_records + blocks + file_names + data)
+    return path
+
+
+def check_contents(bsa):
+    assert sorted(bsa.files) == ["meshes/armor/cuirass.nif", "textures/armor/iron/cuirass.dds",
+                                 "textures/armor/iron/cuirass_n.dds"]
+    assert bsa.read("textures/armor/iron/cuirass.dds") == DIFFUSE
+    assert bsa.read("textures/armor/iron/cuirass_n.dds") == NORMAL
+    assert bsa.read_head("textures/armor/iron/cuirass.dds", 20) == DIFFUSE[:20]
+    assert sorted(list_bsa_members(bsa)) == ["textures/armor/iron/cuirass.dds", "textures/armor/iron/cuirass_n.dds"]
+
+
+@pytest.mark.parametrize("version", [103, 104])
+def test_raw(tmp_path, version):
+    bsa = BSAArchive(build_bsa(tmp_path / "a.bsa", version, NAMES))
+    try:
+        check_contents(bsa)
+        assert bsa.files["textures/armor/iron/cuirass.dds"][2] is False
+    finally:
+        bsa.close()
+
+
+@pytest.mark.parametrize("version", [103, 104])
+def test_zlib(tmp_path, version):
+    bsa = BSAArchive(build_bsa(tmp_path / "a.bsa", version, NAMES | BSA_COMPRESSED))
+    try:
+        check_contents(bsa)
+    finally:
+        bsa.close()
+
+
+def test_embedded_names(tmp_path):
+    # 104 版的内嵌文件名在数据区开头，读取时跳过；压缩与非压缩两种都要正确
+    for flags in (NAMES | BSA_EMBED_FILE_NAMES, NAMES | BSA_EMBED_FILE_NAMES | BSA_COMPRESSED):
+        bsa = BSAArchive(build_bsa(tmp_path / f"{flags}.bsa", 104, flags))
+        try:
+            check_contents(bsa)
+        finally:
+            bsa.close()
+
+
+def test_compress_toggle(tmp_path):
+    # 大小字段的切换位使单个文件与整体压缩标志相反
+    bsa = BSAArchive(build_bsa(tmp_path / "a.bsa", 104, NAMES, toggled={"cuirass_n.dds"}))
+    try:
+        check_contents(bsa)
+        assert bsa.files["textures/armor/iron/cuirass_n.dds"][2] is True
+        assert bsa.files["textures/armor/iron/cuirass_n.dds"][1] < BSA_SIZE_COMPRESS_TOGGLE
+    finally:
+        bsa.close()
+
+
+def test_v105_raw(tmp_path):
+    bsa = BSAArchive(build_bsa(tmp_path / "a.bsa", 105, NAMES | BSA_EMBED_FILE_NAMES))
+    try:
+        check_contents(bsa)
+    finally:
+        bsa.close()
+
+
+def test_v105_lz4(tmp_path):
+    lz4_frame = pytest.importorskip("lz4.frame")
+    bsa = BSAArchive(build_bsa(tmp_path / "a.bsa", 105, NAMES | BSA_COMPRESSED, compress=lz4_frame.compress))
+    try:
+        check_contents(bsa)
+    finally:
+        bsa.close()
+
+
+def test_unsupported(tmp_path):
+    path = build_bsa(tmp_path / "a.bsa", 104, NAMES)
+    data = bytearray(path.read_bytes())
+    data[4:8] = struct.pack("<I", 0x100)  # Fallout 4 的 BA2 / 未知版本
+    path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        BSAArchive(path)
+    with pytest.raises(ValueError):
+        BSAArchive(build_bsa(tmp_path / "b.bsa", 104, BSA_INCLUDE_DIRECTORY_NAMES))
@@ -0,0 +1,67 @@
+"""结果缓存：按最近使用时间淘汰、同一结果只生成一次"""
+import threading
+from itertools import count
+from types import SimpleNamespace
+
+import engine
+from conftest import dds_file, run_engine
+from engine import ResultCache
+
+
+def test_lru_eviction(tmp_path, monkeypatch):
+    clock = count(1000)
+    monkeypatch.setattr(engine, "time", SimpleNamespace(time=lambda: next(clock)))
+    cache = ResultCache(tmp_path / "cache", max_bytes=300)
+    for key in ("aa", "bb", "cc"):
+        cache.store(key, data=bytes(100))
+    assert cache.acquire("aa") == cache.path("aa")  # 命中刷新 aa 的使用时间，bb 成为最久未用
+    cache.store("dd", data=bytes(100))
+    # 超过上限后一次淘汰到上限的 90%
+    assert not cache.path("bb").exists() and not cache.path("cc").exists()
+    assert cache.path("aa").exists() and cache.path("dd").exists()
+    assert cache.hits == 1
+
+    # 重新打开时从磁盘恢复条目
+    reopened = ResultCache(tmp_path / "cache", max_bytes=300)
+    assert reopened.acquire("dd") == reopened.path("dd")
+    assert reopened.acquire("bb", block=False) is None
+
+
+def test_inflight_dedup(tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    assert cache.acquire("k") is None  # 当前线程成为生产者
+    assert cache.acquire("k", block=False) is False
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(cache.acquire("k")))
+    waiter.start()
+    waiter.join(0.2)
+    assert waiter.is_alive()  # 等待生产者完成
+    cache.store("k", data=b"DDS result")
+    cache.release("k")
+    waiter.join(5)
+    assert got == [cache.path("k")] and cache.path("k").read_bytes() == b"DDS result"
+
+
+def test_failed_producer_hands_over(tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    assert cache.acquire("k") is None
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(cache.acquire("k")))
+    waiter.start()
+    cache.release("k")  # 生产者失败，没有写入
+    waiter.join(5)
+    assert got == [None]  # 等待者接手生成
+
+
+def test_engine_converts_identical_sources_once(tmp_path, magick, monkeypatch):
+    monkeypatch.setenv("FAKE_MAGICK_DELAY", "0.3")
+    mods = [tmp_path / "A", tmp_path / "B"]
+    for mod in mods:
+        dds_file(mod / "textures" / "rock.dds", 256, 256, fill=b"\x5a")
+    options = dict(resolution=128, cache_dir=tmp_path / "cache", batch_size=1, max_workers=2)
+    first, _ = run_engine(mods, magick, **options)
+    assert (first.summary["success"], first.summary["cache_hits"]) == (2, 1)
+    second, _ = run_engine(mods, magick, incremental=False, **options)
+    assert (second.summary["success"], second.summary["cache_hits"]) == (2, 2)
+    for mod in mods:
+        assert (tmp_path / f"{mod.name}_low_res" / "textures" / "rock.dds").exists()
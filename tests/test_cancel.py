@@ -0,0 +1,95 @@
+"""取消：终止正在运行的 magick，删除临时数据，压缩包改名为 .partial"""
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+
+import pytest
+
+from conftest import ROOT, dds_file
+from engine import ConversionEngine, parse_input_lines
+
+
+@pytest.fixture
+def slow_magick(magick, monkeypatch):
+    monkeypatch.setenv("FAKE_MAGICK_DELAY", "10")
+    return magick
+
+
+@pytest.fixture
+def temp_root(tmp_path, monkeypatch):
+    root = tmp_path / "tmp"
+    root.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(root))
+    return root
+
+
+def start_engine(inputs, magick, cancel_when, **kwargs):
+    """在后台线程运行引擎，cancel_when(成功数) 为真时取消；返回 (引擎, 线程, 事件)"""
+    items, _ = parse_input_lines([str(p) for p in inputs])
+    cancelled = threading.Event()
+
+    def on_progress(done, total, success):
+        if cancel_when(success):
+            eng.cancel()
+
+    eng = ConversionEngine(items, magick, "128", "all", "en", on_progress=on_progress,
+                           on_cancelled=cancelled.set, **kwargs)
+    thread = threading.Thread(target=eng.run)
+    thread.start()
+    return eng, thread, cancelled
+
+
+def test_cancel_kills_magick_and_removes_temp_dirs(tmp_path, slow_magick, temp_root):
+    source = dds_file(tmp_path / "src.dds", 256, 256).read_bytes()
+    with zipfile.ZipFile(tmp_path / "Mod.zip", "w") as zf:
+        for i in range(4):
+            zf.writestr(f"Mod/textures/t{i}.dds", source)
+    eng, thread, cancelled = start_engine([tmp_path / "Mod.zip"], slow_magick, lambda success: False,
+                                          max_workers=2, batch_size=1)
+    time.sleep(0.5)
+    start = time.monotonic()
+    eng.cancel()
+    thread.join(10)
+    assert not thread.is_alive() and time.monotonic() - start < 5  # 没有等 10 秒的 magick 跑完
+    assert eng.summary["status"] == "cancelled" and cancelled.is_set()
+    assert eng.summary["success"] == 0
+    assert not list(temp_root.iterdir())
+    assert not list((tmp_path / "Mod_low_res").rglob("*.dds"))
+
+
+def test_cancel_renames_archive_to_partial(tmp_path, slow_magick, temp_root):
+    mod = tmp_path / "Mod"
+    for i in range(2):
+        dds_file(mod / "textures" / f"small{i}.dds", 64, 64)  # 直接复制，立即完成
+        dds_file(mod / "textures" / f"big{i}.dds", 256, 256)
+    out = tmp_path / "out"
+    out.mkdir()
+    eng, thread, cancelled = start_engine([mod], slow_magick, lambda success: success == 2,
+                                          output_method="zip", zip_output_path=out, copy_small=True,
+                                          max_workers=4, batch_size=1)
+    thread.join(10)
+    assert not thread.is_alive() and cancelled.is_set()
+    assert [p.name for p in out.iterdir()] == ["Mod_low_res.partial.zip"]
+    with zipfile.ZipFile(out / "Mod_low_res.partial.zip") as zf:
+        assert zf.testzip() is None
+        assert sorted(zf.namelist()) == ["Mod/textures/small0.dds", "Mod/textures/small1.dds"]
+    assert not list(temp_root.iterdir())
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="SIGINT to a child process is POSIX only")
+def test_cli_sigint_exits_130(tmp_path, slow_magick):
+    mod = tmp_path / "Mod"
+    dds_file(mod / "textures" / "big.dds", 256, 256)
+    proc = subprocess.Popen([sys.executable, str(ROOT / "cli.py"), str(mod), "--magick", slow_magick, "-r", "128", "-q",
+                             "--no-cache", "--timing-history", str(tmp_path / "timings.json"), "--json"],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    time.sleep(1)
+    os.kill(proc.pid, signal.SIGINT)
+    stdout, _ = proc.communicate(timeout=10)
+    assert proc.returncode == 130
+    assert b'"status": "cancelled"' in stdout
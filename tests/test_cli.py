@@ -0,0 +1,62 @@
+"""命令行：输出目录和提前退出时的临时目录清理"""
+import tempfile
+import zipfile
+
+import pytest
+
+import cli
+from conftest import dds_file
+
+
+@pytest.fixture
+def temp_root(tmp_path, monkeypatch):
+    """把 tempfile 的临时目录指向测试目录，便于检查是否有残留"""
+    root = tmp_path / "tmp"
+    root.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(root))
+    return root
+
+
+@pytest.fixture
+def mod_zip(tmp_path):
+    source = dds_file(tmp_path / "src.dds", 256, 256).read_bytes()
+    path = tmp_path / "Mod.zip"
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("Mod/textures/a.dds", source)
+    return path
+
+
+def test_output_dir_is_created(tmp_path, magick, mod_zip, temp_root):
+    out = tmp_path / "missing" / "out"
+    code = cli.main([str(mod_zip), "--magick", magick, "-o", "zip", "--output-dir", str(out), "-r", "128",
+                     "--no-cache", "--timing-history", str(tmp_path / "timings.json"), "-q"])
+    assert code == 0
+    with zipfile.ZipFile(out / "Mod_low_res.zip") as zf:
+        assert zf.namelist() == ["Mod/textures/a.dds"]
+    assert not list(temp_root.iterdir())
+
+
+def test_output_dir_not_creatable(tmp_path, magick, mod_zip, temp_root, capsys):
+    (tmp_path / "file").write_bytes(b"")
+    code = cli.main([str(mod_zip), "--magick", magick, "-o", "zip", "--output-dir", str(tmp_path / "file" / "out")])
+    assert code == 2
+    assert "Cannot create --output-dir" in capsys.readouterr().err
+    assert not list(temp_root.iterdir())
+
+
+@pytest.mark.parametrize("extra", [
+    ["--vram-budget", "1", "--vram-rule", "textures/*"],
+    ["--vram-budget", "1", "--vram-plan", "missing/plan.json"],
+])
+def test_early_exit_removes_temp_dirs(tmp_path, magick, mod_zip, temp_root, monkeypatch, extra):
+    monkeypatch.chdir(tmp_path)
+    code = cli.main([str(mod_zip), "--magick", magick, "--no-cache", "-q", *extra])
+    assert code == 2
+    assert not list(temp_root.iterdir())
+
+
+def test_lzma2_codec_rejected_for_zip(mod_zip, capsys):
+    with pytest.raises(SystemExit) as e:
+        cli.main([str(mod_zip), "-o", "zip", "--codec", "lzma2"])
+    assert e.value.code == 2
+    assert "--codec lzma2 requires -o 7z" in capsys.readouterr().err
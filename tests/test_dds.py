@@ -0,0 +1,95 @@
+"""DDS 文件头解析、mip 层大小与截取"""
+import struct
+
+import pytest
+
+from conftest import DDSD_PITCH, dds_header
+from engine import dds_level_size, mip_truncation_level, parse_dds_header, truncate_dds_mips
+
+
+def test_fourcc():
+    info = parse_dds_header(dds_header(1024, 512, mips=11, fourcc=b"DXT5"))
+    assert (info["width"], info["height"], info["mip_count"]) == (1024, 512, 11)
+    assert (info["format"], info["block_bytes"], info["header_size"]) == ("BC3", 16, 128)
+    assert parse_dds_header(dds_header(64, 64, fourcc=b"ATI2"))["format"] == "BC5"
+
+
+def test_dx10():
+    info = parse_dds_header(dds_header(256, 256, fourcc=b"DX10", dxgi=98))
+    assert (info["format"], info["block_bytes"], info["header_size"]) == ("BC7", 16, 148)
+    cube = parse_dds_header(dds_header(256, 256, fourcc=b"DX10", dxgi=71, misc_flag=0x4, array_size=6))
+    assert cube["is_cubemap"] and cube["array_size"] == 6
+    # DX10 扩展头不完整
+    assert parse_dds_header(dds_header(256, 256, fourcc=b"DX10", dxgi=98)[:130]) is None
+
+
+def test_uncompressed():
+    rgba = parse_dds_header(dds_header(16, 16, pf_flags=0x41, fourcc=b"\0" * 4, rgb_bits=32, alpha_mask=0xFF000000))
+    assert (rgba["format"], rgba["bits_per_pixel"], rgba["block_bytes"]) == ("RGBA8", 32, 0)
+    rgbx = parse_dds_header(dds_header(16, 16, pf_flags=0x40, fourcc=b"\0" * 4, rgb_bits=32))
+    assert rgbx["format"] == "RGBX8"
+    assert parse_dds_header(dds_header(16, 16, pf_flags=0x40, fourcc=b"\0" * 4, rgb_bits=24))["format"] == "RGB8"
+
+
+def test_not_dds():
+    assert parse_dds_header(b"DDS " + bytes(50)) is None
+    assert parse_dds_header(b"PNG " + dds_header(4, 4)[4:]) is None
+
+
+def test_level_size():
+    bc1 = parse_dds_header(dds_header(8, 8))
+    assert dds_level_size(bc1, 8, 8) == 4 * 8
+    assert dds_level_size(bc1, 2, 1) == 8  # 不足一块按一块计
+    rgb = parse_dds_header(dds_header(5, 3, pf_flags=0x40, fourcc=b"\0" * 4, rgb_bits=24))
+    assert dds_level_size(rgb, 5, 3) == 15 * 3
+
+
+@pytest.mark.parametrize("size, mips, res, exact, expected", [
+    ((2048, 2048), 12, 512, True, 2),
+    ((2048, 1024), 12, 1024, True, 1),
+    ((2048, 2048), 12, 1000, True, None),   # 不是 2 的幂次缩小
+    ((2048, 2048), 12, 1000, False, 2),     # 取不超过目标的最大一层
+    ((3072, 3072), 12, 1024, True, None),   # 缩小倍数 3
+    ((2048, 2048), 2, 512, True, None),     # 没有对应的 mip 层
+    ((2048, 2048), 1, 1024, True, None),
+    ((512, 512), 10, 512, True, None),      # 已不大于目标
+])
+def test_mip_truncation_level(size, mips, res, exact, expected):
+    info = parse_dds_header(dds_header(*size, mips=mips))
+    assert mip_truncation_level(info, res, exact) == expected
+
+
+def test_mip_truncation_level_skips_cubemaps():
+    info = parse_dds_header(dds_header(1024, 1024, mips=11, fourcc=b"DX10", dxgi=71, misc_flag=0x4, array_size=6))
+    assert mip_truncation_level(info, 512) is None
+
+
+def test_truncate_dds_mips(tmp_path):
+    # 64x32 的 BC1，完整 mip 链，每层填充不同字节以便核对截取位置
+    header = dds_header(64, 32, mips=7, linear_size=16 * 8 * 8)
+    info = parse_dds_header(header)
+    dims = [(max(1, 64 >> i), max(1, 32 >> i)) for i in range(7)]
+    levels = [bytes([i + 1]) * dds_level_size(info, w, h) for i, (w, h) in enumerate(dims)]
+    src = tmp_path / "a.dds"
+    src.write_bytes(header + b"".join(levels))
+
+    data = truncate_dds_mips(src, info, 2)
+    new = parse_dds_header(data)
+    assert (new["width"], new["height"], new["mip_count"]) == (16, 8, 5)
+    assert struct.unpack_from("<I", data, 20)[0] == len(levels[2])  # DDSD_LINEARSIZE 为新的首层大小
+    assert data[128:] == b"".join(levels[2:])
+
+    src.write_bytes(header + b"".join(levels)[:-10])
+    with pytest.raises(ValueError):
+        truncate_dds_mips(src, info, 2)
+
+
+def test_truncate_uncompressed_pitch(tmp_path):
+    header = dds_header(8, 4, mips=4, pf_flags=0x41, fourcc=b"\0" * 4, rgb_bits=32, alpha_mask=0xFF000000,
+                        pitch_flag=DDSD_PITCH, linear_size=32)
+    info = parse_dds_header(header)
+    src = tmp_path / "a.dds"
+    src.write_bytes(header + bytes(8 * 4 * 4 + 4 * 2 * 4 + 2 * 1 * 4 + 1 * 1 * 4))
+    data = truncate_dds_mips(src, info, 1)
+    assert struct.unpack_from("<3I", data, 12) == (2, 4, 16)  # 高、宽、每行字节数
+    assert len(data) == 128 + 4 * 2 * 4 + 2 * 4 + 4
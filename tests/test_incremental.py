@@ -0,0 +1,50 @@
+"""增量清单：未变化的文件跳过，源文件删除后清理输出，改变处理模式不删除被排除文件的输出"""
+from conftest import dds_file, run_engine
+
+
+def make_mod(root, names, size=256):
+    for name in names:
+        dds_file(root / "textures" / name, size, size)
+    return root
+
+
+def outputs(mod):
+    out = mod.parent / (mod.name + "_low_res")
+    return sorted(p.relative_to(out).as_posix() for p in out.rglob("*.dds"))
+
+
+def test_unchanged_files_are_skipped(tmp_path, magick):
+    mod = make_mod(tmp_path / "Mod", ["a.dds", "b_n.dds"])
+    first, _ = run_engine([mod], magick, resolution=128)
+    assert first.summary["success"] == 2
+    second, _ = run_engine([mod], magick, resolution=128)
+    assert (second.summary["total"], second.summary["unchanged"]) == (0, 2)
+    dds_file(mod / "textures" / "a.dds", 512, 512)
+    third, _ = run_engine([mod], magick, resolution=128)
+    assert (third.summary["total"], third.summary["unchanged"]) == (1, 1)
+
+
+def test_deleted_source_removes_output(tmp_path, magick):
+    mod = make_mod(tmp_path / "Mod", ["a.dds", "b.dds"])
+    make_mod(mod, ["small.dds"], size=64)  # 无需输出，清单中 output 为 False
+    run_engine([mod], magick, resolution=128)
+    assert outputs(mod) == ["textures/a.dds", "textures/b.dds"]
+    (mod / "textures" / "a.dds").unlink()
+    (mod / "textures" / "small.dds").unlink()
+    engine, logs = run_engine([mod], magick, resolution=128)
+    assert outputs(mod) == ["textures/b.dds"]
+    assert engine.summary["removed"] == 1
+    assert "🗑 Removed 1 output(s) whose source no longer exists or is overridden" in logs
+
+
+def test_mode_change_keeps_excluded_outputs(tmp_path, magick):
+    mod = make_mod(tmp_path / "Mod", ["a.dds", "a_n.dds", "b_n.dds"])
+    run_engine([mod], magick, resolution=128, mode="all")
+    engine, _ = run_engine([mod], magick, resolution=128, mode="skip_normals")
+    assert engine.summary["removed"] == 0
+    assert outputs(mod) == ["textures/a.dds", "textures/a_n.dds", "textures/b_n.dds"]
+    # 被排除的文件仍记在清单中：源文件之后删除时照样清理
+    (mod / "textures" / "b_n.dds").unlink()
+    engine, _ = run_engine([mod], magick, resolution=128, mode="skip_normals")
+    assert engine.summary["removed"] == 1
+    assert outputs(mod) == ["textures/a.dds", "textures/a_n.dds"]
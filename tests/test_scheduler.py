@@ -0,0 +1,68 @@
+"""扫描与转换并行：有界扫描队列、按内存预算放行、扫描线程出错或取消时不会卡住"""
+import queue
+import threading
+import time
+
+import pytest
+
+import engine
+from conftest import dds_file, run_engine
+from engine import ConversionEngine, pick_admissible
+
+
+def unit(cost, memory):
+    return (-cost, 0, memory, [])
+
+
+def test_pick_admissible():
+    pending = [unit(9, 800), unit(5, 300), unit(1, 100)]
+    assert pick_admissible(pending, 1000, idle=False) == 0
+    assert pick_admissible(pending, 500, idle=False) == 1  # 大任务放不下时由小任务填满剩余容量
+    assert pick_admissible(pending, 50, idle=False) is None
+    assert pick_admissible(pending, 50, idle=True) == 0  # 空闲时超出预算也放行，避免饿死
+    assert pick_admissible([], 50, idle=True) is None
+
+
+@pytest.fixture
+def small_queue(monkeypatch):
+    monkeypatch.setattr(engine, "SCAN_QUEUE_SIZE", 2)
+    monkeypatch.setattr(engine, "SCAN_THREADS", 2)
+
+
+def test_bounded_queue_interleaves_scan_and_convert(tmp_path, magick, small_queue, monkeypatch):
+    monkeypatch.setenv("FAKE_MAGICK_DELAY", "0.02")
+    mods = []
+    for m in range(3):
+        mod = tmp_path / f"Mod{m}"
+        for i in range(6):
+            dds_file(mod / "textures" / f"t{i}.dds", 256, 256)
+        dds_file(mod / "textures" / "small.dds", 64, 64)
+        mods.append(mod)
+    progress = []
+    eng, _ = run_engine(mods, magick, resolution=128, batch_size=1, max_workers=1,
+                        on_progress=lambda done, total, success: progress.append((done, total)))
+    assert (eng.summary["total"], eng.summary["success"], eng.summary["skipped"]) == (18, 18, 3)
+    # 队列只有 2 项：扫描尚未结束（总数还在增长）时已有任务完成
+    assert any(0 < done and total < 18 for done, total in progress)
+    assert [total for _, total in progress] == sorted(total for _, total in progress)
+
+
+def test_broken_input_does_not_stall(tmp_path, magick, small_queue):
+    mod = tmp_path / "Mod"
+    for i in range(4):
+        dds_file(mod / "textures" / f"t{i}.dds", 256, 256)
+    broken = tmp_path / "Broken.zip"
+    broken.write_bytes(b"PK\x03\x04 truncated")
+    eng, logs = run_engine([broken, mod], magick, resolution=128)
+    assert (eng.summary["status"], eng.summary["success"]) == ("success", 4)
+    assert any(line.startswith("EXCEPTION: Broken.zip") for line in logs)
+
+
+def test_put_gives_up_after_cancel(magick):
+    eng = ConversionEngine([], magick, "512", "all", "en")
+    out = queue.Queue(maxsize=1)
+    out.put(("unchanged",))
+    threading.Timer(0.2, eng.cancel).start()
+    start = time.monotonic()
+    eng._put(out, ("unchanged",))  # 队列已满：取消前一直等待转换线程消费
+    assert 0.15 < time.monotonic() - start < 2
@@ -0,0 +1,44 @@
+"""ZipSink / RawZipWriter 写出的压缩包能被 zipfile 完整读回"""
+import os
+import zipfile
+import zlib
+
+import pytest
+
+from engine import RawZipWriter, ZipSink, create_archive_sink
+
+
+@pytest.mark.parametrize("codec", sorted(ZipSink.COMPRESS_TYPES))
+def test_sink_round_trip(tmp_path, codec):
+    sink = ZipSink(tmp_path, codec)
+    members = {f"textures/tex{i}.dds": os.urandom(64) * i for i in range(4)}
+    members["textures/é.dds"] = b"DDS " + bytes(200)
+    futures = [sink.put("Mod", name, sink.prepare(name, data)) for name, data in members.items()]
+    for future in futures:
+        future.result()
+    (path,) = sink.close()
+    with zipfile.ZipFile(path) as zf:
+        assert zf.testzip() is None
+        assert {name: zf.read(name) for name in zf.namelist()} == members
+        assert zf.getinfo("textures/tex1.dds").compress_type == ZipSink.COMPRESS_TYPES[codec]
+
+
+def test_zip64_records(tmp_path):
+    # 把阈值调低，不写 4 GB 数据也能走 ZIP64 偏移和结束记录
+    writer = RawZipWriter(tmp_path / "z64.zip")
+    writer.ZIP64_LIMIT = 16
+    members = {f"m{i}": os.urandom(40) for i in range(3)}
+    for name, data in members.items():
+        zinfo = zipfile.ZipInfo(name, (2021, 5, 6, 7, 8, 10))
+        zinfo.CRC, zinfo.file_size, zinfo.compress_size = zlib.crc32(data), len(data), len(data)
+        writer.write(zinfo, data)
+    writer.close()
+    with zipfile.ZipFile(tmp_path / "z64.zip") as zf:
+        assert zf.testzip() is None
+        assert {name: zf.read(name) for name in zf.namelist()} == members
+        assert zf.getinfo("m2").date_time == (2021, 5, 6, 7, 8, 10)
+
+
+def test_lzma2_requires_7z_output(tmp_path):
+    with pytest.raises(ValueError, match="7z"):
+        create_archive_sink("zip", tmp_path, "lzma2")